@@ -67,6 +67,7 @@ from routes.certifier import certifier_bp
 from routes.exporter import exporter_bp
 from routes.retailer import retailer_bp
 from routes.bank import bank_bp
+from routes.models_admin import models_admin_bp
 
 app.register_blueprint(farmer_bp)
 app.register_blueprint(business_bp)
@@ -96,6 +97,21 @@ app.register_blueprint(certifier_bp)
 app.register_blueprint(exporter_bp)
 app.register_blueprint(retailer_bp)
 app.register_blueprint(bank_bp)
+app.register_blueprint(models_admin_bp)
+
+# Periodic incremental refits from logged pond reports (AQUA_INCREMENTAL_INTERVAL seconds, 0 disables)
+from core.db import AQUACYCLE_DB
+from ml_core.incremental import start_scheduler
+start_scheduler(lambda: AQUACYCLE_DB["reports"])
+
+# Warm the weather cache for the landing page before the first visitor
+from core.weather_cache import WEATHER
+WEATHER.prefetch("Visakhapatnam")
+
+# Load the vision classifier once per worker, off the request path
+import threading
+from ml_core.vision_service import VISION
+threading.Thread(target=VISION.load, daemon=True).start()
 
 # Supabase Initialization
 from core.supabase_client import supabase, is_mock
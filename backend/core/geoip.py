@@ -0,0 +1,185 @@
+# Offline geolocation for language detection
+#
+# set_lang_by_geo resolves the visitor's language without leaving the process:
+#
+#   IP_TABLE       IP range -> (country, region), loaded from a local CSV into
+#                  sorted start/end arrays (IPv4 and IPv6 kept apart) and searched
+#                  with bisect; lookups go through an LRU cache.
+#   REGION_INDEX   the lat/lon bounding boxes, bucketed on a GRID_DEGREES grid so
+#                  a lookup only tests the few boxes overlapping its cell, in the
+#                  original priority order.
+#
+# The CSV (AQUA_GEOIP_CSV, default data/geoip_ranges.csv) has one range per row:
+# start,end,country[,region] with IPs as addresses or integers, or
+# network,country[,region] with CIDR networks. A header row is optional, so
+# DB-IP's free "ip-to-country/city lite" CSVs can be used by selecting those
+# columns. Addresses the table does not cover are looked up on ip-api.com
+# through the shared outbound client (pooled, circuit-broken, answers cached in
+# the same LRU size) while no table is loaded; AQUA_GEOIP_ONLINE=1 keeps that
+# fallback on alongside a table, =0 turns it off (default language instead).
+
+import os
+import csv
+import math
+import bisect
+import ipaddress
+from functools import lru_cache
+from core.http_client import OUTBOUND, redact
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEOIP_CSV = os.getenv("AQUA_GEOIP_CSV", os.path.join(BASE_DIR, "data", "geoip_ranges.csv"))
+LOOKUP_CACHE_SIZE = 8192
+# "auto": ask ip-api.com only while no range table is loaded (none is shipped by default)
+GEOIP_ONLINE = os.getenv("AQUA_GEOIP_ONLINE", "auto")
+GRID_DEGREES = 0.5
+
+DEFAULT_LANG = "en"
+
+# (lat_min, lat_max, lon_min, lon_max, lang); first match wins, bounds are exclusive
+REGION_BOXES = [
+    (13.5, 19.5, 76.5, 84.5, "te"),
+    (8.0, 13.5, 76.0, 80.5, "ta"),
+    (21.5, 27.0, 85.5, 89.5, "bn"),
+    (20.0, 24.5, 68.5, 74.5, "gu"),
+    (8.0, 13.0, 74.5, 77.5, "ml"),
+    (11.5, 18.5, 74.0, 78.5, "kn"),
+    (17.5, 22.5, 81.0, 87.5, "or"),
+    (15.5, 20.5, 72.5, 80.5, "mr"),
+    (8.0, 37.0, 68.0, 97.0, "hi"),
+]
+
+# Indian region name fragments (lower case), checked in order; other regions get IN_DEFAULT_LANG
+IN_REGION_LANGS = [
+    ("andhra", "te"), ("telangana", "te"), ("tamil", "ta"), ("west bengal", "bn"),
+    ("gujarat", "gu"), ("kerala", "ml"), ("karnataka", "kn"), ("odisha", "or"),
+    ("maharashtra", "mr"),
+]
+IN_DEFAULT_LANG = "hi"
+COUNTRY_LANGS = {"ES": "es", "FR": "fr", "CN": "zh", "VN": "vi", "ID": "id", "TH": "th"}
+
+
+class RegionIndex:
+    """Bounding boxes bucketed by grid cell; each cell keeps the boxes overlapping it in
+    priority order."""
+
+    def __init__(self, boxes, cell=GRID_DEGREES):
+        self.cell = cell
+        self.boxes = list(boxes)
+        self.cells = {}
+        for priority, (lat0, lat1, lon0, lon1, _) in enumerate(self.boxes):
+            for i in range(math.floor(lat0 / cell), math.floor(lat1 / cell) + 1):
+                for j in range(math.floor(lon0 / cell), math.floor(lon1 / cell) + 1):
+                    self.cells.setdefault((i, j), []).append(priority)
+        self.cells = {key: tuple(self.boxes[p] for p in sorted(ps)) for key, ps in self.cells.items()}
+
+    def lookup(self, lat, lon):
+        for lat0, lat1, lon0, lon1, value in self.cells.get((math.floor(lat / self.cell), math.floor(lon / self.cell)), ()):
+            if lat0 < lat < lat1 and lon0 < lon < lon1:
+                return value
+        return None
+
+
+class IPTable:
+    def __init__(self):
+        # version -> (starts, ends, values), starts sorted
+        self._tables = {4: ([], [], []), 6: ([], [], [])}
+        self.path = None
+
+    def __len__(self):
+        return sum(len(t[0]) for t in self._tables.values())
+
+    @staticmethod
+    def _address(value):
+        value = value.strip()
+        return ipaddress.ip_address(int(value) if value.isdigit() else value)
+
+    def load(self, path):
+        """Replace the table with the ranges in a CSV; returns the number of ranges."""
+        rows = {4: [], 6: []}
+        with open(path, newline="") as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    if "/" in row[0]:
+                        net = ipaddress.ip_network(row[0].strip(), strict=False)
+                        start, end, rest = net.network_address, net.broadcast_address, row[1:]
+                    else:
+                        start, end, rest = self._address(row[0]), self._address(row[1]), row[2:]
+                except (ValueError, IndexError):
+                    continue  # header or malformed row
+                if start.version != end.version or not rest:
+                    continue
+                country = rest[0].strip().upper()
+                region = rest[1].strip() if len(rest) > 1 else ""
+                rows[start.version].append((int(start), int(end), (country, region)))
+        for version, ranges in rows.items():
+            ranges.sort(key=lambda r: r[0])
+            self._tables[version] = ([r[0] for r in ranges], [r[1] for r in ranges], [r[2] for r in ranges])
+        self.path = path
+        _cached_lookup.cache_clear()
+        return len(self)
+
+    def lookup(self, ip):
+        """(country, region) for an address, or None."""
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        starts, ends, values = self._tables[address.version]
+        value = int(address)
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return values[i]
+        return None
+
+
+def lang_for_location(country, region):
+    if country == "IN":
+        region = (region or "").lower()
+        return next((lang for fragment, lang in IN_REGION_LANGS if fragment in region), IN_DEFAULT_LANG)
+    return COUNTRY_LANGS.get(country, DEFAULT_LANG)
+
+
+@lru_cache(maxsize=LOOKUP_CACHE_SIZE)
+def _cached_lookup(ip):
+    return IP_TABLE.lookup(ip)
+
+
+@lru_cache(maxsize=LOOKUP_CACHE_SIZE)
+def _online_lookup(ip):
+    # Raises on provider errors so failures are not cached
+    res = OUTBOUND.get("ipapi", f"/json/{ip}", params={"fields": "status,countryCode,regionName"})
+    res.raise_for_status()
+    data = res.json()
+    if data.get("status") != "success":
+        return None
+    return data.get("countryCode", ""), data.get("regionName", "")
+
+
+def online_fallback():
+    if GEOIP_ONLINE == "auto":
+        return len(IP_TABLE) == 0
+    return GEOIP_ONLINE == "1"
+
+
+def lang_for_ip(ip):
+    hit = _cached_lookup(ip)
+    if hit is None and ip and online_fallback():
+        try:
+            hit = _online_lookup(ip)
+        except Exception as e:
+            print(f"GeoIP Fallback Error: {redact(e)}")
+    return lang_for_location(*hit) if hit else DEFAULT_LANG
+
+
+def lang_for_coords(lat, lon):
+    return REGION_INDEX.lookup(float(lat), float(lon)) or DEFAULT_LANG
+
+
+REGION_INDEX = RegionIndex(REGION_BOXES)
+IP_TABLE = IPTable()
+if os.path.exists(GEOIP_CSV):
+    print(f"🌍 GeoIP table: {IP_TABLE.load(GEOIP_CSV)} ranges from {GEOIP_CSV}")
@@ -0,0 +1,197 @@
+# Shared outbound HTTP client
+#
+# Every call to an external provider goes through OUTBOUND.request(provider, ...):
+#
+#   pooling    one requests.Session per provider with a keep-alive pool of
+#              POOL_SIZE connections, so calls reuse TCP/TLS connections
+#   timeouts   per-provider (connect, read) timeouts from PROVIDERS
+#   retries    connection errors, timeouts and 5xx are retried up to the
+#              provider's "retries" (GET only unless the caller opts in), but
+#              only while its retry budget lasts: each call earns
+#              RETRY_BUDGET_RATIO of a retry, so a failing provider is not hit
+#              with a multiple of the normal traffic
+#   breaker    after "failure_threshold" consecutive failures the provider's
+#              circuit opens and calls fail at once with CircuitOpenError for
+#              "reset_seconds"; then one trial call decides whether it closes
+#   metrics    calls, failures, retries, short-circuits and latency per
+#              provider (OUTBOUND.metrics(), GET /api/admin/outbound)
+#
+# Base URLs can be pointed at local stand-in servers with AQUA_<PROVIDER>_URL
+# (see ml_core/benchmarks/bench_outbound.py).
+
+import os
+import re
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.getenv("AQUA_HTTP_POOL", "10"))
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MAX = 10.0
+RETRY_BACKOFF_SECONDS = 0.1
+
+# Query strings can carry credentials (API keys); they never go into errors we keep or log
+_QUERY = re.compile(r"\?[^\s'\")]+")
+
+
+def redact(text):
+    """``text`` with every URL query string replaced, e.g. for exception messages."""
+    return _QUERY.sub("?<redacted>", str(text))
+
+
+def _provider(name, base_url, timeout, retries, failure_threshold, reset_seconds):
+    return {
+        "base_url": os.getenv(f"AQUA_{name.upper()}_URL", base_url).rstrip("/"),
+        "timeout": timeout,
+        "retries": retries,
+        "failure_threshold": failure_threshold,
+        "reset_seconds": reset_seconds,
+    }
+
+
+PROVIDERS = {
+    "wttr": _provider("wttr", "https://wttr.in", (1.0, 2.0), 1, 5, 30),
+    "ipapi": _provider("ipapi", "http://ip-api.com", (0.5, 1.0), 0, 5, 60),
+    "gemini": _provider("gemini", "https://generativelanguage.googleapis.com", (2.0, 20.0), 0, 3, 60),
+}
+
+
+class CircuitOpenError(requests.RequestException):
+    """The provider's circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.state, self.failures = self.CLOSED, 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class _Provider:
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(config["failure_threshold"], config["reset_seconds"])
+        self.retry_tokens = RETRY_BUDGET_MAX
+        self.stats = {"calls": 0, "ok": 0, "failures": 0, "retries": 0, "short_circuited": 0,
+                      "latency_ms_total": 0.0, "latency_ms_max": 0.0, "last_error": None}
+        self._lock = threading.Lock()
+
+    def _spend_retry(self):
+        with self._lock:
+            if self.retry_tokens >= 1.0:
+                self.retry_tokens -= 1.0
+                self.stats["retries"] += 1
+                return True
+            return False
+
+    def _record(self, ok, started, error=None):
+        elapsed = (time.perf_counter() - started) * 1000.0
+        self.breaker.record(ok)
+        with self._lock:
+            self.stats["ok" if ok else "failures"] += 1
+            self.stats["latency_ms_total"] += elapsed
+            self.stats["latency_ms_max"] = max(self.stats["latency_ms_max"], elapsed)
+            if error:
+                self.stats["last_error"] = error
+
+    def request(self, method, path, retry=None, **kwargs):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.retry_tokens = min(RETRY_BUDGET_MAX, self.retry_tokens + RETRY_BUDGET_RATIO)
+        if not self.breaker.allow():
+            with self._lock:
+                self.stats["short_circuited"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        url = path if path.startswith("http") else self.config["base_url"] + path
+        kwargs.setdefault("timeout", self.config["timeout"])
+        retries = self.config["retries"] if (retry if retry is not None else method.upper() == "GET") else 0
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                res = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                if attempt < retries and self._spend_retry():
+                    attempt += 1
+                    time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+                    continue
+                self._record(False, started, f"{type(e).__name__}: {redact(e)}")
+                raise
+            if res.status_code >= 500:
+                if attempt < retries and self._spend_retry():
+                    attempt += 1
+                    time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+                    continue
+                self._record(False, started, f"HTTP {res.status_code}")
+                return res
+            self._record(True, started)
+            return res
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        done = stats["ok"] + stats["failures"]
+        stats["latency_ms_avg"] = round(stats.pop("latency_ms_total") / done, 2) if done else None
+        stats["latency_ms_max"] = round(stats["latency_ms_max"], 2)
+        stats["circuit"] = self.breaker.state
+        stats["retry_budget"] = round(self.retry_tokens, 2)
+        return stats
+
+
+class OutboundClient:
+    def __init__(self, providers=PROVIDERS):
+        self._providers = {name: _Provider(name, config) for name, config in providers.items()}
+
+    def provider(self, name):
+        return self._providers[name]
+
+    def request(self, provider, method, path, **kwargs):
+        """``requests`` call through the provider's pool, retry budget and breaker. Raises
+        CircuitOpenError (a RequestException) when the provider is failing fast."""
+        return self._providers[provider].request(method, path, **kwargs)
+
+    def get(self, provider, path, **kwargs):
+        return self.request(provider, "GET", path, **kwargs)
+
+    def post(self, provider, path, **kwargs):
+        return self.request(provider, "POST", path, **kwargs)
+
+    def metrics(self):
+        return {name: p.metrics() for name, p in self._providers.items()}
+
+
+OUTBOUND = OutboundClient()
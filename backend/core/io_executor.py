@@ -0,0 +1,68 @@
+# Background I/O executor
+#
+# Request handlers hand outbound work (weather lookups, Gemini calls) to a
+# shared thread pool instead of doing it on the worker thread:
+#
+#   IO.submit(key, fn, ...)      start fn in the pool, or join the call already
+#                                running under the same key (single flight), and
+#                                get its Future
+#   IO.call(key, fn, ..., timeout=, fallback=)
+#                                submit and wait at most ``timeout`` seconds; on
+#                                timeout or error return ``fallback`` (the call
+#                                keeps running and later joiners still share it)
+#
+# Pool size: AQUA_IO_WORKERS (default 16). Counters are in IO.stats.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+IO_WORKERS = int(os.getenv("AQUA_IO_WORKERS", "16"))
+
+
+class IOExecutor:
+    def __init__(self, workers=IO_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aqua-io")
+        self._flights = {}
+        # Re-entrant: a Future that is already done runs its callback inside submit()
+        self._lock = threading.RLock()
+        self.stats = {"submitted": 0, "joined": 0, "timeouts": 0, "errors": 0}
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.stats["joined"] += 1
+                return future
+            future = self._pool.submit(fn, *args, **kwargs)
+            self._flights[key] = future
+            self.stats["submitted"] += 1
+            future.add_done_callback(lambda f: self._landed(key, f))
+            return future
+
+    def _landed(self, key, future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def in_flight(self, key=None):
+        with self._lock:
+            return key in self._flights if key is not None else len(self._flights)
+
+    def call(self, key, fn, *args, timeout, fallback=None, **kwargs):
+        """fn's result if it lands within ``timeout`` seconds, else ``fallback``."""
+        future = self.submit(key, fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            return fallback
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            print(f"⚠️  [IO] {key}: {e}")
+            return fallback
+
+
+IO = IOExecutor()
@@ -0,0 +1,146 @@
+# Aho-Corasick keyword automaton
+#
+# Finds every keyword occurring in a text in one left-to-right pass, however
+# many keywords there are. Each keyword carries one or more tags (any sortable
+# value); find(text) returns the tags of all keywords found and first(*texts)
+# the smallest tag, which lets callers encode "first match in priority order".
+#
+# The keywords given to the constructor are linked in one breadth-first pass.
+# add() after that extends the trie in place and links only what the new
+# keyword changes: failure links of its new nodes, existing nodes whose longest
+# suffix in the trie is now one of those nodes, and the outputs of the nodes
+# whose failure chain passes through them. Nodes keep the reverse failure links
+# (_fail_in) so those can be found without walking the whole trie.
+
+import threading
+from collections import deque
+
+
+class KeywordAutomaton:
+    def __init__(self, keywords=()):
+        self._goto = [{}]       # node -> {char: node}
+        self._fail = [0]
+        self._fail_in = [set()] # node -> nodes whose failure link points at it
+        self._own = [()]        # tags of the keywords ending at each node
+        self._out = [()]        # own tags plus those of every suffix keyword
+        self._lock = threading.Lock()
+        self.keywords = 0
+        with self._lock:
+            for keyword, tag in keywords:
+                if keyword:
+                    self._insert(keyword, tag)
+            self._relink()
+
+    def add(self, keyword, tag):
+        """Register ``keyword`` (non-empty) under ``tag``."""
+        if not keyword:
+            return
+        with self._lock:
+            path, first_new, tagged = self._insert(keyword, tag)
+            for depth in range(first_new, len(keyword)):
+                self._link(path[depth], path[depth + 1], keyword[depth])
+            if tagged and first_new == len(keyword):
+                self._propagate(path[-1])   # only a new tag on an existing node
+
+    def _insert(self, keyword, tag):
+        """Walk / extend the trie along ``keyword``; returns the nodes on the path
+        (root first), the depth of its first new node and whether ``tag`` was new."""
+        path = [0]
+        first_new = len(keyword)
+        for depth, ch in enumerate(keyword):
+            node = path[-1]
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                first_new = min(first_new, depth)
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._fail_in.append(set())
+                self._own.append(())
+                self._out.append(())
+                self._goto[node][ch] = nxt
+            path.append(nxt)
+        node = path[-1]
+        if tag in self._own[node]:
+            return path, first_new, False
+        if not self._own[node]:
+            self.keywords += 1
+        self._own[node] += (tag,)
+        return path, first_new, True
+
+    def _link(self, parent, node, ch):
+        """Link ``node``, just added as ``parent``'s ``ch`` child."""
+        goto, fail, fail_in = self._goto, self._fail, self._fail_in
+        f = 0
+        if parent:
+            f = fail[parent]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            f = goto[f].get(ch, 0)
+        # Nodes whose failure chain reaches ``parent`` before any node with a ``ch``
+        # edge used to fail over to a shorter suffix; their ``ch`` children now fail
+        # to ``node``
+        stack = [n for n in fail_in[parent] if n != node]
+        while stack:
+            n = stack.pop()
+            child = goto[n].get(ch)
+            if child is None:
+                stack.extend(fail_in[n])
+            elif child != node:
+                fail_in[fail[child]].discard(child)
+                fail[child] = node
+                fail_in[node].add(child)
+        fail[node] = f
+        fail_in[f].add(node)
+        self._propagate(node)
+
+    def _propagate(self, root):
+        """Recompute outputs of ``root`` and of every node failing over to it."""
+        fail, fail_in, own, out = self._fail, self._fail_in, self._own, self._out
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            f = fail[node]
+            out[node] = own[node] + out[f] if node and out[f] else own[node]
+            queue.extend(fail_in[node])
+
+    def _relink(self):
+        goto, fail, own, out = self._goto, self._fail, self._own, self._out
+        fail_in = self._fail_in = [set() for _ in goto]
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            fail_in[0].add(child)
+            out[child] = own[child]
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[child] = f
+                fail_in[f].add(child)
+                out[child] = own[child] + out[f] if out[f] else own[child]
+                queue.append(child)
+
+    def find(self, text):
+        """Tags of all keywords occurring in ``text`` (with repeats)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.extend(out[node])
+        return found
+
+    def first(self, *texts):
+        """Smallest tag of any keyword occurring in any of ``texts``, or None."""
+        return min((tag for text in texts if text for tag in self.find(text)), default=None)
+
+    def __len__(self):
+        return self.keywords
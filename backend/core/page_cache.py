@@ -0,0 +1,116 @@
+# Full-page cache for anonymous GET pages
+#
+# Views decorated with @cached_page() are rendered once per
+# (path, language, ASSET_VERSION) for logged-out visitors and replayed from
+# memory until PAGE_CACHE_TTL expires or the cache is purged
+# (PAGE_CACHE.purge(), POST /api/admin/page-cache/purge, or a settings save).
+#
+# The cache is bypassed for anyone with a user or role in their session, for
+# sessions holding flashed messages, and for requests with query arguments
+# other than ``lang``. get_trans() still runs on hits so the session's language
+# handling (?lang=xx, auto mode) behaves exactly as when the view renders.
+# Responses carry X-Page-Cache: HIT / MISS.
+
+import os
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import request, session, make_response
+from core.auth_utils import get_trans
+
+PAGE_CACHE_TTL = int(os.getenv("AQUA_PAGE_CACHE_TTL", "300"))
+PAGE_CACHE_MAX_ENTRIES = 512
+# Part of every key so a deploy with new static assets never serves old markup
+ASSET_VERSION = os.getenv("AQUA_ASSET_VERSION", str(int(time.time())))
+
+BYPASS_SESSION_KEYS = ("user", "role", "_flashes")
+
+
+class PageCache:
+    def __init__(self, ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # (path, lang, asset version) -> (body, status, headers, stored_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0}
+
+    def get(self, key):
+        """The cached (body, status, headers, stored_at) for ``key``, counted as a hit,
+        or None (a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[3] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def bypass(self):
+        """Count a request the cache was not consulted for."""
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def put(self, key, response):
+        entry = (response.get_data(), response.status_code,
+                 [(k, v) for k, v in response.headers.items() if k.lower() in ("content-type", "content-language")],
+                 time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge(self, path=None, lang=None):
+        """Drop cached pages (all, or those matching path and/or lang); returns how many."""
+        with self._lock:
+            doomed = [k for k in self._entries
+                      if (path is None or k[0] == path) and (lang is None or k[1] == lang)]
+            for k in doomed:
+                del self._entries[k]
+            return len(doomed)
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+PAGE_CACHE = PageCache()
+
+
+def _cacheable():
+    if request.method != "GET" or any(k != "lang" for k in request.args):
+        return False
+    return not any(k in session for k in BYPASS_SESSION_KEYS)
+
+
+def cached_page(cache=PAGE_CACHE):
+    """Serve the view's 200 responses to anonymous visitors from ``cache``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable():
+                cache.bypass()
+                return view(*args, **kwargs)
+            _, lang = get_trans()
+            key = (request.path, lang, ASSET_VERSION)
+            entry = cache.get(key)
+            if entry is not None:
+                body, status, headers, _ = entry
+                response = make_response(body, status, headers)
+                response.headers["X-Page-Cache"] = "HIT"
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                cache.put(key, response)
+            response.headers["X-Page-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
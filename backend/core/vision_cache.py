@@ -0,0 +1,195 @@
+# Perceptual-hash result cache for vision analysis
+#
+# Farmers re-upload the same (or a re-compressed, slightly cropped or
+# re-lit) photo of the same pond or animal. Analyses that came from the image
+# itself (the in-process classifier or Gemini) are stored under a 64-bit dHash
+# of the picture, and any later upload within HASH_DISTANCE bits of a stored
+# hash gets that diagnosis back without another model pass or Gemini call.
+#
+#   dhash(pixels)         8x8 gradient-sign hash of a block-averaged grayscale
+#                         thumbnail (NumPy only)
+#   VisionCache           LRU of hash -> result with a TTL
+#                         (AQUA_VISION_CACHE_TTL seconds, AQUA_VISION_CACHE_MAX
+#                         entries). The dHashes live in a fixed uint64 slot array
+#                         so a near lookup is one vectorized XOR + popcount
+#                         (np.bitwise_count, or a byte table on NumPy 1.x) over
+#                         every slot (about 17 us at 4096 entries, faster than a
+#                         banded multi-index at these sizes). Counters (exact /
+#                         near hits, misses, evictions, expired, hit_rate) come
+#                         from VISION_CACHE.metrics().
+#
+# When no image decoder is available (TensorFlow missing) the key falls back
+# to a hash of the encoded bytes, which only matches byte-identical uploads.
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from ml_core.vision_service import decode_image
+
+VISION_CACHE_TTL = int(os.getenv("AQUA_VISION_CACHE_TTL", str(6 * 3600)))
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("AQUA_VISION_CACHE_MAX", "4096"))
+# Largest Hamming distance between dHashes still treated as the same photo
+HASH_DISTANCE = int(os.getenv("AQUA_VISION_HASH_DISTANCE", "6"))
+HASH_BITS = 64
+# Images are decimated to about this many pixels a side before hashing
+THUMB_SIDE = 256
+
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Set bits per byte, for NumPy < 2.0 (no np.bitwise_count; TensorFlow before 2.18
+# needs NumPy 1.x)
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_table(words):
+    return _POPCOUNT8[words.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+popcount = getattr(np, "bitwise_count", _popcount_table)
+
+
+def dhash(pixels):
+    """64-bit difference hash of uint8 HxW[xC] pixels."""
+    if pixels.ndim == 3:
+        step = max(1, max(pixels.shape[:2]) // THUMB_SIDE)
+        gray = pixels[::step, ::step, :3].astype(np.float32) @ _LUMA[:pixels.shape[2]]
+    else:
+        step = max(1, max(pixels.shape) // THUMB_SIDE)
+        gray = pixels[::step, ::step].astype(np.float32)
+    # Block means on a 8 x 9 grid, then compare horizontal neighbours
+    rows = np.linspace(0, gray.shape[0], 9).astype(np.intp)
+    cols = np.linspace(0, gray.shape[1], 10).astype(np.intp)
+    if np.any(np.diff(rows) == 0) or np.any(np.diff(cols) == 0):
+        raise ValueError("image too small to hash")
+    sums = np.add.reduceat(np.add.reduceat(gray, rows[:-1], axis=0), cols[:-1], axis=1)
+    means = sums / np.outer(np.diff(rows), np.diff(cols))
+    bits = (means[:, 1:] > means[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def image_key(image_bytes, pixels=None):
+    """("dhash", int) from the pixels (decoded here if not given), or ("sha1", int)
+    from the bytes when they can't be decoded."""
+    if pixels is None:
+        pixels = try_decode(image_bytes)
+    if pixels is not None:
+        try:
+            return "dhash", dhash(pixels)
+        except ValueError:
+            pass
+    return "sha1", int.from_bytes(hashlib.sha1(image_bytes).digest()[:8], "big")
+
+
+_decoder_missing = False
+
+
+def try_decode(image_bytes):
+    """Decoded pixels, or None if the bytes (or the decoder) are unusable."""
+    global _decoder_missing
+    if _decoder_missing:
+        return None
+    try:
+        return decode_image(image_bytes)
+    except ImportError:
+        _decoder_missing = True
+    except Exception:
+        pass
+    return None
+
+
+class VisionCache:
+    def __init__(self, ttl=VISION_CACHE_TTL, max_entries=VISION_CACHE_MAX_ENTRIES, distance=HASH_DISTANCE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.distance = distance
+        self._entries = OrderedDict()   # (kind, hash) -> (result, stored_at, slot)
+        # dHash slot array for near lookups; _used masks out free slots
+        self._hashes = np.zeros(max_entries, dtype=np.uint64)
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._owners = [None] * max_entries
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _drop(self, key):
+        slot = self._entries.pop(key)[2]
+        if slot is not None:
+            self._used[slot] = False
+            self._owners[slot] = None
+            self._free.append(slot)
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] >= self.ttl:
+            self._drop(key)
+            self.stats["expired"] += 1
+            return None
+        return entry
+
+    def _nearest(self, h, now):
+        # Closest live dHash within distance, expiring stale ones on the way
+        if not self._used.any():
+            return None
+        dist = popcount(self._hashes ^ np.uint64(h))
+        close = np.flatnonzero((dist <= self.distance) & self._used)
+        for slot in close[np.argsort(dist[close], kind="stable")]:
+            key = self._owners[slot]
+            if self._live(key, now) is not None:
+                return key
+        return None
+
+    def get(self, key):
+        """The cached result for an image key (exact, or the nearest dHash within
+        ``distance`` bits), or None."""
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                self.stats["exact_hits"] += 1
+            elif key[0] == "dhash" and self.distance > 0 and (near := self._nearest(key[1], now)):
+                self.stats["near_hits"] += 1
+                key = near
+            else:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, result):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            slot = None
+            if key[0] == "dhash":
+                slot = self._free.pop()
+                self._hashes[slot] = key[1]
+                self._used[slot] = True
+                self._owners[slot] = key
+            self._entries[key] = (result, time.time(), slot)
+
+    def clear(self):
+        with self._lock:
+            n = len(self._entries)
+            for key in list(self._entries):
+                self._drop(key)
+            return n
+
+    def metrics(self):
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["near_hits"]
+            lookups = hits + self.stats["misses"]
+            return dict(self.stats, entries=len(self._entries),
+                        hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+VISION_CACHE = VisionCache()
@@ -0,0 +1,271 @@
+# Gemini vision job queue
+#
+# Gemini calls no longer run on the request that needs them. An image is
+# queued as a job and a small pool of workers (AQUA_GEMINI_WORKERS) drains the
+# queue, each call first taking a token from a shared token bucket
+# (AQUA_GEMINI_RATE calls per second, bursts of AQUA_GEMINI_BURST) so the
+# process as a whole stays under the provider's rate limit. A 429 from the
+# provider empties the bucket for its Retry-After and re-queues the job (up to
+# MAX_ATTEMPTS tries).
+#
+#   VISION_JOBS.submit(mime_type, b64, key=, on_done=)   job id; a live job
+#                                     with the same key is reused, so identical
+#                                     uploads share one call
+#   VISION_JOBS.get(job_id) / wait(job_id, timeout)   the job's public view
+#                                     (queued / running / done / failed, result)
+#
+# Finished jobs are kept for JOB_TTL seconds for polling
+# (GET /api/vision/jobs/<id>, with ?wait= to long-poll). The provider is
+# pluggable: Gemini's REST API by default, or a local stand-in
+# (AQUA_GEMINI_PROVIDER=standin, AQUA_GEMINI_STANDIN_LATENCY seconds) for
+# tests and offline demos.
+#
+# The API key travels in the x-goog-api-key header, never in the URL, and a
+# failed job records only the exception type and HTTP status: job views are
+# served to anyone holding the job id.
+
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import threading
+from core.http_client import OUTBOUND
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+GEMINI_RATE = float(os.getenv("AQUA_GEMINI_RATE", "1"))
+GEMINI_BURST = int(os.getenv("AQUA_GEMINI_BURST", "5"))
+GEMINI_WORKERS = int(os.getenv("AQUA_GEMINI_WORKERS", "4"))
+MAX_QUEUED = int(os.getenv("AQUA_GEMINI_MAX_QUEUED", "256"))
+JOB_TTL = int(os.getenv("AQUA_VISION_JOB_TTL", "900"))
+MAX_ATTEMPTS = 3
+
+GEMINI_PROMPT = """
+            You are an expert aquaculture pathologist. Analyze this image of an aquatic organism (e.g. shrimp, prawn, fish, crab) or pond water.
+            Return ONLY a valid JSON object with the following structure (no markdown tags, no code blocks):
+            {
+                "type": "Name of the organism or water issue",
+                "disease": "Name of the disease or condition detected (or 'Healthy' if none)",
+                "severity": "CRITICAL THREAT, HIGH RISK, WARNING, MONITORING, or SECURE",
+                "desc": "A detailed description of the symptoms or condition and actionable solutions."
+            }
+            """
+
+
+class RateLimited(RuntimeError):
+    def __init__(self, retry_after):
+        super().__init__(f"provider rate limit, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def public_error(e):
+    """What a failed job reports: the exception type and HTTP status, never the
+    message (which can carry the request URL)."""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if isinstance(e, RateLimited):
+        status = 429
+    return f"{type(e).__name__} (HTTP {status})" if status else type(e).__name__
+
+
+class GeminiProvider:
+    """Gemini REST generateContent through the shared outbound client (pooled,
+    circuit-broken). Returns the verdict dict, or None if the reply has no JSON."""
+
+    def available(self):
+        return bool(os.environ.get("GEMINI_API_KEY"))
+
+    def __call__(self, mime_type, b64_str):
+        res = OUTBOUND.post("gemini", f"/v1beta/models/{GEMINI_MODEL}:generateContent",
+                            headers={"x-goog-api-key": os.environ.get("GEMINI_API_KEY")},
+                            json={"contents": [{"parts": [
+                                {"text": GEMINI_PROMPT},
+                                {"inline_data": {"mime_type": mime_type, "data": b64_str}}
+                            ]}]})
+        if res.status_code == 429:
+            raise RateLimited(float(res.headers.get("Retry-After") or 5))
+        res.raise_for_status()
+        response_text = res.json()["candidates"][0]["content"]["parts"][0]["text"]
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        return json.loads(match.group(0)) if match else None
+
+
+class StandInProvider:
+    """Answers every image with a fixed verdict after ``latency`` seconds."""
+
+    VERDICT = {"type": "Vannamei Shrimp", "disease": "Healthy", "severity": "SECURE",
+               "desc": "Stand-in verdict (AQUA_GEMINI_PROVIDER=standin)."}
+
+    def __init__(self, latency=0.5, verdict=None):
+        self.latency = latency
+        self.verdict = verdict or self.VERDICT
+        self.calls = 0
+
+    def available(self):
+        return True
+
+    def __call__(self, mime_type, b64_str):
+        self.calls += 1
+        time.sleep(self.latency)
+        return dict(self.verdict)
+
+
+class TokenBucket:
+    def __init__(self, rate=GEMINI_RATE, burst=GEMINI_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self, seconds):
+        """No tokens for the next ``seconds`` (the provider told us to back off)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class VisionJobQueue:
+    def __init__(self, provider=None, workers=GEMINI_WORKERS, rate=GEMINI_RATE, burst=GEMINI_BURST,
+                 max_queued=MAX_QUEUED, ttl=JOB_TTL):
+        self.provider = provider or GeminiProvider()
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._queue = queue.Queue()
+        self._jobs = {}         # job id -> job record
+        self._by_key = {}       # dedupe key -> job id
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {"submitted": 0, "deduped": 0, "done": 0, "failed": 0, "retried": 0,
+                      "rejected": 0, "throttled_seconds": 0.0}
+
+    def available(self):
+        return self.provider.available()
+
+    def _start(self):
+        for i in range(self.workers):
+            threading.Thread(target=self._run, name=f"aqua-gemini-{i}", daemon=True).start()
+        self._started = True
+
+    def _expire(self, now):
+        for job_id in [j for j, job in self._jobs.items() if job["finished_at"] and now - job["finished_at"] > self.ttl]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job["key"]) == job_id:
+                del self._by_key[job["key"]]
+
+    def submit(self, mime_type, b64_str, key=None, on_done=None):
+        """Queue an image; returns the job id (an existing one for a live job with the
+        same key). ``on_done(result)`` runs on the worker when a result lands."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            job_id = self._by_key.get(key) if key else None
+            if job_id is not None and self._jobs[job_id]["status"] != "failed":
+                self.stats["deduped"] += 1
+                return job_id
+            if self._queue.qsize() >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"{self.max_queued} Gemini jobs already queued")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id, "key": key, "status": "queued", "result": None, "error": None,
+                "attempts": 0, "queued_at": now, "finished_at": None,
+                "mime_type": mime_type, "b64": b64_str, "on_done": on_done, "event": threading.Event(),
+            }
+            if key:
+                self._by_key[key] = job_id
+            self.stats["submitted"] += 1
+            if not self._started:
+                self._start()
+        self._queue.put(job_id)
+        return job_id
+
+    def _run(self):
+        while True:
+            job = self._jobs.get(self._queue.get())
+            if job is None:
+                continue
+            self.stats["throttled_seconds"] += self.bucket.acquire()
+            job["status"] = "running"
+            job["attempts"] += 1
+            try:
+                result = self.provider(job["mime_type"], job["b64"])
+            except RateLimited as e:
+                self.bucket.drain(e.retry_after)
+                if job["attempts"] < MAX_ATTEMPTS:
+                    self.stats["retried"] += 1
+                    job["status"] = "queued"
+                    self._queue.put(job["id"])
+                    continue
+                self._finish(job, "failed", error=public_error(e))
+                continue
+            except Exception as e:
+                print(f"Gemini API Error: {public_error(e)}")
+                self._finish(job, "failed", error=public_error(e))
+                continue
+            self._finish(job, "done", result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        job.update(status=status, result=result, error=error, finished_at=time.time(), b64=None)
+        self.stats[status] += 1
+        on_done = job.pop("on_done", None)
+        job["event"].set()
+        if on_done and result:
+            try:
+                on_done(result)
+            except Exception as e:
+                print(f"⚠️  [VISION JOBS] on_done for {job['id']}: {e}")
+
+    @staticmethod
+    def _view(job):
+        return {"job_id": job["id"], "status": job["status"], "result": job["result"], "error": job["error"],
+                "attempts": job["attempts"], "queued_at": job["queued_at"], "finished_at": job["finished_at"]}
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return self._view(job) if job else None
+
+    def wait(self, job_id, timeout):
+        """The job's view once it finishes or ``timeout`` seconds pass (None if unknown)."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job["event"].wait(timeout)
+        return self._view(job)
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, queued=self._queue.qsize(), jobs=len(self._jobs),
+                        throttled_seconds=round(self.stats["throttled_seconds"], 2))
+
+
+def _provider_from_env():
+    if os.getenv("AQUA_GEMINI_PROVIDER", "gemini") == "standin":
+        return StandInProvider(float(os.getenv("AQUA_GEMINI_STANDIN_LATENCY", "0.5")))
+    return GeminiProvider()
+
+
+VISION_JOBS = VisionJobQueue(_provider_from_env())
@@ -0,0 +1,192 @@
+# Shared weather cache
+#
+# Requests never wait on the weather provider. Lookups are keyed by a location
+# bucket (normalised place name, or lat/lon snapped to a GRID_DEGREES grid) and
+# answered from memory:
+#
+#   fresh  (younger than TTL_SECONDS)         returned as is
+#   stale  (younger than MAX_STALE_SECONDS)   returned, refreshed in the background
+#   missing / expired                         fetched in the background; None
+#                                             (callers use their fallback) unless
+#                                             the fetch lands within ``wait``
+#
+# Fetches run on the shared I/O executor (core/io_executor.py) with one flight
+# per bucket, so concurrent requests for the same city share a single provider
+# call, and a bucket whose provider call failed is not retried for
+# FAILURE_BACKOFF_SECONDS. The provider is
+# pluggable: wttr.in by default, or a JSON file (AQUA_WEATHER_PROVIDER=file,
+# AQUA_WEATHER_FILE=path) for tests and offline demos.
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import quote
+from core.http_client import OUTBOUND, redact
+from core.io_executor import IO
+
+TTL_SECONDS = int(os.getenv("AQUA_WEATHER_TTL", "900"))
+MAX_STALE_SECONDS = int(os.getenv("AQUA_WEATHER_MAX_STALE", "21600"))
+FAILURE_BACKOFF_SECONDS = int(os.getenv("AQUA_WEATHER_BACKOFF", "120"))
+GRID_DEGREES = float(os.getenv("AQUA_WEATHER_GRID", "0.25"))
+MAX_ENTRIES = 2048
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "weather_fixture.json")
+
+
+def parse_wttr(text):
+    """'+28°C Clear' -> {"temp_c": 28.0, "condition": "Clear", "text": "+28°C Clear"}"""
+    text = text.strip()
+    if "°C" not in text:
+        raise ValueError(f"Unexpected weather response: {text!r}")
+    temp, condition = text.split("°C", 1)
+    return {"temp_c": float(temp.replace("+", "").strip()), "condition": condition.strip() or "Unknown", "text": text}
+
+
+class WttrProvider:
+    """wttr.in one-line format (through the shared outbound client); raises on network
+    errors, an open circuit and bad responses."""
+
+    def __call__(self, query):
+        res = OUTBOUND.get("wttr", f"/{quote(query)}?format=%t+%C")
+        if res.status_code != 200:
+            raise RuntimeError(f"wttr.in returned HTTP {res.status_code}")
+        res.encoding = "utf-8"
+        return parse_wttr(res.text)
+
+
+class FileProvider:
+    """Readings from a JSON file of bucket -> "+28°C Clear" (or {"temp_c", "condition"}),
+    with an optional "*" entry for every other bucket. Re-read when the file changes."""
+
+    def __init__(self, path=DEFAULT_FILE):
+        self.path = path
+        self._mtime = None
+        self._data = {}
+
+    def __call__(self, query):
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                self._data = {bucket_key(k) if k != "*" else k: v for k, v in json.load(f).items()}
+            self._mtime = mtime
+        entry = self._data.get(bucket_key(query), self._data.get("*"))
+        if entry is None:
+            raise KeyError(f"No weather for {query!r} in {self.path}")
+        if isinstance(entry, str):
+            return parse_wttr(entry)
+        return {"temp_c": float(entry["temp_c"]), "condition": entry.get("condition", "Unknown"),
+                "text": entry.get("text", f"{entry['temp_c']:+g}°C {entry.get('condition', '')}".strip())}
+
+
+def bucket_key(location=None, lat=None, lon=None):
+    """Cache key shared by nearby requests: "lat,lon" on the grid, else the folded place name."""
+    if lat is not None and lon is not None:
+        snap = lambda v: round(round(float(v) / GRID_DEGREES) * GRID_DEGREES, 4)  # noqa: E731
+        return f"{snap(lat)},{snap(lon)}"
+    return " ".join(str(location or "").split()).casefold()
+
+
+class WeatherCache:
+    def __init__(self, provider=None, ttl=TTL_SECONDS, max_stale=MAX_STALE_SECONDS,
+                 backoff=FAILURE_BACKOFF_SECONDS, max_entries=MAX_ENTRIES):
+        self.provider = provider or WttrProvider()
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.backoff = backoff
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (reading, fetched_at)
+        self._inflight = {}             # key -> Future of the running fetch
+        self._failed = {}               # key -> time of the last failed fetch
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "fetched": 0, "failed": 0}
+
+    def get(self, location=None, lat=None, lon=None, wait=0.0):
+        """Cached reading for a location ({"temp_c", "condition", "text", "age"}), or None
+        when nothing usable is cached. On a miss, waits up to ``wait`` seconds for the
+        (shared) fetch; it never waits longer than that on the provider."""
+        key = bucket_key(location, lat, lon)
+        if not key:
+            return None
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                reading, fetched_at = hit
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.stats["fresh"] += 1
+                    return dict(reading, age=round(age, 1))
+                if age < self.max_stale:
+                    self.stats["stale"] += 1
+                    self._schedule(key, now)
+                    return dict(reading, age=round(age, 1), stale=True)
+            self.stats["miss"] += 1
+            future = self._schedule(key, now)
+        if wait > 0 and future is not None:
+            try:
+                reading = future.result(timeout=wait)
+            except FutureTimeout:
+                return None
+            return dict(reading, age=0.0) if reading else None
+        return None
+
+    def _schedule(self, key, now):
+        # Caller holds the lock; returns the running fetch, or None while backing off
+        if key in self._inflight:
+            return self._inflight[key]
+        if now - self._failed.get(key, 0) < self.backoff:
+            return None
+        future = IO.submit(f"weather:{id(self)}:{key}", self._refresh, key)
+        self._inflight[key] = future
+        return future
+
+    def _refresh(self, key):
+        try:
+            reading = self.provider(key)
+        except Exception as e:
+            with self._lock:
+                self._failed[key] = time.time()
+                self.stats["failed"] += 1
+            print(f"⚠️  [WEATHER] {key}: {redact(e)}")
+            return None
+        else:
+            with self._lock:
+                self._entries[key] = (reading, time.time())
+                self._entries.move_to_end(key)
+                self._failed.pop(key, None)
+                self.stats["fetched"] += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return reading
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def prefetch(self, *locations):
+        """Start background fetches so the first requests find the cache warm."""
+        with self._lock:
+            now = time.time()
+            for location in locations:
+                if bucket_key(location) not in self._entries:
+                    self._schedule(bucket_key(location), now)
+
+    def wait_idle(self, timeout=10.0):
+        """Block until no refresh is in flight (CLI and benchmarks)."""
+        deadline = time.time() + timeout
+        while self._inflight and time.time() < deadline:
+            time.sleep(0.01)
+        return not self._inflight
+
+
+def _provider_from_env():
+    kind = os.getenv("AQUA_WEATHER_PROVIDER", "wttr")
+    if kind == "file":
+        return FileProvider(os.getenv("AQUA_WEATHER_FILE", DEFAULT_FILE))
+    return WttrProvider()
+
+
+WEATHER = WeatherCache(_provider_from_env())
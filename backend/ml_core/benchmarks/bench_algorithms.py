@@ -0,0 +1,126 @@
+# Training / inference benchmark for the custom hybrid algorithms
+# ===============================================================
+#
+# Compares the old serial configuration (n_jobs=1, components fitted one after
+# the other, two sklearn predict calls) with the parallel/fused one, plus the
+# histogram boosting backend for ADER. Runs on the bundled 10k-row datasets and
+# on a synthetic dataset --scale times larger (resampled rows with jitter).
+#
+#   python ml_core/benchmarks/bench_algorithms.py              # 10k + 100x (1M rows)
+#   python ml_core/benchmarks/bench_algorithms.py --scale 10 --json out.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "training"))
+from custom_algorithms import ADER, ASER, AMPRO  # noqa: E402
+
+DATASET_DIR = os.path.join(BASE_DIR, "datasets")
+
+# name -> (estimator class, csv, feature columns, target columns)
+CASES = {
+    "ADER/yield": (ADER, "yield.csv", ["Species", "Pond_Area", "Feed_Used", "Culture_Days"], ["Expected_Yield"]),
+    "ASER/stocking": (ASER, "stocking.csv", ["Species", "Pond_Area", "Soil_Type", "Water_Source", "Season"],
+                      ["Recommended_Stocking", "Survival_Rate"]),
+    "AMPRO/buyer": (AMPRO, "buyer.csv", ["Target_Country", "Species", "Required_Quantity", "Quality_Grade"],
+                    ["Price_Offered"]),
+}
+
+CONFIGS = {
+    "serial": {"n_jobs": 1, "fused": False},
+    "parallel": {"n_jobs": -1, "fused": True},
+}
+
+
+def load_case(csv, features, targets):
+    df = pd.read_csv(os.path.join(DATASET_DIR, csv), usecols=features + targets)
+    X = np.column_stack([
+        df[c].to_numpy() if pd.api.types.is_numeric_dtype(df[c]) else df[c].astype("category").cat.codes.to_numpy()
+        for c in features
+    ]).astype(np.float64)
+    y = df[targets].to_numpy(dtype=np.float64)
+    return X, (y.ravel() if y.shape[1] == 1 else y)
+
+
+def upscale(X, y, factor, seed=0):
+    """Resample rows with replacement and jitter continuous columns by 1%."""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(X), size=len(X) * factor)
+    Xs = X[idx].copy()
+    for j in range(X.shape[1]):
+        if len(np.unique(X[:, j])) > 50:
+            Xs[:, j] *= rng.normal(1.0, 0.01, size=len(Xs))
+    return Xs, y[idx]
+
+
+def time_it(fn, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def single_row_latency_us(model, X, n=200):
+    rows = X[:n]
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        model.predict(rows[i:i + 1])
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples) * 1e6)
+
+
+def run_case(name, cls, X, y, label):
+    results = []
+    configs = dict(CONFIGS)
+    if cls is ADER:
+        configs["parallel+hist"] = {"n_jobs": -1, "fused": True, "gb_backend": "hist"}
+    for cfg_name, params in configs.items():
+        model = cls(**params)
+        fit_s = time_it(lambda: model.fit(X, y))
+        batch_s = time_it(lambda: model.predict(X), repeat=3)
+        row = {
+            "case": name, "data": label, "rows": len(X), "config": cfg_name,
+            "fit_s": round(fit_s, 3),
+            "batch_predict_s": round(batch_s, 4),
+            "batch_rows_per_s": int(len(X) / batch_s),
+            "single_row_us": round(single_row_latency_us(model, X), 1),
+        }
+        results.append(row)
+        print(f"{name:15s} {label:10s} {cfg_name:14s} fit={row['fit_s']:8.3f}s "
+              f"batch={row['batch_predict_s']:8.4f}s ({row['batch_rows_per_s']:>9d} rows/s) "
+              f"single={row['single_row_us']:8.1f}us")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training and inference benchmark for the custom hybrid algorithms.")
+    parser.add_argument("--scale", type=int, default=100, help="Synthetic dataset size multiplier (0 to skip)")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.cases:
+        cls, csv, features, targets = CASES[name]
+        X, y = load_case(csv, features, targets)
+        results += run_case(name, cls, X, y, "10k")
+        if args.scale > 1:
+            Xs, ys = upscale(X, y, args.scale)
+            results += run_case(name, cls, Xs, ys, f"{args.scale}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# APDC calibration benchmark: per-fold vs collapsed
+# ================================================
+#
+# Compares the default APDC (CalibratedClassifierCV with three fold forests and
+# three sigmoids) against collapsed=True (one forest + a calibration lookup
+# table) on the Disease_Risk target of disease.csv (Disease_Type is the same
+# split under another name). Reports fit time, single-row and batch predict_proba
+# latency, how far the collapsed probabilities are from the current ones, and
+# Brier score / log loss / expected calibration error of both on a 20% holdout.
+#
+#   python ml_core/benchmarks/bench_calibration.py
+#   python ml_core/benchmarks/bench_calibration.py --scale 20 --json out.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "training"))
+from custom_algorithms import APDC  # noqa: E402
+
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "disease.csv")
+FEATURES = ["Water_Temp", "pH", "DO", "Salinity", "Turbidity"]
+TARGETS = ["Disease_Risk"]
+
+CONFIGS = {
+    "per-fold": {"collapsed": False},
+    "collapsed": {"collapsed": True},
+}
+
+
+def load(target, scale, seed=0):
+    df = pd.read_csv(DATASET_PATH, usecols=FEATURES + [target])
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df[target].to_numpy()
+    if scale > 1:
+        # Resample rows with 1% jitter on the measurements
+        rng = np.random.default_rng(seed)
+        idx = rng.integers(0, len(X), size=len(X) * scale)
+        X, y = X[idx] * rng.normal(1.0, 0.01, size=(len(idx), X.shape[1])), y[idx]
+    return X, y
+
+
+def split(X, y, holdout=0.2, seed=0):
+    idx = np.random.default_rng(seed).permutation(len(X))
+    cut = int(len(X) * (1 - holdout))
+    return X[idx[:cut]], y[idx[:cut]], X[idx[cut:]], y[idx[cut:]]
+
+
+def calibration_scores(proba, y, classes):
+    onehot = (y[:, None] == classes[None, :]).astype(np.float64)
+    brier = float(np.mean(np.sum((proba - onehot) ** 2, axis=1)))
+    log_loss = float(-np.mean(np.log(np.clip(np.sum(proba * onehot, axis=1), 1e-15, 1))))
+    # Expected calibration error of the top class, 10 equal-width confidence bins
+    conf = proba.max(axis=1)
+    correct = classes[proba.argmax(axis=1)] == y
+    bins = np.minimum((conf * 10).astype(int), 9)
+    ece = sum(abs(conf[bins == b].mean() - correct[bins == b].mean()) * np.mean(bins == b)
+              for b in range(10) if np.any(bins == b))
+    return {"brier": round(brier, 6), "log_loss": round(log_loss, 6), "ece": round(float(ece), 6)}
+
+
+def single_row_latency_us(model, X, n=200):
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        model.predict_proba(X[i:i + 1])
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples) * 1e6)
+
+
+def run(target, scale):
+    X, y = load(target, scale)
+    X_train, y_train, X_test, y_test = split(X, y)
+    results, probas = [], {}
+    for cfg_name, params in CONFIGS.items():
+        model = APDC(**params)
+        t0 = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        proba = model.predict_proba(X_test)
+        batch_s = time.perf_counter() - t0
+        probas[cfg_name] = proba
+        row = {
+            "target": target, "rows": len(X), "config": cfg_name,
+            "fit_s": round(fit_s, 3),
+            "batch_predict_proba_s": round(batch_s, 4),
+            "single_row_us": round(single_row_latency_us(model, X_test), 1),
+            "holdout_accuracy": round(float(np.mean(model.classes_[proba.argmax(axis=1)] == y_test)), 4),
+        }
+        row.update(calibration_scores(proba, y_test, model.classes_))
+        if cfg_name == "collapsed":
+            diff = np.abs(proba - probas["per-fold"])
+            row["lookup_error"] = round(model.lookup_error_, 8)
+            row["vs_per_fold_max_abs_diff"] = round(float(diff.max()), 6)
+            row["vs_per_fold_mean_abs_diff"] = round(float(diff.mean()), 6)
+            row["vs_per_fold_label_agreement"] = round(float(np.mean(proba.argmax(axis=1) == probas["per-fold"].argmax(axis=1))), 4)
+        results.append(row)
+        extra = (f"  |diff| max={row['vs_per_fold_max_abs_diff']:.4f} mean={row['vs_per_fold_mean_abs_diff']:.4f}"
+                 if "vs_per_fold_max_abs_diff" in row else "")
+        print(f"{target:13s} {len(X):>9,d} {cfg_name:10s} fit={row['fit_s']:7.3f}s "
+              f"batch={row['batch_predict_proba_s']:.4f}s single={row['single_row_us']:8.1f}us "
+              f"acc={row['holdout_accuracy']:.4f} brier={row['brier']:.4f} logloss={row['log_loss']:.4f} "
+              f"ece={row['ece']:.4f}{extra}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-fold vs collapsed APDC calibration.")
+    parser.add_argument("--scale", type=int, default=1, help="Resample the dataset this many times larger")
+    parser.add_argument("--targets", nargs="*", default=TARGETS, choices=TARGETS)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for target in args.targets:
+        results += run(target, args.scale)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
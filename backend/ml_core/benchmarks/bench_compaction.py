@@ -0,0 +1,103 @@
+# Forest compaction benchmark
+# ===========================
+#
+# For every bundle: fit the trainer's forest on 80% of its dataset, then compare
+# the original sklearn model with CompactForest at several pruning settings on
+# the held-out 20%: pickled size, joblib load time, single-row and batch latency,
+# score and score loss. Use it to pick ml_core.compaction.COMPACTION.
+#
+#   python ml_core/benchmarks/bench_compaction.py                 # from backend/
+#   python ml_core/benchmarks/bench_compaction.py --only stocking --json out.json
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import warnings
+import joblib
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.registry import MODEL_BUNDLES  # noqa: E402
+from ml_core.compaction import CompactForest, compaction_report, _pickled_size  # noqa: E402
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+# (max_depth, max_leaves)
+SETTINGS = [(None, None), (16, None), (12, None), (None, 512), (10, 256)]
+
+
+def load_time(obj, repeat=3):
+    buf = io.BytesIO()
+    joblib.dump(obj, buf)
+    best = float("inf")
+    for _ in range(repeat):
+        buf.seek(0)
+        t0 = time.perf_counter()
+        joblib.load(buf)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def latency(model, X, n=200):
+    samples = []
+    for i in range(min(n, len(X))):
+        t0 = time.perf_counter()
+        model.predict(X[i:i + 1])
+        samples.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    model.predict(X)
+    return float(np.median(samples) * 1e6), time.perf_counter() - t0
+
+
+def run(name):
+    module = importlib.import_module(f"ml_core.training.{name}_model")
+    artifacts, _ = module.train(compaction=False)
+    X, y, _ = module.prepare()
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y)
+    idx = np.random.default_rng(0).permutation(len(X))
+    cut = int(len(X) * 0.8)
+    train_idx, test_idx = idx[:cut], idx[cut:]
+    original = artifacts["model"].fit(X[train_idx], y[train_idx])
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    rows = []
+    single_us, batch_s = latency(original, X_test)
+    base = {"name": name, "model": "sklearn", "bytes": _pickled_size(original),
+            "load_ms": load_time(original) * 1e3, "single_us": single_us, "batch_ms": batch_s * 1e3}
+    for max_depth, max_leaves in SETTINGS:
+        compact = CompactForest.from_forest(original, max_depth=max_depth, max_leaves=max_leaves)
+        report = compaction_report(original, compact, X_test, y_test)
+        single_us, batch_s = latency(compact, X_test)
+        if not rows:
+            base["holdout_score"] = report["score_before"]
+            rows.append(base)
+        rows.append({"name": name, "model": f"compact d={max_depth} l={max_leaves}", "bytes": report["bytes_after"],
+                     "load_ms": load_time(compact) * 1e3, "single_us": single_us, "batch_ms": batch_s * 1e3,
+                     "holdout_score": report["score_after"], "score_loss": report["score_loss"],
+                     "nodes": report["nodes_after"], "nodes_before": report["nodes_before"]})
+    for r in rows:
+        print(f"{name:9s} {r['model']:26s} {r['bytes'] / 1e6:7.2f}MB load={r['load_ms']:7.2f}ms "
+              f"single={r['single_us']:8.1f}us batch({len(X_test)})={r['batch_ms']:7.2f}ms "
+              f"{r['holdout_score']:+.4f} loss={r.get('score_loss', 0):+.4f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sklearn forests with compacted/pruned forests.")
+    parser.add_argument("--only", nargs="*", default=list(MODEL_BUNDLES), choices=list(MODEL_BUNDLES))
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    results = [row for name in args.only for row in run(name)]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Dataset load benchmark: CSV vs columnar cache
+# =============================================
+#
+# Times pd.read_csv (all columns and usecols) against the .npy column cache for
+# the trainer's projected columns, on location.csv (the widest dataset) and on
+# synthetic copies resampled to the requested row counts. The synthetic CSVs are
+# written to a temporary directory and removed afterwards.
+#
+#   python ml_core/benchmarks/bench_datasets.py                      # 10k + 10M rows
+#   python ml_core/benchmarks/bench_datasets.py --rows 10000 1000000 --json out.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+from ml_core.dataset_cache import dataset_path, build_cache, read_dataset  # noqa: E402
+from ml_core.training.location_model import COLUMNS  # noqa: E402
+
+
+def time_it(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def synthetic_csv(source, rows, out_dir, seed=0):
+    df = pd.read_csv(source)
+    if rows == len(df):
+        return source
+    path = os.path.join(out_dir, f"location_{rows}.csv")
+    idx = np.random.default_rng(seed).integers(0, len(df), size=rows)
+    df.iloc[idx].to_csv(path, index=False)
+    return path
+
+
+def run(rows, out_dir):
+    path = synthetic_csv(dataset_path("location"), rows, out_dir)
+    repeat = 3 if rows <= 1_000_000 else 1
+    row = {"rows": rows, "csv_mb": round(os.path.getsize(path) / 1e6, 1)}
+    row["csv_all_s"] = time_it(lambda: pd.read_csv(path), repeat)
+    row["csv_usecols_s"] = time_it(lambda: pd.read_csv(path, usecols=COLUMNS), repeat)
+    row["cache_build_s"] = time_it(lambda: build_cache(path), 1)
+    row["cache_usecols_s"] = time_it(lambda: read_dataset(path, COLUMNS), repeat)
+    row["cache_all_s"] = time_it(lambda: read_dataset(path), repeat)
+    row["speedup_usecols"] = round(row["csv_usecols_s"] / row["cache_usecols_s"], 1)
+    for k, v in row.items():
+        if k.endswith("_s"):
+            row[k] = round(v, 4)
+    print(f"{rows:>11,d} rows {row['csv_mb']:8.1f}MB  csv={row['csv_all_s']:.3f}s "
+          f"csv[usecols]={row['csv_usecols_s']:.3f}s  build={row['cache_build_s']:.3f}s  "
+          f"cache[usecols]={row['cache_usecols_s']:.4f}s  cache={row['cache_all_s']:.4f}s  "
+          f"x{row['speedup_usecols']}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs columnar cache load times.")
+    parser.add_argument("--rows", nargs="*", type=int, default=[10_000, 10_000_000])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="aqua-bench-")
+    try:
+        results = [run(rows, out_dir) for rows in args.rows]
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"columns": COLUMNS, "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Streaming disease-risk benchmark
+# ================================
+#
+# Synthesizes a backlog of sensor readings (default: 10,000 ponds, 30 days, one
+# reading every 6 hours) drifting around rows of disease.csv, scores it with
+# score_backlog against the promoted disease model, and replays a sample of
+# ponds through DiseaseStream.push one reading at a time to check both paths
+# produce the same smoothed risks, levels and alerts.
+#
+#   python -m ml_core.benchmarks.bench_disease_stream          # from backend/
+#   python -m ml_core.benchmarks.bench_disease_stream --ponds 1000 --per-day 24
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.disease_stream import DiseaseStream, score_backlog, risk_scores, FEATURES  # noqa: E402
+
+DATASET_PATH = os.path.join(BACKEND_DIR, "ml_core", "datasets", "disease.csv")
+COLUMNS = ["Water_Temp", "pH", "DO", "Salinity", "Turbidity"]
+
+
+def synthesize(ponds, days, per_day, seed=0):
+    """Each pond starts at a random dataset row and drifts as a bounded random walk."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(DATASET_PATH, usecols=COLUMNS)[COLUMNS].to_numpy(dtype=np.float64)
+    steps = days * per_day
+    start = base[rng.integers(0, len(base), size=ponds)]
+    scale = base.std(axis=0) * 0.08
+    walk = np.cumsum(rng.normal(0.0, 1.0, size=(steps, ponds, len(COLUMNS))) * scale, axis=0)
+    X = (start[None, :, :] + walk).clip(base.min(axis=0), base.max(axis=0)).reshape(-1, len(COLUMNS))
+    t0 = np.datetime64("2026-01-01T00:00:00", "s")
+    times = t0 + (np.arange(steps) * (86400 // per_day)).astype("timedelta64[s]")
+    pond_ids = np.array([f"P-{i:05d}" for i in range(ponds)])
+    return np.tile(pond_ids, steps), np.repeat(times, ponds), X
+
+
+def replay(model, ponds, times, X, sample):
+    """Feed the sampled ponds' readings through the live path one push at a time."""
+    stream = DiseaseStream()
+    mask = np.isin(ponds, sample)
+    rows = np.flatnonzero(mask)
+    rows = rows[np.argsort(times[rows], kind="stable")]
+    alerts = []
+    for i in rows:
+        reading = dict(zip(FEATURES, X[i].tolist()), pond_id=ponds[i], timestamp=str(times[i]))
+        alerts.extend(stream.push(model, [reading]))
+    return alerts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the streaming disease-risk scorer.")
+    parser.add_argument("--ponds", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-day", type=int, default=4)
+    parser.add_argument("--check-ponds", type=int, default=20)
+    parser.add_argument("--json", help="Write the results here")
+    args = parser.parse_args(argv)
+
+    from ml_core.models_loader import get_bundle
+    bundle = get_bundle("disease")
+    model = bundle.get()
+    ponds, times, X = synthesize(args.ponds, args.days, args.per_day)
+    print(f"{len(X):,} readings, {args.ponds:,} ponds, disease model {bundle.version}")
+
+    t0 = time.perf_counter()
+    risk = risk_scores(model, X)
+    t1 = time.perf_counter()
+    result = score_backlog(model, ponds, times, X, risk=risk)
+    t2 = time.perf_counter()
+    levels = np.bincount(result["level"], minlength=3)
+    print(f"model scoring   {t1 - t0:8.2f}s  ({(t1 - t0) / len(X) * 1e6:.2f} us/reading)")
+    print(f"windows+alerts  {t2 - t1:8.2f}s  ({len(result['alerts']):,} alerts, levels {levels.tolist()})")
+
+    sample = np.unique(ponds)[:args.check_ponds]
+    live = replay(model, ponds, times, X, sample)
+    batch = [a for a in result["alerts"] if a["pond_id"] in set(sample.tolist())]
+    key = lambda a: (a["pond_id"], a["at"], a["level"])  # noqa: E731
+    same = sorted(map(key, live)) == sorted(map(key, batch))
+    print(f"stream parity   {'ok' if same else 'MISMATCH'} on {len(sample)} ponds ({len(live)} alerts)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"readings": len(X), "ponds": args.ponds, "score_s": t1 - t0, "window_s": t2 - t1,
+                       "alerts": len(result["alerts"]), "parity": same}, f, indent=4)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
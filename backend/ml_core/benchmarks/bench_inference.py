@@ -0,0 +1,284 @@
+# ML inference latency benchmark
+# ==============================
+#
+# Trains fixture bundles from the bundled datasets (in memory, nothing is
+# published), activates them in the registry and measures:
+#
+#   raw      model.predict on encoded rows: single-row, batched, concurrent
+#   flask    POST /api/predict_* through the Flask test client: single, concurrent
+#
+# Each scenario reports p50/p95/p99 latency and throughput. Results are written
+# as JSON keyed by "<layer>/<target>/<scenario>" so two runs can be diffed:
+#
+#   python ml_core/benchmarks/bench_inference.py                       # from backend/
+#   python ml_core/benchmarks/bench_inference.py --quick --compare results/inference-abc123.json
+#
+# The Flask app only registers the ai blueprint: app.py adds no request hooks for
+# these routes, and importing it pulls in mail/SMS/Supabase clients. Outbound
+# weather lookups in /api/predict_feed fail fast (as when offline) so the numbers
+# measure our code, not wttr.in.
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import platform
+import subprocess
+import threading
+import warnings
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.registry import REGISTRY, BUNDLE_DATASETS, ModelBundle  # noqa: E402
+from ml_core.dataset_cache import read_dataset  # noqa: E402
+from ml_core.vocab import VOCAB  # noqa: E402
+
+# Routes pass plain lists to models fitted on DataFrames; models_loader silences the same warning
+warnings.filterwarnings("ignore", category=UserWarning)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+FIXTURE_VERSION = "bench-fixture"
+
+# bundle -> [(dataset column, encoder key or None)] in model feature order
+RAW_FEATURES = {
+    "disease": [("Water_Temp", None), ("pH", None), ("DO", None), ("Salinity", None), ("Turbidity", None)],
+    "location": [("Country", "le_country"), ("State", "le_state"), ("Climate_Zone", "le_climate"),
+                 ("Aqua_Type", "le_aqua"), ("Species", "le_species_loc")],
+    "feed": [("Species", "le_species_feed"), ("Age_Days", None), ("Water_Temp", None), ("DO", None),
+             ("Feed_Type", "le_feed"), ("Protein", None)],
+    "yield": [("Species", "le_species_yield"), ("Pond_Area", None), ("Feed_Used", None), ("Culture_Days", None)],
+    "buyer": [("Target_Country", "le_country_buyer"), ("Species", "le_species_buyer"),
+              ("Required_Quantity", None), ("Quality_Grade", "le_grade_buyer")],
+    "stocking": [("Species", "le_species_stock"), ("Pond_Area", None), ("Soil_Type", "le_soil"),
+                 ("Water_Source", "le_water_source"), ("Season", "le_season_stock")],
+    "seed": [("Country", "le_country_seed"), ("Species", "le_species_seed_chk"), ("Distance_km", None)],
+}
+
+# endpoint bundle -> dataset row -> JSON payload
+PAYLOADS = {
+    "disease": lambda r: {"temp": r["Water_Temp"], "ph": r["pH"], "do": r["DO"], "salinity": r["Salinity"],
+                          "turbidity": r["Turbidity"], "species": "Vannamei"},
+    "location": lambda r: {"country": r["Country"], "state": r["State"], "climate": r["Climate_Zone"],
+                           "aqua_type": r["Aqua_Type"], "species": r["Species"]},
+    "feed": lambda r: {"species": r["Species"], "age": r["Age_Days"], "temp": r["Water_Temp"],
+                       "feed_type": r["Feed_Type"], "location": "Visakhapatnam"},
+    "yield": lambda r: {"species": r["Species"], "area": r["Pond_Area"], "feed": r["Feed_Used"],
+                        "days": r["Culture_Days"]},
+    "buyer": lambda r: {"country": r["Target_Country"], "species": r["Species"],
+                        "quantity": r["Required_Quantity"], "grade": r["Quality_Grade"]},
+    "stocking": lambda r: {"species": r["Species"], "area": r["Pond_Area"], "soil": r["Soil_Type"],
+                           "water": r["Water_Source"], "season": r["Season"]},
+}
+
+
+def summarize(samples, n_rows_per_call=1, wall=None):
+    arr = np.asarray(samples) * 1e3
+    wall = wall if wall is not None else float(np.sum(samples))
+    return {
+        "calls": len(arr),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "mean_ms": round(float(arr.mean()), 4),
+        "calls_per_s": round(len(arr) / wall, 1),
+        "rows_per_s": round(len(arr) * n_rows_per_call / wall, 1),
+    }
+
+
+def timed_calls(fn, args_list):
+    samples = []
+    for a in args_list:
+        t0 = time.perf_counter()
+        fn(a)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def concurrent_calls(fn, args_list, threads):
+    """Run fn over args_list from ``threads`` threads; returns (per-call samples, wall seconds)."""
+    shards = [args_list[i::threads] for i in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(shard):
+        barrier.wait()
+        return timed_calls(fn, shard)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, shards))
+    wall = time.perf_counter() - t0
+    return [s for r in results for s in r], wall
+
+
+def train_fixtures(names):
+    """Train each bundle from its dataset and activate it in the process-wide registry."""
+    fixtures = {}
+    for name in names:
+        started = time.perf_counter()
+        module = importlib.import_module(f"ml_core.training.{name}_model")
+        artifacts, metrics = module.train(BUNDLE_DATASETS[name])
+        bundle = ModelBundle(name, FIXTURE_VERSION, artifacts, {"metrics": metrics})
+        REGISTRY.activate(bundle)
+        fixtures[name] = bundle
+        print(f"  trained fixture {name:9s} in {time.perf_counter() - started:.2f}s {metrics}")
+    return fixtures
+
+
+def encoded_rows(bundle, n):
+    cols = [c for c, _ in RAW_FEATURES[bundle.name]]
+    df = read_dataset(BUNDLE_DATASETS[bundle.name], list(dict.fromkeys(cols))).head(n)
+    X = np.column_stack([
+        VOCAB.encode_many(bundle, key, df[col].astype(str).tolist()) if key else df[col].to_numpy(dtype=np.float64)
+        for col, key in RAW_FEATURES[bundle.name]
+    ]).astype(np.float64)
+    return X
+
+
+def bench_raw(bundle, args):
+    model = bundle.get()
+    X = encoded_rows(bundle, max(args.calls, max(args.batch_sizes)))
+    out = {}
+    model.predict(X[:1])  # warm-up
+    rows = [X[i:i + 1] for i in range(args.calls)]
+    out["single"] = summarize(timed_calls(model.predict, rows))
+    for size in args.batch_sizes:
+        reps = max(5, args.calls // max(size, 1) // 4)
+        batches = [X[(i * size) % (len(X) - size + 1):][:size] for i in range(reps)]
+        out[f"batch_{size}"] = summarize(timed_calls(model.predict, batches), n_rows_per_call=size)
+    for threads in args.threads:
+        samples, wall = concurrent_calls(model.predict, rows, threads)
+        out[f"concurrent_{threads}"] = summarize(samples, wall=wall)
+    return out
+
+
+def make_app():
+    from flask import Flask
+    from routes.ai_predictions import ai_bp
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    app.testing = True  # handler exceptions propagate instead of becoming HTML 500 pages
+    app.register_blueprint(ai_bp)
+    return app
+
+
+def bench_flask(app, name, args):
+    df = read_dataset(BUNDLE_DATASETS[name]).head(args.calls)
+    payloads = [PAYLOADS[name]({k: (v.item() if hasattr(v, "item") else v) for k, v in row.items()})
+                for row in df.to_dict(orient="records")]
+    url = f"/api/predict_{name}"
+    local = threading.local()
+
+    def call(payload):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        res = client.post(url, json=payload)
+        if res.status_code != 200:
+            raise RuntimeError(f"{url} -> {res.status_code}: {res.get_data(as_text=True)[:200]}")
+
+    call(payloads[0])  # warm-up
+    out = {"single": summarize(timed_calls(call, payloads))}
+    for threads in args.threads:
+        samples, wall = concurrent_calls(call, payloads, threads)
+        out[f"concurrent_{threads}"] = summarize(samples, wall=wall)
+    return out
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\n--- Compared with {os.path.basename(baseline_path)} (p50 / p99 / throughput) ---")
+    regressions = 0
+    for key, cur in sorted(results.items()):
+        old = baseline.get(key)
+        if not old:
+            continue
+        d50 = (cur["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+        d99 = (cur["p99_ms"] / old["p99_ms"] - 1) * 100 if old["p99_ms"] else 0.0
+        dtp = (cur["rows_per_s"] / old["rows_per_s"] - 1) * 100 if old["rows_per_s"] else 0.0
+        flag = ""
+        if d50 > threshold:
+            flag = "  ⚠️ slower"
+            regressions += 1
+        print(f"{key:40s} {d50:+7.1f}% {d99:+7.1f}% {dtp:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model and endpoint inference latency.")
+    parser.add_argument("--models", nargs="*", default=list(RAW_FEATURES), choices=list(RAW_FEATURES))
+    parser.add_argument("--calls", type=int, default=500, help="Calls per single/concurrent scenario")
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=[16, 256, 4096])
+    parser.add_argument("--threads", nargs="*", type=int, default=[4, 16])
+    parser.add_argument("--skip-flask", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="100 calls, small batches (smoke run)")
+    parser.add_argument("--json", help="Output path (default: benchmarks/results/inference-<git rev>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 increase (%%) reported as regression")
+    args = parser.parse_args()
+    if args.quick:
+        args.calls, args.batch_sizes, args.threads = 100, [16, 256], [4]
+
+    revision = git_revision()
+    print(f"--- Training fixtures ({revision}) ---")
+    fixtures = train_fixtures(args.models)
+
+    results = {}
+    print("--- Raw model.predict ---")
+    for name, bundle in fixtures.items():
+        for scenario, row in bench_raw(bundle, args).items():
+            key = f"raw/{name}/{scenario}"
+            results[key] = row
+            print(f"{key:32s} p50={row['p50_ms']:8.3f}ms p95={row['p95_ms']:8.3f}ms "
+                  f"p99={row['p99_ms']:8.3f}ms {row['rows_per_s']:>12,.0f} rows/s")
+
+    if not args.skip_flask:
+        import requests
+        print("--- Flask /api/predict_* ---")
+        app = make_app()
+        offline = mock.patch.object(requests, "get", side_effect=requests.ConnectionError("benchmark: offline"))
+        with offline, mock.patch("builtins.print"):
+            flask_results = {name: bench_flask(app, name, args) for name in fixtures if name in PAYLOADS}
+        for name, scenarios in flask_results.items():
+            for scenario, row in scenarios.items():
+                key = f"flask/{name}/{scenario}"
+                results[key] = row
+                print(f"{key:32s} p50={row['p50_ms']:8.3f}ms p95={row['p95_ms']:8.3f}ms "
+                      f"p99={row['p99_ms']:8.3f}ms {row['calls_per_s']:>10,.0f} req/s")
+
+    report = {
+        "revision": revision,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "params": {"calls": args.calls, "batch_sizes": args.batch_sizes, "threads": args.threads},
+        "fixtures": {name: b.manifest["metrics"] for name, b in fixtures.items()},
+        "results": results,
+    }
+    path = args.json or os.path.join(RESULTS_DIR, f"inference-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"--- Results written to {path} ---")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
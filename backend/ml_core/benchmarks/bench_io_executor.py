@@ -0,0 +1,124 @@
+# Worker throughput under a slow upstream: inline calls vs the I/O executor
+# ========================================================================
+#
+# Runs --workers threads (standing in for synchronous Flask workers) against
+# /api/predict_feed for --seconds, with the wttr.in stand-in from bench_outbound
+# answering after --upstream-ms:
+#
+#   before   the handler calls the provider inline (the pre-executor code path)
+#   after    the handler goes through the I/O executor: the weather lookup waits
+#            at most AQUA_FEED_WEATHER_WAIT and requests for the same city share
+#            one upstream call
+#
+# Gemini moved from the executor to its own job queue; see bench_vision_jobs.
+# The weather cache TTL is forced to 0 so every feed request is a cache miss.
+#
+#   python -m ml_core.benchmarks.bench_io_executor          # from backend/
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.benchmarks.bench_outbound import StandIn, wttr  # noqa: E402
+
+CITIES = ["Nellore", "Kolkata", "Chennai", "Visakhapatnam"]
+
+
+def drive(client, make_request, workers, seconds):
+    latencies, lock = [], threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(i):
+        n = i
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            make_request(client, n)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+            n += workers
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)  # noqa: E731
+    return {"requests": len(latencies), "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": pct(0.5), "p95_ms": pct(0.95)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker throughput under a slow upstream: inline calls vs the I/O executor.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--upstream-ms", type=float, default=1500)
+    parser.add_argument("--json", help="Write the results here")
+    args = parser.parse_args(argv)
+
+    servers = {"wttr": StandIn("wttr", wttr)}
+    for name, server in servers.items():
+        server.latency = args.upstream_ms / 1000
+        os.environ[f"AQUA_{name.upper()}_URL"] = server.url
+    os.environ["AQUA_HTTP_POOL"] = str(args.workers * 2)
+
+    from flask import Flask
+    from core.io_executor import IO
+    from core.weather_cache import WEATHER, WttrProvider
+    from routes import ai_predictions
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    app.testing = True
+    app.register_blueprint(ai_predictions.ai_bp)
+    client = app.test_client()
+    WEATHER.ttl = WEATHER.max_stale = 0
+    WEATHER.provider = WttrProvider()
+
+    def feed(client, n):
+        client.post("/api/predict_feed", json={"location": CITIES[n % len(CITIES)]})
+
+    class InlineWeather:
+        # Pre-executor behaviour: fetch on the request thread every time
+        def get(self, location=None, lat=None, lon=None, wait=0.0):
+            try:
+                return WttrProvider()(location)
+            except Exception:
+                return None
+
+    results = {}
+    for label, patches in [
+        ("before", [mock.patch.object(ai_predictions, "WEATHER", InlineWeather())]),
+        ("after", []),
+    ]:
+        for p in patches:
+            p.start()
+        for route, fn in [("feed", feed)]:
+            for s in servers.values():
+                s.reset_counts()
+            stats = drive(client, fn, args.workers, args.seconds)
+            stats["upstream_calls"] = servers["wttr"].requests
+            results[f"{label}/{route}"] = stats
+            print(f"{label:6s} {route:6s} {stats}")
+        for p in patches:
+            p.stop()
+        # Let flights from this phase land before the next one starts
+        time.sleep(args.upstream_ms / 1000 + 0.2)
+
+    print(f"io executor {IO.stats}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
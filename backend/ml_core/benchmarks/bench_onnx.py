@@ -0,0 +1,129 @@
+# ONNX export parity + latency benchmark
+# ======================================
+#
+# Fits every model family the exporter supports on the bundled datasets,
+# converts it with ml_core/onnx_export.py and compares onnxruntime (CPU
+# provider) against the in-process model:
+#
+#   parity    max |onnx - sklearn| on 2,000 training rows (probabilities for
+#             classifiers), label agreement; fails the run above the tolerance
+#   latency   median single-row predict and best-of-3 batch predict
+#
+#   python ml_core/benchmarks/bench_onnx.py
+#   python ml_core/benchmarks/bench_onnx.py --cases ADER/yield APDC/disease:collapsed --json out.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+from sklearn.ensemble import (RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor,  # noqa: E402
+                              HistGradientBoostingRegressor)
+from ml_core.training.custom_algorithms import ADER, APDC, ASER, AMPRO  # noqa: E402
+from ml_core.compaction import compact_forest, COMPACTION  # noqa: E402
+from ml_core.onnx_export import to_onnx, parity, PARITY_ROWS  # noqa: E402
+from ml_core.onnx_backend import OnnxModel  # noqa: E402
+from ml_core.registry import BUNDLE_DATASETS  # noqa: E402
+from ml_core.build_models import TRAINERS  # noqa: E402
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+
+def _compact(name, model_factory):
+    def build(X, y):
+        model = model_factory().fit(X, y)
+        return compact_forest(model, X, y, **COMPACTION.get(name, {}))[0]
+    return build
+
+
+# case -> (bundle whose encoded dataset is used, factory returning a fitted model)
+CASES = {
+    "RandomForestRegressor/yield": ("yield", lambda X, y: RandomForestRegressor(20, random_state=42).fit(X, y)),
+    "RandomForestClassifier/disease": ("disease", lambda X, y: RandomForestClassifier(20, random_state=42).fit(X, y)),
+    "GradientBoostingRegressor/yield": ("yield", lambda X, y: GradientBoostingRegressor(random_state=42).fit(X, y)),
+    "HistGradientBoostingRegressor/yield": ("yield", lambda X, y: HistGradientBoostingRegressor(random_state=42).fit(X, y)),
+    "CompactForest/feed": ("feed", _compact("feed", lambda: RandomForestRegressor(20, random_state=42))),
+    "CompactForest/disease": ("disease", _compact("disease", lambda: RandomForestClassifier(20, random_state=42))),
+    "ADER/yield": ("yield", lambda X, y: ADER(n_jobs=1).fit(X, y)),
+    "ADER/yield:hist": ("yield", lambda X, y: ADER(n_jobs=1, gb_backend="hist").fit(X, y)),
+    "ASER/stocking": ("stocking", lambda X, y: ASER(n_jobs=1).fit(X, y)),
+    "AMPRO/buyer": ("buyer", lambda X, y: AMPRO(n_jobs=1).fit(X, y)),
+    "APDC/disease": ("disease", lambda X, y: APDC(n_jobs=1).fit(X, y)),
+    "APDC/disease:collapsed": ("disease", lambda X, y: APDC(n_jobs=1, collapsed=True).fit(X, y)),
+    "APDC/disease:uncalibrated": ("disease", lambda X, y: APDC(n_jobs=1, calibrate=False).fit(X, y)),
+}
+
+
+def load(bundle):
+    import importlib
+    X, y, _ = importlib.import_module(TRAINERS[bundle]).prepare(BUNDLE_DATASETS[bundle])
+    return np.asarray(X, dtype=np.float64), np.asarray(y)
+
+
+def single_row_us(fn, X, n=200):
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(X[i:i + 1])
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples) * 1e6)
+
+
+def best_of(fn, X, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(name, batch_rows):
+    bundle, factory = CASES[name]
+    X, y = load(bundle)
+    model = factory(X, y)
+    t0 = time.perf_counter()
+    proto = to_onnx(model, n_features=X.shape[1])
+    export_s = time.perf_counter() - t0
+    check = parity(model, proto, X[:PARITY_ROWS])
+    served = OnnxModel(proto.SerializeToString())
+    batch = X[np.arange(batch_rows) % len(X)]
+    row = {
+        "case": name,
+        "onnx_kb": round(len(proto.SerializeToString()) / 1e3, 1),
+        "export_s": round(export_s, 3),
+        **{k: v for k, v in check.items() if k != "rows"},
+        "sklearn_single_us": round(single_row_us(model.predict, X), 1),
+        "onnx_single_us": round(single_row_us(served.predict, X), 1),
+        "sklearn_batch_s": round(best_of(model.predict, batch), 4),
+        "onnx_batch_s": round(best_of(served.predict, batch), 4),
+    }
+    status = "ok  " if check["ok"] else "FAIL"
+    agreement = f" agree={check['label_agreement']:.4f}" if "label_agreement" in check else ""
+    print(f"{status} {name:36s} max|diff|={check['max_abs_diff']:.2e} rel={check['max_rel_diff']:.2e}{agreement}  "
+          f"single {row['sklearn_single_us']:8.1f}us -> {row['onnx_single_us']:7.1f}us  "
+          f"batch[{batch_rows}] {row['sklearn_batch_s']:.4f}s -> {row['onnx_batch_s']:.4f}s")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX export parity and latency against sklearn.")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--batch-rows", type=int, default=4096)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = [run(name, args.batch_rows) for name in args.cases]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=4)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# Outbound client benchmark against local stand-in servers
+# ========================================================
+#
+# Starts one local HTTP server per provider (wttr.in, ip-api.com and the Gemini
+# REST API), points the shared outbound client at them (AQUA_<PROVIDER>_URL) and
+# drives the routes that call out:
+#
+#   healthy     providers answer in --latency-ms; checks answers, latency and
+#               that calls reuse pooled keep-alive connections
+#   slow        providers answer after --slow-ms (past the read timeout for
+#               ip-api); shows timeouts counting towards the breaker
+#   down        providers return 500s until the circuit opens; later calls
+#               must short-circuit (no request reaches the server) and the
+#               routes fall back quickly
+#   recovery    providers come back; after reset_seconds one trial call closes
+#               the circuit again
+#
+#   python -m ml_core.benchmarks.bench_outbound          # from backend/
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+RESET_SECONDS = 1.0
+
+
+class StandIn:
+    """A provider stand-in: mode is "ok", "slow" or "down"; counts requests and connections."""
+
+    def __init__(self, name, respond):
+        self.name = name
+        self.respond = respond
+        self.mode = "ok"
+        self.latency = 0.0
+        self.slow = 0.0
+        self.requests = 0
+        self.connections = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                stand_in.requests += 1
+                stand_in.connections.add(self.client_address)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                time.sleep(stand_in.slow if stand_in.mode == "slow" else stand_in.latency)
+                status, ctype, payload = (500, "text/plain", b"down") if stand_in.mode == "down" \
+                    else stand_in.respond(self.path, body)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        # Clients that timed out have hung up; nothing to report
+        self.server.handle_error = lambda request, client_address: None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def reset_counts(self):
+        self.requests = 0
+        self.connections = set()
+
+
+def wttr(path, body):
+    return 200, "text/plain", "+30°C Sunny".encode()
+
+
+def ipapi(path, body):
+    return 200, "application/json", json.dumps(
+        {"status": "success", "countryCode": "IN", "regionName": "Tamil Nadu"}).encode()
+
+
+def gemini(path, body):
+    text = json.dumps({"type": "Vannamei Shrimp", "disease": "Healthy", "severity": "SECURE", "desc": "stand-in"})
+    return 200, "application/json", json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+
+
+IMAGE = "data:image/png;base64,iVBORw0KGgo="
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"p50_ms": round(samples[len(samples) // 2], 2), "max_ms": round(samples[-1], 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the outbound client against local stand-in servers.")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--slow-ms", type=float, default=1500)
+    args = parser.parse_args(argv)
+
+    servers = {"wttr": StandIn("wttr", wttr), "ipapi": StandIn("ipapi", ipapi), "gemini": StandIn("gemini", gemini)}
+    for name, server in servers.items():
+        server.latency = args.latency_ms / 1000
+        server.slow = args.slow_ms / 1000
+        os.environ[f"AQUA_{name.upper()}_URL"] = server.url
+    os.environ["AQUA_GEOIP_ONLINE"] = "1"
+    os.environ["GEMINI_API_KEY"] = "stand-in"
+
+    from flask import Flask
+    from core.http_client import OUTBOUND
+    from core import geoip
+    from core.weather_cache import WttrProvider
+    from routes.main import main_bp
+    from routes.vision import vision_bp
+    from core.vision_cache import VISION_CACHE
+    from core.vision_jobs import VISION_JOBS
+    for name in servers:
+        OUTBOUND.provider(name).breaker.reset_seconds = RESET_SECONDS
+    # Every vision call has to reach the provider: no result cache, no job reuse, no rate limit
+    VISION_CACHE.ttl = VISION_JOBS.ttl = 0
+    VISION_JOBS.bucket.rate = VISION_JOBS.bucket.burst = 10**6
+
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    app.testing = True
+    app.register_blueprint(main_bp)
+    app.register_blueprint(vision_bp)
+    client = app.test_client()
+    weather = WttrProvider()
+    counter = iter(range(10**9))
+
+    def geo():
+        # A new address each time so the LRU does not hide the provider
+        ip = f"100.64.{next(counter) % 250}.{next(counter) % 250}"
+        return client.post("/api/set-lang-by-geo", json={}, headers={"X-Forwarded-For": ip}).get_json()["lang"]
+
+    def vision():
+        return client.post("/api/vision/analyze", json={"filename": "x.png", "image_base64": IMAGE}).get_json()
+
+    calls = {
+        "wttr": lambda: weather("Chennai"),
+        "ipapi": geo,
+        "gemini": vision,
+    }
+
+    results = {}
+    ok = True
+    for phase in ["healthy", "slow", "down", "recovery"]:
+        if phase == "recovery":
+            time.sleep(RESET_SECONDS + 0.1)
+        for name, server in servers.items():
+            server.mode = {"healthy": "ok", "slow": "slow", "down": "down", "recovery": "ok"}[phase]
+            server.reset_counts()
+            geoip._online_lookup.cache_clear()
+            n = 5 if phase == "slow" else args.calls
+
+            def call():
+                try:
+                    return calls[name]()
+                except Exception as e:
+                    return e
+
+            stats = timed(call, n)
+            stats.update(requests=server.requests, connections=len(server.connections),
+                         circuit=OUTBOUND.provider(name).breaker.state)
+            results[f"{phase}/{name}"] = stats
+            print(f"{phase:9s} {name:7s} {stats}")
+            if phase == "healthy":
+                ok &= stats["connections"] < stats["requests"]
+            if phase == "down":
+                ok &= stats["requests"] < n and stats["circuit"] == "open"
+            if phase == "recovery":
+                ok &= stats["circuit"] == "closed"
+
+    print(json.dumps(OUTBOUND.metrics(), indent=2))
+    checks = {
+        "weather": calls["wttr"]()["temp_c"] == 30.0,
+        "geo": geo() == "ta",
+        "vision": vision()["data"]["type"] == "Vannamei Shrimp",
+    }
+    print(f"answers {checks}  pooling/breaker {'ok' if ok else 'FAILED'}")
+    return 0 if ok and all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
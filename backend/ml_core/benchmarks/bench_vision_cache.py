@@ -0,0 +1,101 @@
+# Perceptual-hash vision cache: near-duplicate recall, false matches, lookup cost
+# ==============================================================================
+#
+# Synthetic "photos" (smooth random fields, like a pond or a carapace close-up)
+# are stored in a VisionCache; then looked up again as
+#
+#   noise       sensor / re-compression noise (sigma 6)
+#   brighter    +12 brightness
+#   crop        3% trimmed off every edge
+#   half        re-sized to half resolution
+#
+# and distinct photos are looked up to count false matches (dHash is not
+# crop-invariant, so crop recall is reported but not checked). Lookup time is
+# measured at growing cache sizes, with a pure-Python scan for comparison.
+#
+#   python -m ml_core.benchmarks.bench_vision_cache          # from backend/
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from core.vision_cache import VisionCache, dhash, HASH_DISTANCE  # noqa: E402
+
+
+def photo(rng, height=600, width=800):
+    coarse = rng.uniform(0, 255, size=(6, 8, 3))
+    rows = np.linspace(0, 5, height)
+    cols = np.linspace(0, 7, width)
+    r0, c0 = rows.astype(int).clip(0, 4), cols.astype(int).clip(0, 6)
+    fr, fc = (rows - r0)[:, None, None], (cols - c0)[None, :, None]
+    img = (coarse[r0][:, c0] * (1 - fr) * (1 - fc) + coarse[r0 + 1][:, c0] * fr * (1 - fc)
+           + coarse[r0][:, c0 + 1] * (1 - fr) * fc + coarse[r0 + 1][:, c0 + 1] * fr * fc)
+    return img.clip(0, 255).astype(np.uint8)
+
+
+VARIANTS = {
+    "noise": lambda img, rng: (img + rng.normal(0, 6, img.shape)).clip(0, 255).astype(np.uint8),
+    "brighter": lambda img, rng: (img.astype(np.int16) + 12).clip(0, 255).astype(np.uint8),
+    "crop": lambda img, rng: img[img.shape[0] * 3 // 100:-img.shape[0] * 3 // 100,
+                                 img.shape[1] * 3 // 100:-img.shape[1] * 3 // 100],
+    "half": lambda img, rng: img[::2, ::2],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perceptual-hash vision cache: near-duplicate recall, false matches and lookup cost.")
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 4096, 16384])
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(7)
+
+    cache = VisionCache(ttl=3600, max_entries=args.photos * 2)
+    photos = [photo(rng) for _ in range(args.photos)]
+    t0 = time.perf_counter()
+    hashes = [dhash(p) for p in photos]
+    print(f"dhash: {(time.perf_counter() - t0) / len(photos) * 1000:.2f} ms per 800x600 image, "
+          f"distance threshold {HASH_DISTANCE}")
+    half = len(photos) // 2
+    for i, h in enumerate(hashes[:half]):
+        cache.put(("dhash", h), {"photo": i})
+
+    ok = True
+    for name, variant in VARIANTS.items():
+        found = sum(cache.get(("dhash", dhash(variant(p, rng)))) == {"photo": i}
+                    for i, p in enumerate(photos[:half]))
+        print(f"near-duplicate {name:9s} recall {found}/{half}")
+        if name != "crop":
+            ok &= found >= 0.9 * half
+    false = sum(cache.get(("dhash", h)) is not None for h in hashes[half:])
+    print(f"distinct photos matched: {false}/{len(photos) - half}")
+    ok &= false <= 0.01 * (len(photos) - half)
+    print(f"metrics {cache.metrics()}")
+
+    # Lookup cost with random (unrelated) entries plus one near neighbour
+    for size in args.sizes:
+        big = VisionCache(ttl=3600, max_entries=size)
+        keys = rng.integers(0, 2**63, size=size, dtype=np.int64).tolist()
+        for k in keys:
+            big.put(("dhash", k), k)
+        probes = [k ^ (1 << int(b)) for k, b in zip(keys[:200], rng.integers(0, 64, 200))]
+        t0 = time.perf_counter()
+        hits = sum(big.get(("dhash", p)) is not None for p in probes)
+        indexed = (time.perf_counter() - t0) / len(probes) * 1e6
+        t0 = time.perf_counter()
+        for p in probes[:20]:
+            min(keys, key=lambda k: (k ^ p).bit_count())
+        scan = (time.perf_counter() - t0) / 20 * 1e6
+        print(f"{size:6d} entries: {indexed:7.1f} us/lookup ({hits}/{len(probes)} hits), "
+              f"python scan {scan:8.1f} us")
+
+    print("checks", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# Vision embedding cache: backbone passes for a first build, a retrain and a no-op
+# ==============================================================================
+#
+# Builds a throwaway dataset of --images files across --classes classes and a
+# stand-in backbone that costs --backbone-ms per image view (MobileNetV2 at
+# 224x224 is in that range on one CPU core) and returns features derived from
+# the file bytes. Then:
+#
+#   cold       first update(): every image x view goes through the backbone
+#   retrain    --added images land in the dataset and one is deleted: only the
+#              new ones are embedded, the rest are copied over
+#   no-op      update() with nothing changed
+#   epoch      drawing one view per image from the memory-mapped features, which
+#              is all the head trainer reads per epoch
+#
+# and compares against the generator pipeline, which ran every augmented image
+# through the backbone once per epoch (EPOCHS of them). Checks that unchanged
+# images keep their exact features and that only the new images were embedded.
+# Head training itself needs TensorFlow and is timed only when it is installed.
+#
+#   python -m ml_core.benchmarks.bench_vision_embeddings          # from backend/
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.vision_embeddings import EmbeddingCache, sample_views  # noqa: E402
+
+GENERATOR_EPOCHS = 10   # what training/vision_classification_model.py ran before the cache
+
+
+class StandInBackbone:
+    name = "stand-in"
+    dim = 1280
+
+    def __init__(self, ms_per_view):
+        self.seconds = ms_per_view / 1000
+        self.passes = 0
+
+    def views(self, path, rel_path, count):
+        with open(path, "rb") as f:
+            seed = int.from_bytes(f.read(8), "little")
+        return np.random.default_rng(seed).random((count, 4), dtype=np.float32) + np.arange(count)[:, None]
+
+    def __call__(self, batch):
+        self.passes += len(batch)
+        time.sleep(self.seconds * len(batch))
+        return np.repeat(batch, self.dim // batch.shape[1], axis=1)
+
+
+def add_images(dataset, classes, start, count, rng):
+    for i in range(start, start + count):
+        folder = os.path.join(dataset, classes[i % len(classes)])
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"img_{i:05d}.jpg"), "wb") as f:
+            f.write(rng.bytes(64))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backbone passes of the vision embedding cache for a first build, a retrain and a no-op.")
+    parser.add_argument("--images", type=int, default=300)
+    parser.add_argument("--classes", type=int, default=3)
+    parser.add_argument("--added", type=int, default=12)
+    parser.add_argument("--views", type=int, default=8, help="Augmented views per image")
+    parser.add_argument("--backbone-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(5)
+
+    workdir = tempfile.mkdtemp(prefix="aqua-embeddings-")
+    dataset = os.path.join(workdir, "aquatic_images")
+    classes = [f"species_{c}" for c in range(args.classes)]
+    ok = True
+    try:
+        add_images(dataset, classes, 0, args.images, rng)
+        backbone = StandInBackbone(args.backbone_ms)
+        cache = EmbeddingCache(dataset, os.path.join(workdir, "cache"), views=args.views, backbone=backbone)
+
+        stats = cache.update()
+        print(f"cold     {stats['seconds']:7.2f} s  {backbone.passes:6d} backbone passes  {stats}")
+        features, rows, _, _, _ = cache.load()
+        before = {e["path"]: np.array(features[e["row"]]) for e in cache.meta()["images"]}
+        size_mb = os.path.getsize(os.path.join(cache.cache_dir, "features.npy")) / 1e6
+        print(f"         features.npy {features.shape} float16, {size_mb:.1f} MB")
+        del features
+
+        removed = cache.meta()["images"][0]["path"]
+        os.remove(os.path.join(dataset, removed))
+        add_images(dataset, classes, args.images, args.added, rng)
+        backbone.passes = 0
+        stats = cache.update()
+        retrain_passes = backbone.passes
+        print(f"retrain  {stats['seconds']:7.2f} s  {retrain_passes:6d} backbone passes  {stats}")
+        ok &= stats["embedded"] == args.added and stats["removed"] == 1
+        ok &= retrain_passes == args.added * (args.views + 1)
+
+        features, rows, labels, _, validation = cache.load()
+        kept = cache.meta()["images"]
+        ok &= removed not in {e["path"] for e in kept}
+        ok &= all(np.array_equal(features[e["row"]], before[e["path"]]) for e in kept if e["path"] in before)
+
+        backbone.passes = 0
+        stats = cache.update()
+        print(f"no-op    {stats['seconds']:7.2f} s  {backbone.passes:6d} backbone passes")
+        ok &= backbone.passes == 0
+
+        t0 = time.perf_counter()
+        X = sample_views(features, rows[~validation], features.shape[1], rng)
+        epoch_ms = (time.perf_counter() - t0) * 1000
+        print(f"epoch    {epoch_ms:7.1f} ms to draw {X.shape} views from the memory map "
+              f"({int(validation.sum())} images held out)")
+
+        total = len(rows)
+        generator = GENERATOR_EPOCHS * total * args.backbone_ms / 1000
+        print(f"generator pipeline: {GENERATOR_EPOCHS} epochs x {total} images = "
+              f"{GENERATOR_EPOCHS * total} backbone passes per training run, ~{generator:.1f} s of backbone time "
+              f"vs {retrain_passes} passes for this retrain")
+
+        try:
+            import tensorflow  # noqa: F401
+        except ImportError:
+            print("head training: skipped (TensorFlow not installed)")
+        else:
+            sys.path.insert(0, os.path.join(BACKEND_DIR, "ml_core", "training"))
+            from vision_classification_model import build_head, CachedViews
+            head = build_head(len(classes), features.shape[-1])
+            t0 = time.perf_counter()
+            head.fit(CachedViews(features, rows, labels, features.shape[1]), epochs=20, verbose=0)
+            print(f"head training: 20 epochs in {time.perf_counter() - t0:.2f} s")
+        del features
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("checks", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
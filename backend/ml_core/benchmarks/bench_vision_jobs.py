@@ -0,0 +1,157 @@
+# Gemini vision job queue vs inline calls under a provider rate limit
+# ===================================================================
+#
+# A local Gemini stand-in (bench_outbound.StandIn) answers after --upstream-ms
+# and returns 429 (Retry-After: 1) once more than --provider-limit calls
+# arrive within one second. --workers threads (standing in for Flask workers)
+# send --images distinct images:
+#
+#   inline   each request thread calls the provider itself (the pre-queue code
+#            path): the worker is held for the whole remote call and nothing
+#            stops the burst from tripping the provider's limit
+#   queued   POST /api/vision/jobs returns a job id at once; the queue's workers
+#            drain it under a token bucket set just below the provider limit and the
+#            clients poll GET /api/vision/jobs/<id>?wait= (capped at MAX_JOB_WAIT)
+#
+# Reports how long request threads were held, 429s seen by the provider, and
+# how many images ended with a verdict.
+#
+#   python -m ml_core.benchmarks.bench_vision_jobs          # from backend/
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+from collections import deque
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.benchmarks.bench_outbound import StandIn, gemini  # noqa: E402
+
+
+def rate_limited(limit):
+    recent, lock = deque(), threading.Lock()
+    counts = {"429": 0}
+
+    def respond(path, body):
+        now = time.monotonic()
+        with lock:
+            while recent and now - recent[0] > 1.0:
+                recent.popleft()
+            if len(recent) >= limit:
+                counts["429"] += 1
+                return 429, "application/json", b'{"error": {"code": 429}}'
+            recent.append(now)
+        return gemini(path, body)
+    return respond, counts
+
+
+def run_threads(workers, items, fn):
+    held, lock = [], threading.Lock()
+    pending = list(items)
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                item = pending.pop()
+            t0 = time.perf_counter()
+            fn(item)
+            with lock:
+                held.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    held.sort()
+    return time.perf_counter() - started, held
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gemini vision job queue vs inline calls under a provider rate limit.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--upstream-ms", type=float, default=800)
+    parser.add_argument("--provider-limit", type=int, default=4, help="Calls per second before 429s")
+    args = parser.parse_args(argv)
+
+    respond, counts = rate_limited(args.provider_limit)
+    server = StandIn("gemini", respond)
+    server.latency = args.upstream_ms / 1000
+    os.environ["AQUA_GEMINI_URL"] = server.url
+    os.environ["GEMINI_API_KEY"] = "stand-in"
+    os.environ["AQUA_HTTP_POOL"] = str(args.workers * 2)
+
+    from flask import Flask
+    from core.vision_jobs import VisionJobQueue, GeminiProvider
+    from routes import vision
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    app.register_blueprint(vision.vision_bp)
+    client = app.test_client()
+
+    images = [("image/png", base64.b64encode(f"image {i}".encode()).decode()) for i in range(args.images)]
+    provider = GeminiProvider()
+    results = {}
+
+    # inline: the request thread makes the call
+    verdicts = []
+
+    def inline(image):
+        try:
+            verdicts.append(provider(*image))
+        except Exception:
+            pass
+
+    counts["429"] = 0
+    elapsed, held = run_threads(args.workers, images, inline)
+    results["inline"] = {"seconds": round(elapsed, 2), "held_p50_ms": round(held[len(held) // 2] * 1000, 1),
+                         "held_max_ms": round(held[-1] * 1000, 1), "provider_429s": counts["429"],
+                         "verdicts": len(verdicts)}
+    print(f"inline {results['inline']}")
+
+    # queued: submit returns a job id, clients long-poll for the verdict
+    time.sleep(1.1)   # let the provider's window forget the inline burst
+    vision.VISION_JOBS = jobs = VisionJobQueue(provider, workers=4, rate=args.provider_limit * 0.9, burst=1)
+    job_ids = []
+
+    def submit(image):
+        res = client.post("/api/vision/jobs", json={"image_base64": f"data:{image[0]};base64,{image[1]}"})
+        job_ids.append(res.get_json()["job_id"])
+
+    counts["429"] = 0
+    started = time.perf_counter()
+    _, held = run_threads(args.workers, images, submit)
+    done = []
+
+    def poll(job_id):
+        while True:
+            job = client.get(f"/api/vision/jobs/{job_id}?wait={vision.MAX_JOB_WAIT}").get_json()["job"]
+            if job["status"] in ("done", "failed"):
+                done.append(job["status"] == "done" and bool(job["result"]))
+                return
+
+    run_threads(args.workers, job_ids, poll)
+    elapsed = time.perf_counter() - started
+    results["queued"] = {"seconds": round(elapsed, 2), "held_p50_ms": round(held[len(held) // 2] * 1000, 1),
+                         "held_max_ms": round(held[-1] * 1000, 1), "provider_429s": counts["429"],
+                         "verdicts": sum(done)}
+    print(f"queued {results['queued']}")
+    print(f"queue {jobs.metrics()}")
+
+    ok = results["queued"]["verdicts"] == args.images and results["queued"]["provider_429s"] == 0
+    print("checks", "ok" if ok else "FAILED")
+    print(json.dumps(results))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
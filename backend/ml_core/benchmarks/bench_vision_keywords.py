@@ -0,0 +1,100 @@
+# Vision keyword matching: per-label substring loops vs the Aho-Corasick automaton
+# ===============================================================================
+#
+# Fills AQUAVISION_DB["custom_labels"] with --sizes synthetic labels, then for
+# a set of upload filenames / detected types compares
+#
+#   loops       the old matching: every custom label, then every identifier,
+#               tested with `in` against the filename and detected type
+#   automaton   routes.vision's VISION_KEYWORDS (one pass per text)
+#
+# checking both pick the same entry, and times adding one more label the way
+# /api/vision/train does (linking it into the automaton) plus the next lookup.
+#
+#   python -m ml_core.benchmarks.bench_vision_keywords          # from backend/
+
+import os
+import sys
+import time
+import random
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+WORDS = ["gill", "spot", "white", "black", "red", "tail", "fin", "rot", "shell", "ulcer", "gut",
+         "pond", "cage", "tank", "algae", "bloom", "mud", "soft", "molt", "larva"]
+
+
+def loops_match(custom_labels, identifiers, filename, detected_type):
+    for keyword, data in custom_labels.items():
+        if keyword in filename or (detected_type and keyword in detected_type):
+            return data
+    for key, info in identifiers.items():
+        if key in filename:
+            return info
+    if detected_type:
+        for key, info in identifiers.items():
+            if key in detected_type:
+                return info
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vision keyword matching: per-label loops vs the Aho-Corasick automaton.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args(argv)
+    rng = random.Random(3)
+
+    from routes import vision
+    labels = vision.AQUAVISION_DB.setdefault("custom_labels", {})
+    saved = dict(labels)
+
+    def label():
+        return "-".join(rng.sample(WORDS, 3)) + str(rng.randrange(10**6))
+
+    texts = [("_".join(rng.sample(WORDS + ["shrimp", "tilapia", "crab", "water"], 3)) + ".jpg",
+              rng.choice(["", "fish", "mud crab", "king prawn"])) for _ in range(args.lookups)]
+
+    ok = True
+    try:
+        for size in args.sizes:
+            while len(labels) < size:
+                vision.AQUAVISION_DB["custom_labels"][label()] = {"type": "x"}
+                vision._add_custom_keyword(list(labels)[-1])
+            # A few texts hit custom labels, the rest fall through to the identifiers
+            probes = texts + [(f"img_{k}.jpg", "") for k in rng.sample(list(labels), min(50, len(labels)))]
+
+            t0 = time.perf_counter()
+            expected = [loops_match(labels, vision.AQUA_IDENTIFIERS, f, d) for f, d in probes]
+            loops = (time.perf_counter() - t0) / len(probes) * 1e6
+
+            def automaton_match(f, d):
+                _, tag = vision._keyword_match(f, d)
+                return vision._keyword_info(tag) if tag else None
+
+            t0 = time.perf_counter()
+            got = [automaton_match(f, d) for f, d in probes]
+            automaton = (time.perf_counter() - t0) / len(probes) * 1e6
+            same = got == expected
+            ok &= same
+
+            t0 = time.perf_counter()
+            keyword = label()
+            labels[keyword] = {"type": "x"}
+            vision._add_custom_keyword(keyword)
+            vision.VISION_KEYWORDS.find("")
+            add = (time.perf_counter() - t0) * 1000
+            print(f"{size:6d} labels: loops {loops:8.1f} us  automaton {automaton:6.1f} us  "
+                  f"add + lookup {add:6.2f} ms  same answers: {same}")
+    finally:
+        labels.clear()
+        labels.update(saved)
+
+    print("checks", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# Peak request memory: base64 JSON analyze vs streamed image upload
+# =================================================================
+#
+# Sends the same synthetic PNG (a real header, random payload) of --sizes MB to
+#
+#   json        POST /api/vision/analyze with a data: URL in JSON (the old path)
+#   multipart   POST /api/vision/upload, the file as the "image" form field
+#   raw         POST /api/vision/upload with an image/png body
+#
+# and reports the Python heap peak (tracemalloc) while the app handles each
+# request, with the WSGI environ built beforehand so the client's own copy of
+# the body is not counted. The vision model is replaced by a stand-in that
+# only holds on to the bytes it is given, so what is measured is getting the
+# image from the wire to the model's door. Also checks that oversized and
+# too-many-pixel uploads are refused before the body is read.
+#
+#   python -m ml_core.benchmarks.bench_vision_upload          # from backend/
+
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import base64
+import struct
+import argparse
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def png(n_bytes, width=3000, height=2000):
+    """A PNG signature and IHDR for width x height followed by n_bytes of noise."""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + chunk + os.urandom(max(0, n_bytes - 33))
+
+
+class StandInModel:
+    """Takes the encoded image like VISION.classify does and answers nothing."""
+
+    def __init__(self):
+        self.received = 0
+
+    def available(self):
+        return True
+
+    def classify(self, image_bytes, timeout=None):
+        self.received = len(image_bytes)
+        return None
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        self.consumed += n
+        return n
+
+
+def measure(app, builder):
+    environ = builder.get_environ()
+    body = environ["wsgi.input"]
+    body.seek(0)
+    environ["wsgi.input"] = stream = CountingStream(body.read())
+    del body
+    status = []
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    response = b"".join(app(environ, lambda s, h, exc_info=None: status.append(s)))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"status": int(status[0].split()[0]), "peak_mb": round(peak / 2**20, 2),
+            "ms": round(elapsed * 1000, 1), "read_mb": round(stream.consumed / 2**20, 2),
+            "response": json.loads(response or b"{}")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak request memory: base64 JSON analyze vs streamed image upload.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 8], help="Image sizes in MB")
+    parser.add_argument("--json", help="Write the results here")
+    args = parser.parse_args(argv)
+
+    from flask import Flask
+    from werkzeug.test import EnvironBuilder
+    from routes import vision
+    from ml_core import vision_service
+    app = Flask(__name__)
+    app.secret_key = "bench"
+    app.register_blueprint(vision.vision_bp)
+    vision.VISION = model = StandInModel()
+    os.environ.pop("GEMINI_API_KEY", None)
+
+    def requests_for(image):
+        data_url = "data:image/png;base64," + base64.b64encode(image).decode()
+        return {
+            "json": EnvironBuilder(path="/api/vision/analyze", method="POST",
+                                   json={"filename": "pond.png", "image_base64": data_url}),
+            "multipart": EnvironBuilder(path="/api/vision/upload", method="POST",
+                                        data={"image": (io.BytesIO(image), "pond.png", "image/png"),
+                                              "filename": "pond.png"}),
+            "raw": EnvironBuilder(path="/api/vision/upload?filename=pond.png", method="POST",
+                                  data=image, content_type="image/png"),
+        }
+
+    results, ok = {}, True
+    for mb in args.sizes:
+        image = png(int(mb * 2**20))
+        for path, builder in requests_for(image).items():
+            model.received = 0
+            stats = measure(app, builder)
+            stats["model_got_image"] = model.received == len(image)
+            ok &= stats["status"] == 200 and stats["model_got_image"]
+            stats.pop("response")
+            results[f"{mb:g}MB/{path}"] = stats
+            print(f"{mb:5g} MB {path:9s} {stats}")
+
+    # Refusals: a body over the byte limit, and a small file whose header is too big
+    limit = vision_service.MAX_UPLOAD_BYTES
+    huge = png(limit + 2**20)
+    wide = png(2**20, width=vision_service.MAX_SIDE * 2, height=100)
+    for label, image in [("over_bytes", huge), ("over_pixels", wide)]:
+        for path, builder in requests_for(image).items():
+            if path == "json":
+                continue
+            stats = measure(app, builder)
+            stats.pop("response")
+            results[f"{label}/{path}"] = stats
+            print(f"{label:11s} {path:9s} {stats}")
+            ok &= stats["status"] == 413
+            if path == "raw":
+                # Refused after at most the chunk carrying the header (or not read at all)
+                ok &= stats["read_mb"] <= vision_service.UPLOAD_CHUNK / 2**20
+
+    print("checks", "ok" if ok else "FAILED")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# AQUA Model Build Orchestrator
+# =============================
+#
+# Trains the seven prediction bundles in a process pool and publishes each one
+# to the model registry (atomic version directory + CURRENT pointer). A trainer
+# is skipped when neither its dataset nor its code changed since the last build,
+# so a no-op rebuild only stats/hashes files and returns in well under a second.
+#
+#   python -m ml_core.build_models                 # from backend/
+#   python -m ml_core.build_models --force --only stocking yield
+#   python -m ml_core.build_models --dry-run
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.registry import REGISTRY_DIR, BUNDLE_DATASETS, MODEL_BUNDLES, ModelRegistry, file_sha256  # noqa: E402
+
+TRAINING_DIR = os.path.join(BACKEND_DIR, "ml_core", "training")
+STATE_FILE = os.path.join(REGISTRY_DIR, "build_state.json")
+REPORT_FILE = os.path.join(REGISTRY_DIR, "build_report.json")
+
+# Bundle name -> trainer module in ml_core/training/
+TRAINERS = {name: f"ml_core.training.{name}_model" for name in MODEL_BUNDLES}
+
+# Files whose change invalidates every bundle
+SHARED_CODE = [os.path.join(TRAINING_DIR, "custom_algorithms.py"), os.path.join(BACKEND_DIR, "ml_core", "compaction.py"),
+               os.path.join(BACKEND_DIR, "ml_core", "dataset_cache.py")]
+
+
+def trainer_path(name):
+    return os.path.join(TRAINING_DIR, f"{name}_model.py")
+
+
+def _load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {"bundles": {}, "hash_cache": {}}
+
+
+def _save_state(state):
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp, STATE_FILE)
+
+
+def cached_sha256(path, hash_cache):
+    """sha256 of a file, reusing the previous digest while size and mtime are unchanged.
+    Keeps no-op rebuilds cheap even for multi-million-row datasets."""
+    st = os.stat(path)
+    key = f"{st.st_size}:{st.st_mtime_ns}"
+    rel = os.path.relpath(path, BACKEND_DIR)
+    entry = hash_cache.get(rel)
+    if entry and entry["key"] == key:
+        return entry["sha256"]
+    digest = file_sha256(path)
+    hash_cache[rel] = {"key": key, "sha256": digest}
+    return digest
+
+
+def fingerprint(name, hash_cache):
+    code = [trainer_path(name)] + [p for p in SHARED_CODE if os.path.exists(p)]
+    return {
+        "dataset_sha256": cached_sha256(BUNDLE_DATASETS[name], hash_cache),
+        "code_sha256": "".join(cached_sha256(p, hash_cache)[:16] for p in code),
+    }
+
+
+def _run_trainer(name, dataset_path, promote):
+    """Executed in a worker process: train one bundle and publish it."""
+    started = time.time()
+    module = importlib.import_module(TRAINERS[name])
+    artifacts, metrics = module.train(dataset_path)
+    metrics["train_seconds"] = round(time.time() - started, 2)
+    manifest = ModelRegistry().publish(name, artifacts, metrics=metrics, dataset_path=dataset_path, promote=promote)
+    return manifest
+
+
+def build(names=None, force=False, jobs=None, promote=True, dry_run=False):
+    started = time.time()
+    names = names or list(TRAINERS)
+    state = _load_state()
+    hash_cache = state.setdefault("hash_cache", {})
+    registry = ModelRegistry()
+
+    report = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "bundles": {}}
+    todo = {}
+    for name in names:
+        fp = fingerprint(name, hash_cache)
+        prev = state["bundles"].get(name, {})
+        up_to_date = (
+            prev.get("dataset_sha256") == fp["dataset_sha256"]
+            and prev.get("code_sha256") == fp["code_sha256"]
+            and os.path.isdir(os.path.join(REGISTRY_DIR, name, prev.get("version", "-")))
+        )
+        if up_to_date and not force:
+            report["bundles"][name] = {"status": "skipped", "version": prev["version"],
+                                       "current": registry.current_version(name)}
+        else:
+            todo[name] = fp
+
+    if dry_run:
+        for name in todo:
+            report["bundles"][name] = {"status": "would_build"}
+    elif todo:
+        workers = jobs or min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_trainer, name, BUNDLE_DATASETS[name], promote): name for name in todo}
+            for fut in as_completed(futures):
+                name = futures[fut]
+                try:
+                    manifest = fut.result()
+                except Exception as e:
+                    report["bundles"][name] = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+                    continue
+                state["bundles"][name] = dict(todo[name], version=manifest["version"])
+                report["bundles"][name] = {"status": "built", "version": manifest["version"],
+                                           "metrics": manifest["metrics"], "promoted": promote}
+
+    report["elapsed_seconds"] = round(time.time() - started, 3)
+    if not dry_run:
+        _save_state(state)
+        tmp = REPORT_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=4)
+        os.replace(tmp, REPORT_FILE)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the AQUA prediction models.")
+    parser.add_argument("--only", nargs="*", choices=list(TRAINERS), help="Bundles to consider (default: all)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if inputs are unchanged")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: one per bundle, capped at CPU count)")
+    parser.add_argument("--no-promote", action="store_true", help="Publish new versions without promoting them")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be rebuilt")
+    args = parser.parse_args(argv)
+
+    report = build(args.only, force=args.force, jobs=args.jobs, promote=not args.no_promote, dry_run=args.dry_run)
+    for name, r in sorted(report["bundles"].items()):
+        extra = r.get("error") or r.get("metrics") or ""
+        print(f"{name:10s} {r['status']:12s} {r.get('version', ''):20s} {extra}")
+    print(f"--- Build finished in {report['elapsed_seconds']}s ---")
+    return 1 if any(r["status"] == "failed" for r in report["bundles"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
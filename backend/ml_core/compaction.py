@@ -0,0 +1,354 @@
+# AQUA Forest Compaction
+# ======================
+#
+# Post-training step that turns a fitted sklearn forest (RandomForest /
+# ExtraTrees, regressor or classifier, single or multi-output) into a
+# CompactForest: all trees flattened into shared arrays with
+#
+#   feature    int8/int16     split feature per node
+#   threshold  float32        rounded *down* so x <= t splits exactly as before
+#   left/right int32          child index; leaves point at themselves
+#   leaf       int32          row in the deduplicated leaf value table
+#   values     float32        unique leaf outputs (regression) or class probabilities
+#
+# Optional (opt-in) pruning collapses nodes below ``max_depth`` and keeps at most
+# ``max_leaves`` leaves per tree (best-first by weighted impurity decrease), using
+# the mean value sklearn stores on every internal node. compact_forest() returns
+# the compact model together with a size / accuracy report for the manifest.
+
+import io
+import heapq
+import time
+import numpy as np
+import joblib
+
+# Pruning applied by the trainers per bundle. Lossy pruning is opt-in: a bundle missing
+# here gets {} (every node kept, float32 thresholds and deduplicated leaf values), so
+# predictions only move by float32 rounding. Measured with holdout_report() on a 20%
+# holdout, the settings once applied by default changed served predictions too much:
+#
+#   disease  max_depth=16                     accuracy -0.0045, 79% agreement with the
+#                                             full forest (92k -> 38k nodes)
+#   buyer    max_depth=10, max_leaves=256     max abs diff ~180k (217k -> 10k nodes)
+#   stocking max_depth=10, max_leaves=256     max abs diff ~16k (250k -> 10k nodes)
+#
+# (on the regression bundles r2 went up, from below zero to about -0.02, because the
+# full-depth trees overfit noise.) Add a bundle only after checking its holdout_report;
+# trainers can also opt in per run with train(compaction={...}).
+COMPACTION = {}
+
+# Share of rows held out when scoring a bundle's compaction (as bench_compaction.py does)
+HOLDOUT = 0.2
+HOLDOUT_SEED = 42
+MIN_HOLDOUT_ROWS = 50
+
+SUPPORTED = ("RandomForestRegressor", "RandomForestClassifier", "ExtraTreesRegressor", "ExtraTreesClassifier")
+
+
+def _floor_float32(values):
+    """Largest float32 <= each float64 value, so float32 inputs compare identically."""
+    out = values.astype(np.float32)
+    over = out.astype(np.float64) > values
+    out[over] = np.nextafter(out[over], np.float32(-np.inf))
+    return out
+
+
+def _kept_nodes(tree, max_depth=None, max_leaves=None):
+    """Node ids that stay internal after pruning (all others in the kept subtree become leaves)."""
+    left, right = tree.children_left, tree.children_right
+    if max_depth is None and max_leaves is None:
+        return {i for i in range(tree.node_count) if left[i] != -1}
+
+    weighted = tree.weighted_n_node_samples * tree.impurity
+
+    def gain(i):
+        return weighted[i] - weighted[left[i]] - weighted[right[i]]
+
+    internal = set()
+    # Best-first expansion, like growing with max_leaf_nodes, limited by depth
+    heap = [(-gain(0), 0, 0)] if left[0] != -1 else []
+    leaves = 1
+    while heap and (max_leaves is None or leaves < max_leaves):
+        _, node, depth = heapq.heappop(heap)
+        if max_depth is not None and depth >= max_depth:
+            continue
+        internal.add(node)
+        leaves += 1
+        for child in (left[node], right[node]):
+            if left[child] != -1:
+                heapq.heappush(heap, (-gain(child), child, depth + 1))
+    return internal
+
+
+class CompactForest:
+    """Array-backed replacement for a fitted forest; ``predict`` matches the original
+    (within float32 leaf precision) when no pruning is applied."""
+
+    def __init__(self, feature, threshold, left, right, leaf, values, roots, depth,
+                 n_features_in_, n_outputs_, classes_=None, source=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf = leaf
+        self.values = values
+        self.roots = roots
+        self.depth = depth
+        self.n_features_in_ = n_features_in_
+        self.n_outputs_ = n_outputs_
+        if classes_ is not None:
+            self.classes_ = classes_
+        self.source = source
+
+    @classmethod
+    def from_forest(cls, model, max_depth=None, max_leaves=None, value_dtype=np.float32):
+        kind = type(model).__name__
+        if kind not in SUPPORTED:
+            raise TypeError(f"Cannot compact {kind}; supported: {', '.join(SUPPORTED)}")
+        is_classifier = hasattr(model, "classes_")
+        if is_classifier and model.n_outputs_ != 1:
+            raise TypeError("Multi-output classifiers are not supported")
+
+        features, thresholds, lefts, rights, leaf_rows, leaf_masks, roots = [], [], [], [], [], [], []
+        offset, max_seen_depth = 0, 0
+        for est in model.estimators_:
+            tree = est.tree_
+            internal = _kept_nodes(tree, max_depth, max_leaves)
+            # Renumber the kept subtree breadth-first; pruned leaves point at themselves
+            order, ids, depth_of = [0], {0: 0}, [0]
+            l_ids, r_ids = [], []
+            for i, node in enumerate(order):
+                if node in internal:
+                    for child in (tree.children_left[node], tree.children_right[node]):
+                        ids[child] = len(order)
+                        order.append(child)
+                        depth_of.append(depth_of[i] + 1)
+                    l_ids.append(ids[tree.children_left[node]])
+                    r_ids.append(ids[tree.children_right[node]])
+                else:
+                    l_ids.append(i)
+                    r_ids.append(i)
+            max_seen_depth = max(max_seen_depth, max(depth_of))
+            nodes = np.array(order)
+            is_internal = np.array([n in internal for n in order], dtype=bool)
+            features.append(np.where(is_internal, tree.feature[nodes], 0))
+            thresholds.append(np.where(is_internal, tree.threshold[nodes], np.inf))
+            lefts.append(np.array(l_ids) + offset)
+            rights.append(np.array(r_ids) + offset)
+            if is_classifier:
+                vals = tree.value[nodes][:, 0, :]
+                vals = vals / np.maximum(vals.sum(axis=1, keepdims=True), 1e-12)
+            else:
+                vals = tree.value[nodes][:, :, 0]
+            leaf_rows.append(vals)
+            leaf_masks.append(~is_internal)
+            roots.append(offset)
+            offset += len(order)
+
+        rows = np.concatenate(leaf_rows).astype(value_dtype)
+        is_leaf = np.concatenate(leaf_masks)
+        values, inverse = np.unique(rows[is_leaf], axis=0, return_inverse=True)
+        leaf = np.full(len(rows), -1, dtype=np.int32)
+        leaf[is_leaf] = inverse.ravel()
+
+        n_features = model.n_features_in_
+        feature = np.concatenate(features).astype(np.int8 if n_features < 127 else np.int16)
+        return cls(
+            feature=feature,
+            threshold=_floor_float32(np.concatenate(thresholds)),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            leaf=leaf,
+            values=values,
+            roots=np.array(roots, dtype=np.int32),
+            depth=int(max_seen_depth),
+            n_features_in_=n_features,
+            n_outputs_=model.n_outputs_,
+            classes_=getattr(model, "classes_", None),
+            source={"estimator": type(model).__name__, "n_estimators": len(model.estimators_),
+                    "max_depth": max_depth, "max_leaves": max_leaves},
+        )
+
+    @classmethod
+    def concat(cls, forests):
+        """One forest averaging every tree of ``forests`` (e.g. a served model plus trees fit
+        on new data). Classifier probability columns are aligned on the first forest's classes."""
+        first = forests[0]
+        classes = getattr(first, "classes_", None)
+        features, thresholds, lefts, rights, leaves, value_parts, roots = [], [], [], [], [], [], []
+        node_offset, value_offset = 0, 0
+        for f in forests:
+            if f.n_features_in_ != first.n_features_in_ or f.n_outputs_ != first.n_outputs_:
+                raise ValueError("Cannot concatenate forests with different inputs or outputs")
+            values = f.values
+            if classes is not None:
+                pos = np.searchsorted(classes, f.classes_)
+                if np.any(pos >= len(classes)) or not np.array_equal(classes[np.minimum(pos, len(classes) - 1)], f.classes_):
+                    raise ValueError(f"Classes {list(f.classes_)} are not a subset of {list(classes)}")
+                values = np.zeros((len(f.values), len(classes)), dtype=f.values.dtype)
+                values[:, pos] = f.values
+            features.append(f.feature)
+            thresholds.append(f.threshold)
+            lefts.append(f.left + node_offset)
+            rights.append(f.right + node_offset)
+            leaves.append(np.where(f.leaf >= 0, f.leaf + value_offset, -1))
+            value_parts.append(values)
+            roots.append(f.roots + node_offset)
+            node_offset += f.node_count
+            value_offset += len(values)
+
+        values, inverse = np.unique(np.concatenate(value_parts), axis=0, return_inverse=True)
+        leaf = np.concatenate(leaves)
+        leaf = np.where(leaf >= 0, inverse.ravel()[np.maximum(leaf, 0)], -1).astype(np.int32)
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            leaf=leaf,
+            values=values,
+            roots=np.concatenate(roots).astype(np.int32),
+            depth=max(f.depth for f in forests),
+            n_features_in_=first.n_features_in_,
+            n_outputs_=first.n_outputs_,
+            classes_=classes,
+            source=dict(first.source or {}, n_estimators=int(sum(f.n_trees for f in forests))),
+        )
+
+    def select_trees(self, trees):
+        """A forest made of the given tree indices only (used to drop old incremental trees)."""
+        ends = np.append(self.roots[1:], self.node_count)
+        parts = []
+        for t in trees:
+            start, end = int(self.roots[t]), int(ends[t])
+            parts.append(CompactForest(
+                feature=self.feature[start:end], threshold=self.threshold[start:end],
+                left=self.left[start:end] - start, right=self.right[start:end] - start,
+                leaf=self.leaf[start:end], values=self.values, roots=np.zeros(1, dtype=np.int32),
+                depth=self.depth, n_features_in_=self.n_features_in_, n_outputs_=self.n_outputs_,
+                classes_=getattr(self, "classes_", None), source=self.source,
+            ))
+        return CompactForest.concat(parts)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaf_values(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        # Leaves point at themselves, so all (row, tree) pairs take ``depth`` steps in lockstep
+        for _ in range(self.depth):
+            node = np.where(X[rows, self.feature[node]] <= self.threshold[node], self.left[node], self.right[node])
+        return self.values[self.leaf[node]]  # (n_samples, n_trees, n_values)
+
+    def predict_proba(self, X):
+        if not hasattr(self, "classes_"):
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._leaf_values(X).mean(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        mean = self._leaf_values(X).mean(axis=1, dtype=np.float64)
+        if hasattr(self, "classes_"):
+            return self.classes_.take(np.argmax(mean, axis=1))
+        return mean[:, 0] if self.n_outputs_ == 1 else mean
+
+    def nbytes(self):
+        return sum(getattr(self, k).nbytes for k in ("feature", "threshold", "left", "right", "leaf", "values", "roots"))
+
+
+def _pickled_size(obj):
+    buf = io.BytesIO()
+    joblib.dump(obj, buf)
+    return buf.tell()
+
+
+def _score(model, X, y):
+    pred = model.predict(X)
+    if hasattr(model, "classes_"):
+        return "accuracy", float(np.mean(pred == np.asarray(y)))
+    y = np.asarray(y, dtype=np.float64).reshape(pred.shape)
+    ss_res = ((y - pred) ** 2).sum(axis=0)
+    ss_tot = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    return "r2", float(np.mean(1 - ss_res / np.where(ss_tot == 0, 1, ss_tot)))
+
+
+def score_report(original, compact, X, y):
+    """Score of ``original`` and ``compact`` on (X, y) and how far their predictions drift apart."""
+    X = np.asarray(X, dtype=np.float64)
+    metric, before = _score(original, X, y)
+    _, after = _score(compact, X, y)
+    report = {
+        "metric": metric,
+        "score_before": round(before, 6),
+        "score_after": round(after, 6),
+        "score_loss": round(before - after, 6),
+    }
+    if metric == "accuracy":
+        report["agreement"] = float(np.mean(original.predict(X) == compact.predict(X)))
+    else:
+        report["max_abs_diff"] = float(np.max(np.abs(original.predict(X) - compact.predict(X))))
+    return report
+
+
+def compaction_report(original, compact, X, y):
+    """Size, node count, score and prediction drift of ``compact`` against ``original``."""
+    report = {
+        "max_depth": compact.source["max_depth"],
+        "max_leaves": compact.source["max_leaves"],
+        "nodes_before": int(sum(e.tree_.node_count for e in original.estimators_)),
+        "nodes_after": compact.node_count,
+        "unique_leaf_values": int(len(compact.values)),
+        "bytes_before": _pickled_size(original),
+        "bytes_after": _pickled_size(compact),
+    }
+    report.update(score_report(original, compact, X, y))
+    return report
+
+
+def compact_forest(model, X, y, max_depth=None, max_leaves=None):
+    """Compact a fitted forest; returns (CompactForest, report). Unsupported models are
+    returned unchanged with ``report=None`` so trainers can call this unconditionally."""
+    if type(model).__name__ not in SUPPORTED:
+        return model, None
+    started = time.perf_counter()
+    compact = CompactForest.from_forest(model, max_depth=max_depth, max_leaves=max_leaves)
+    report = compaction_report(model, compact, X, y)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return compact, report
+
+
+def holdout_report(model, X, y, holdout=HOLDOUT, **settings):
+    """score_report() of an unfitted copy of ``model`` trained on the rest of (X, y) and
+    compacted with ``settings``, measured on a ``holdout`` share it never saw."""
+    from sklearn.base import clone
+    from sklearn.model_selection import train_test_split
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    X_fit, X_test, y_fit, y_test = train_test_split(X, y, test_size=holdout, random_state=HOLDOUT_SEED)
+    probe = clone(model).fit(X_fit, y_fit)
+    return score_report(probe, CompactForest.from_forest(probe, **settings), X_test, y_test)
+
+
+def compact_bundle_model(name, model, X, y, compaction=None):
+    """Trainer hook: ``compaction`` None uses COMPACTION[name], False disables compaction,
+    a dict overrides the pruning settings. Sizes are those of the served model; scores
+    come from holdout_report(), since pruning loses in-sample fit by design."""
+    if compaction is False:
+        return model, None
+    settings = COMPACTION.get(name, {}) if compaction is None else compaction
+    compact, report = compact_forest(model, X, y, **settings)
+    if report is not None:
+        if len(y) >= MIN_HOLDOUT_ROWS:
+            report.update(holdout_report(model, X, y, **settings))
+            report["evaluated_on"] = f"{HOLDOUT:.0%} holdout"
+        else:
+            report["evaluated_on"] = "training data"
+    return compact, report
@@ -0,0 +1,209 @@
+# AQUA Columnar Dataset Cache
+# ===========================
+#
+# Converts each CSV in ml_core/datasets/ once into a directory of NumPy .npy
+# files (one per column) so trainers and the offline export stop re-parsing
+# text and re-inferring dtypes on every run:
+#
+#   datasets/.cache/<stem>/meta.json     source size/mtime/sha256, column specs
+#   datasets/.cache/<stem>/c<i>.npy      numeric column values
+#   datasets/.cache/<stem>/c<i>.npy      categorical column codes (int8/16/32)
+#
+# Text columns become categoricals with sorted categories, so their codes equal
+# what LabelEncoder would assign. Loads read only the requested columns, memory
+# mapped. The cache is rebuilt automatically when the CSV changes.
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "datasets"))
+CACHE_DIRNAME = ".cache"
+CHUNK_ROWS = 1_000_000
+FORMAT_VERSION = 1
+
+# Columns shipped to the browser for offline predictions (offline-manager.js).
+# Free-text generator columns (districts, coordinates, supplier names, phone
+# numbers) are never used offline and made up most of the payload.
+OFFLINE_EXPORT_COLUMNS = {
+    "disease": ["Water_Temp", "pH", "DO", "Salinity", "Turbidity", "Disease_Risk", "Disease_Type", "Suggested_Medicine"],
+    "location": ["Country", "State", "Climate_Zone", "Season", "Aqua_Type", "Species", "Suitability_Score"],
+    "feed": ["Species", "Age_Days", "Water_Temp", "DO", "Feed_Type", "Protein", "Feed_Quantity"],
+    "yield": ["Species", "Pond_Area", "Feed_Used", "Culture_Days", "Expected_Yield"],
+    "buyer": ["Target_Country", "Species", "Required_Quantity", "Quality_Grade", "Price_Offered"],
+    "stocking": ["Species", "Pond_Area", "Soil_Type", "Water_Source", "Season", "Recommended_Stocking", "Survival_Rate"],
+    "seed": ["Country", "State", "Species", "Seed_Quality_Rating", "Distance_km"],
+}
+
+_build_lock = threading.Lock()
+_export_cache = {}
+
+
+def dataset_path(name):
+    return os.path.join(DATASET_DIR, f"{name}.csv")
+
+
+def cache_dir_for(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIRNAME, stem)
+
+
+def _source_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_meta(cache_dir):
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def is_fresh(csv_path):
+    meta = _read_meta(cache_dir_for(csv_path))
+    return bool(meta) and meta.get("format") == FORMAT_VERSION and meta.get("source") == _source_stamp(csv_path)
+
+
+def _smallest_int_dtype(n_categories):
+    for dt in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dt).max:
+            return dt
+    return np.int64
+
+
+def build_cache(csv_path, chunk_rows=CHUNK_ROWS):
+    """Parse the CSV once (in chunks, so memory stays bounded by the output size) and write
+    the columnar cache atomically. Returns the cache metadata."""
+    import hashlib
+
+    source = _source_stamp(csv_path)
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    numeric_parts, cat_parts, cat_index = {}, {}, {}
+    columns = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if columns is None:
+            columns = list(chunk.columns)
+            for col in columns:
+                if pd.api.types.is_numeric_dtype(chunk[col]) or pd.api.types.is_bool_dtype(chunk[col]):
+                    numeric_parts[col] = []
+                else:
+                    cat_parts[col], cat_index[col] = [], {}
+        for col in numeric_parts:
+            numeric_parts[col].append(chunk[col].to_numpy())
+        for col in cat_parts:
+            codes, uniques = pd.factorize(chunk[col])
+            index = cat_index[col]
+            remap = np.array([index.setdefault(u, len(index)) for u in uniques] + [-1], dtype=np.int64)
+            cat_parts[col].append(remap[codes])  # code -1 (missing) hits the trailing -1
+
+    columns = columns or []
+    cache_dir = cache_dir_for(csv_path)
+    parent = os.path.dirname(cache_dir)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+    meta = {"format": FORMAT_VERSION, "source": source, "sha256": digest.hexdigest(), "rows": 0, "columns": {}}
+    try:
+        for i, col in enumerate(columns):
+            fname = f"c{i}.npy"
+            if col in numeric_parts:
+                values = np.concatenate(numeric_parts.pop(col)) if numeric_parts[col] else np.array([])
+                np.save(os.path.join(staging, fname), values)
+                meta["columns"][col] = {"file": fname, "kind": "numeric", "dtype": str(values.dtype)}
+            else:
+                raw = list(cat_index[col])
+                order = sorted(range(len(raw)), key=lambda k: str(raw[k]))
+                rank = np.empty(len(raw) + 1, dtype=np.int64)
+                rank[order] = np.arange(len(raw))
+                rank[-1] = -1
+                codes = rank[np.concatenate(cat_parts.pop(col))] if cat_parts[col] else np.array([], dtype=np.int64)
+                codes = codes.astype(_smallest_int_dtype(len(raw)))
+                values = codes
+                np.save(os.path.join(staging, fname), codes)
+                meta["columns"][col] = {"file": fname, "kind": "categorical", "dtype": str(codes.dtype),
+                                        "categories": [str(raw[k]) for k in order]}
+            meta["rows"] = int(len(values))
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.replace(staging, cache_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def ensure_cache(csv_path):
+    cache_dir = cache_dir_for(csv_path)
+    if not is_fresh(csv_path):
+        with _build_lock:
+            if not is_fresh(csv_path):
+                return build_cache(csv_path)
+    return _read_meta(cache_dir)
+
+
+def load_columns(csv_path, columns=None, mmap=True):
+    """Raw column arrays: numeric values, or (codes, categories) for categoricals."""
+    meta = ensure_cache(csv_path)
+    cache_dir = cache_dir_for(csv_path)
+    wanted = columns or list(meta["columns"])
+    missing = [c for c in wanted if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Columns not in {os.path.basename(csv_path)}: {missing}")
+    out = {}
+    for col in wanted:
+        spec = meta["columns"][col]
+        arr = np.load(os.path.join(cache_dir, spec["file"]), mmap_mode="r" if mmap else None)
+        out[col] = (arr, spec["categories"]) if spec["kind"] == "categorical" else arr
+    return out
+
+
+def read_dataset(csv_path, columns=None):
+    """Drop-in for pd.read_csv(csv_path, usecols=columns) backed by the columnar cache.
+    Text columns come back as pandas categoricals."""
+    data = {}
+    for col, value in load_columns(csv_path, columns).items():
+        if isinstance(value, tuple):
+            codes, categories = value
+            data[col] = pd.Categorical.from_codes(np.asarray(codes), categories=categories)
+        else:
+            data[col] = np.asarray(value)
+    return pd.DataFrame(data, columns=list(data))
+
+
+def export_records(name):
+    """Rows of a bundled dataset as JSON-ready dicts for the offline export, restricted to
+    OFFLINE_EXPORT_COLUMNS. Memoised until the CSV changes."""
+    if name not in OFFLINE_EXPORT_COLUMNS:
+        raise KeyError(name)
+    path = dataset_path(name)
+    meta = ensure_cache(path)
+    cached = _export_cache.get(name)
+    if cached and cached[0] == meta["sha256"]:
+        return cached[1]
+    df = read_dataset(path, OFFLINE_EXPORT_COLUMNS[name])
+    # Missing values become null: jsonify would emit bare NaN, which JSON.parse rejects
+    df = df.astype(object).where(df.notna(), None)
+    records = df.to_dict(orient="records")
+    _export_cache[name] = (meta["sha256"], records)
+    return records
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    names = sys.argv[1:] or sorted(os.path.splitext(f)[0] for f in os.listdir(DATASET_DIR) if f.endswith(".csv"))
+    for name in names:
+        t0 = time.perf_counter()
+        meta = build_cache(dataset_path(name))
+        print(f"{name:10s} {meta['rows']:>10,d} rows  {len(meta['columns'])} cols  {time.perf_counter() - t0:.2f}s")
@@ -0,0 +1,312 @@
+# AQUA Streaming Disease-Risk Scorer
+# ==================================
+#
+# Scores water readings as they arrive instead of one snapshot per request. For
+# each pond it keeps a sliding time window (WINDOW_HOURS) of per-reading risks
+# from the disease bundle's model and tracks the window mean. The pond's level
+# (healthy / risk / critical, the same cut-offs as api_predict_disease) only
+# moves on a threshold crossing with hysteresis: a level is entered when the
+# smoothed risk goes above its threshold and left only once it falls
+# HYSTERESIS below it, so a pond hovering at 0.3 does not flap. Alerts are
+# emitted on level changes only, with any SPECIES_RULES range violations of
+# the reading that caused them.
+#
+# Two entry points share those semantics:
+#
+#   DiseaseStream.push(model, readings)   live readings (POST /api/stream/disease)
+#   score_backlog(model, ponds, times, X) a historical backlog in one vectorized
+#                                         pass: one model call over all rows,
+#                                         window means from a grouped cumsum and
+#                                         the hysteresis latches from a forward
+#                                         fill; DiseaseStream.backlog() also seeds
+#                                         the live state from its tail.
+#
+#   python -m ml_core.disease_stream readings.csv            # from backend/
+#   python -m ml_core.disease_stream readings.csv --json alerts.json
+#
+# The CSV needs pond_id, timestamp and the FEATURES columns; species is optional.
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from core.knowledge_base import SPECIES_RULES  # noqa: E402
+
+# Request field names, in the disease model's column order
+FEATURES = ["temp", "ph", "do", "salinity", "turbidity"]
+# SPECIES_RULES key -> feature column
+RULE_COLUMNS = {"temp": 0, "pH": 1, "salinity": 3}
+DEFAULT_SPECIES = "Vannamei"
+
+LEVELS = ["healthy", "risk", "critical"]
+# Smoothed risk above which each non-healthy level is entered (as in api_predict_disease)
+THRESHOLDS = (0.3, 0.7)
+HYSTERESIS = float(os.getenv("AQUA_STREAM_HYSTERESIS", "0.05"))
+WINDOW_HOURS = float(os.getenv("AQUA_STREAM_WINDOW_HOURS", "6"))
+
+# Rows per model call when scoring a backlog (bounds the temporary arrays)
+CHUNK_ROWS = 250_000
+
+
+def risk_scores(model, X):
+    """Per-row disease probability: the positive-class probability for classifiers, the
+    clipped prediction otherwise."""
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) == 0:
+        return np.zeros(0)
+    out = np.empty(len(X))
+    classes = list(getattr(model, "classes_", []))
+    col = classes.index(1) if 1 in classes else len(classes) - 1
+    for lo in range(0, len(X), CHUNK_ROWS):
+        chunk = X[lo:lo + CHUNK_ROWS]
+        if classes and hasattr(model, "predict_proba"):
+            out[lo:lo + CHUNK_ROWS] = model.predict_proba(chunk)[:, col]
+        else:
+            pred = np.asarray(model.predict(chunk), dtype=np.float64)
+            out[lo:lo + CHUNK_ROWS] = pred.reshape(len(chunk), -1)[:, 0]
+    return np.clip(out, 0.0, 1.0)
+
+
+def violations(species, values):
+    """SPECIES_RULES ranges a reading is outside of."""
+    rules = SPECIES_RULES.get(species or DEFAULT_SPECIES, {})
+    out = []
+    for key, col in RULE_COLUMNS.items():
+        if key in rules:
+            low, high = rules[key]
+            if not (low <= values[col] <= high):
+                out.append({"parameter": key, "value": float(values[col]), "low": low, "high": high})
+    return out
+
+
+def _hours(times):
+    """Timestamps (datetime64, ISO strings, datetimes or hours) as float hours."""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.number):
+        return times.astype(np.float64)
+    stamps = times.astype("datetime64[s]")
+    return stamps.astype(np.int64) / 3600.0
+
+
+def _stamp(hours):
+    return np.datetime64(int(round(float(hours) * 3600.0)), "s").item().isoformat()
+
+
+def _latch(risk, on, off, first):
+    """1 from the reading where risk rises above ``on`` until it drops below ``off``, per
+    pond (``first`` marks each pond's first reading, where the latch starts open)."""
+    mark = np.full(len(risk), -1, dtype=np.int8)
+    mark[risk < off] = 0
+    mark[risk > on] = 1
+    mark[first & (mark < 0)] = 0
+    idx = np.where(mark >= 0, np.arange(len(risk)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return mark[idx]
+
+
+def _alert(pond_id, hours, level, previous, smoothed, reading_risk, species, values):
+    return {
+        "pond_id": pond_id,
+        "at": _stamp(hours),
+        "level": LEVELS[level],
+        "previous": LEVELS[previous],
+        "risk": round(float(smoothed), 4),
+        "reading_risk": round(float(reading_risk), 4),
+        "violations": violations(species, values),
+    }
+
+
+def score_backlog(model, ponds, times, X, species=None, window_hours=WINDOW_HOURS,
+                  hysteresis=HYSTERESIS, risk=None):
+    """Score a backlog of readings in one vectorized pass.
+
+    ``ponds``, ``times`` and ``X`` (n x FEATURES) are row-aligned and in any order.
+    Returns a dict of arrays in input order (``risk`` per reading, ``smoothed`` window
+    mean, ``level`` index into LEVELS) plus ``alerts`` in time order per pond and the
+    sorted ``order``/``start`` arrays DiseaseStream.backlog seeds from.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    ponds = np.asarray(ponds)
+    t = _hours(times)
+    n = len(X)
+    pond_ids, codes = np.unique(ponds, return_inverse=True)
+    order = np.lexsort((t, codes))
+    codes_s, t_s = codes[order], t[order]
+    risk = risk_scores(model, X) if risk is None else np.asarray(risk, dtype=np.float64)
+    risk_s = risk[order]
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = codes_s[1:] != codes_s[:-1]
+
+    # Window (t - window_hours, t] of each reading, as a start index into the sorted rows;
+    # the per-pond offset keeps the search from crossing into the previous pond
+    t0 = t_s.min() if n else 0.0
+    span = (t_s.max() - t0 if n else 0.0) + window_hours + 1.0
+    key = codes_s * span + (t_s - t0)
+    start = np.searchsorted(key, key - window_hours, side="right")
+    csum = np.concatenate([[0.0], np.cumsum(risk_s)])
+    idx = np.arange(n)
+    smoothed_s = (csum[idx + 1] - csum[start]) / (idx + 1 - start)
+
+    level_s = np.zeros(n, dtype=np.int8)
+    for threshold in THRESHOLDS:
+        level_s += _latch(smoothed_s, threshold, threshold - hysteresis, first)
+
+    previous = np.empty(n, dtype=np.int8)
+    previous[0:1] = 0
+    previous[1:] = level_s[:-1]
+    previous[first] = 0
+    changed = np.flatnonzero(level_s != previous)
+
+    species_arr = None if species is None else np.asarray(species)
+    alerts = []
+    for i in changed:
+        row = order[i]
+        alerts.append(_alert(pond_ids[codes_s[i]].item(), t_s[i], int(level_s[i]), int(previous[i]),
+                             smoothed_s[i], risk_s[i],
+                             None if species_arr is None else str(species_arr[row]), X[row]))
+
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = idx
+    return {
+        "risk": risk,
+        "smoothed": smoothed_s[inverse],
+        "level": level_s[inverse],
+        "alerts": alerts,
+        "order": order,
+        "start": start,
+    }
+
+
+class _PondState:
+    __slots__ = ("points", "total", "latches")
+
+    def __init__(self):
+        self.points = deque()
+        self.total = 0.0
+        self.latches = [0] * len(THRESHOLDS)
+
+    @property
+    def level(self):
+        return sum(self.latches)
+
+
+class DiseaseStream:
+    """Per-pond sliding windows and hysteresis levels for live readings."""
+
+    def __init__(self, window_hours=WINDOW_HOURS, hysteresis=HYSTERESIS):
+        self.window_hours = window_hours
+        self.hysteresis = hysteresis
+        self._ponds = {}
+        self._lock = threading.Lock()
+
+    def _update(self, state, hours, reading_risk):
+        points = state.points
+        points.append((hours, reading_risk))
+        state.total += reading_risk
+        cutoff = hours - self.window_hours
+        while points[0][0] <= cutoff:
+            state.total -= points.popleft()[1]
+        smoothed = state.total / len(points)
+        for i, threshold in enumerate(THRESHOLDS):
+            if smoothed > threshold:
+                state.latches[i] = 1
+            elif smoothed < threshold - self.hysteresis:
+                state.latches[i] = 0
+        return smoothed
+
+    def push(self, model, readings):
+        """Score readings (dicts with pond_id, the FEATURES, optional timestamp and species)
+        with one model call and return the alerts they trigger."""
+        rows, parsed = [], []
+        for r in readings:
+            when = r.get("timestamp")
+            hours = _hours([when or np.datetime64(datetime.now(), "s")])[0]
+            rows.append([float(r[f]) for f in FEATURES])
+            parsed.append((str(r["pond_id"]), hours, r.get("species")))
+        if not rows:
+            return []
+        X = np.asarray(rows)
+        risk = risk_scores(model, X)
+        alerts = []
+        with self._lock:
+            for i in sorted(range(len(parsed)), key=lambda i: parsed[i][1]):
+                pond_id, hours, species = parsed[i]
+                state = self._ponds.get(pond_id)
+                if state is None:
+                    state = self._ponds[pond_id] = _PondState()
+                previous = state.level
+                smoothed = self._update(state, hours, risk[i])
+                if state.level != previous:
+                    alerts.append(_alert(pond_id, hours, state.level, previous, smoothed, risk[i], species, X[i]))
+        return alerts
+
+    def backlog(self, model, ponds, times, X, species=None):
+        """score_backlog, then continue live scoring from where the backlog ends."""
+        result = score_backlog(model, ponds, times, X, species, self.window_hours, self.hysteresis)
+        order, start = result["order"], result["start"]
+        ponds_s = np.asarray(ponds)[order]
+        t_s = _hours(times)[order]
+        risk_s = result["risk"][order]
+        smoothed_s = result["smoothed"][order]
+        last = np.flatnonzero(np.append(ponds_s[1:] != ponds_s[:-1], True)) if len(order) else []
+        with self._lock:
+            for i in last:
+                state = _PondState()
+                state.points = deque(zip(t_s[start[i]:i + 1].tolist(), risk_s[start[i]:i + 1].tolist()))
+                state.total = float(risk_s[start[i]:i + 1].sum())
+                level = int(result["level"][order[i]])
+                state.latches = [1 if k < level else 0 for k in range(len(THRESHOLDS))]
+                self._ponds[str(ponds_s[i])] = state
+        return result
+
+    def status(self, pond_id):
+        with self._lock:
+            state = self._ponds.get(str(pond_id))
+            if state is None:
+                return None
+            return {"level": LEVELS[state.level], "risk": round(state.total / len(state.points), 4),
+                    "readings": len(state.points)}
+
+
+DISEASE_STREAM = DiseaseStream()
+
+
+def main(argv=None):
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Score a backlog of pond sensor readings for disease-risk alerts.")
+    parser.add_argument("csv", help="Readings with pond_id, timestamp, " + ", ".join(FEATURES) + " [, species]")
+    parser.add_argument("--json", help="Write the alerts here")
+    parser.add_argument("--window-hours", type=float, default=WINDOW_HOURS)
+    args = parser.parse_args(argv)
+
+    from ml_core.models_loader import get_bundle
+    model = get_bundle("disease").get()
+    df = pd.read_csv(args.csv)
+    started = time.time()
+    result = score_backlog(model, df["pond_id"].astype(str).to_numpy(), df["timestamp"].to_numpy(),
+                           df[FEATURES].to_numpy(dtype=np.float64),
+                           df["species"].to_numpy() if "species" in df else None, args.window_hours)
+    elapsed = time.time() - started
+    alerts = result["alerts"]
+    counts = {level: sum(a["level"] == level for a in alerts) for level in LEVELS}
+    print(f"✅ {len(df)} readings from {df['pond_id'].nunique()} ponds scored in {elapsed:.2f}s: "
+          f"{len(alerts)} alerts {counts}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(alerts, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# AQUA Pond Feature Store
+# =======================
+#
+# Per-pond rolling water-quality features, materialized from the AquaCycle log
+# (AQUACYCLE_DB["reports"] entries that name a pond, plus ponds[].daily_logs)
+# so prediction requests can send a pond_id instead of re-sending readings we
+# already hold.
+#
+# For every pond and measurement (FIELDS) the store keeps two time windows
+# (WINDOWS: 24h and 7d). Each window is a deque of (hours, value) readings in
+# time order with running sums of n, t, v, t*t and t*v, so a new log entry is one
+# append plus amortized O(1) eviction (a late entry is slotted in from the right,
+# or dropped once it is outside the window), and reading a pond's features is
+# constant work per measurement:
+#
+#   last, last_at            most recent reading
+#   mean_24h, mean_7d        window means
+#   trend_24h, trend_7d      least-squares slope, units per day
+#   n_24h, n_7d              readings in the window
+#
+# The store is rebuilt from the log on first use and then updated by the work
+# route on every log write (FEATURE_STORE.observe). Nothing is persisted: the
+# AquaCycle log stays the source of truth.
+
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+# Canonical measurement -> accepted log field names (case-insensitive). The
+# canonical names are the request fields of the /api/predict_* endpoints.
+FIELDS = {
+    "temp": ["temp", "water_temp", "temperature"],
+    "ph": ["ph"],
+    "do": ["do", "dissolved_oxygen", "oxygen"],
+    "salinity": ["salinity"],
+    "turbidity": ["turbidity"],
+    "ammonia": ["ammonia", "nh3"],
+    "nitrite": ["nitrite", "no2"],
+    "feed": ["feed", "feed_kg", "feed_quantity"],
+}
+
+# Log fields that name the pond an entry belongs to, in order of preference
+POND_KEYS = ["pond_id", "pond", "target_id"]
+
+# Window label -> length in hours
+WINDOWS = {"24h": 24.0, "7d": 168.0}
+
+_NUMBER = re.compile(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?")
+
+
+def _number(raw):
+    """First number in a logged value ("45kg" -> 45.0), or None."""
+    if isinstance(raw, bool) or raw is None:
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    match = _NUMBER.search(str(raw).replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def _timestamp(entry):
+    """When a log entry was written: its timestamp, else midnight of its date."""
+    for key in ("timestamp", "created_at", "date"):
+        value = entry.get(key)
+        if value:
+            try:
+                return datetime.fromisoformat(str(value))
+            except ValueError:
+                continue
+    return None
+
+
+def pond_of(data):
+    """The pond id a log payload refers to, or None."""
+    for key in POND_KEYS:
+        value = data.get(key)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def measurements(data):
+    """canonical field -> value for every measurement present in a log payload."""
+    fields = {str(k).casefold(): v for k, v in data.items()}
+    values = {}
+    for name, aliases in FIELDS.items():
+        value = next((v for v in (_number(fields[a]) for a in aliases if a in fields) if v is not None), None)
+        if value is not None:
+            values[name] = value
+    return values
+
+
+class _Window:
+    """Readings of one measurement inside a fixed time window, with running sums for the
+    mean and the least-squares slope."""
+
+    __slots__ = ("hours", "points", "n", "st", "sv", "stt", "stv")
+
+    def __init__(self, hours):
+        self.hours = hours
+        self.points = deque()
+        self.n = 0
+        self.st = self.sv = self.stt = self.stv = 0.0
+
+    def push(self, t, v):
+        """Add a reading, keeping the deque in time order so evict() can pop from the
+        left. A late reading is slotted in place, or dropped if it is already older
+        than the window measured from the newest reading."""
+        points = self.points
+        if points and t < points[-1][0]:
+            if t < points[-1][0] - self.hours:
+                return
+            i = len(points) - 1
+            while i > 0 and points[i - 1][0] > t:
+                i -= 1
+            points.insert(i, (t, v))
+        else:
+            points.append((t, v))
+        self.n += 1
+        self.st += t
+        self.sv += v
+        self.stt += t * t
+        self.stv += t * v
+
+    def evict(self, now):
+        cutoff = now - self.hours
+        points = self.points
+        while points and points[0][0] < cutoff:
+            t, v = points.popleft()
+            self.n -= 1
+            self.st -= t
+            self.sv -= v
+            self.stt -= t * t
+            self.stv -= t * v
+        if not points:
+            # Reset instead of carrying float residue from the subtractions
+            self.n = 0
+            self.st = self.sv = self.stt = self.stv = 0.0
+
+    def mean(self):
+        return self.sv / self.n if self.n else None
+
+    def slope_per_day(self):
+        if self.n < 2:
+            return None
+        var = self.n * self.stt - self.st * self.st
+        if var <= 1e-9 * max(1.0, self.n * self.stt):
+            return None
+        return (self.n * self.stv - self.st * self.sv) / var * 24.0
+
+
+class _Series:
+    __slots__ = ("last", "last_at", "windows")
+
+    def __init__(self):
+        self.last = None
+        self.last_at = None
+        self.windows = {label: _Window(hours) for label, hours in WINDOWS.items()}
+
+
+class FeatureStore:
+    def __init__(self):
+        self._ponds = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Times are kept as hours since this origin so the running sums stay well conditioned
+        self._origin = None
+
+    def _hours(self, when):
+        if self._origin is None:
+            self._origin = when
+        return (when - self._origin).total_seconds() / 3600.0
+
+    def _record(self, pond_id, when, values):
+        t = self._hours(when)
+        pond = self._ponds.setdefault(pond_id, {})
+        for name, value in values.items():
+            series = pond.get(name)
+            if series is None:
+                series = pond[name] = _Series()
+            if series.last_at is None or when >= series.last_at:
+                series.last, series.last_at = value, when
+            for window in series.windows.values():
+                window.push(t, value)
+                window.evict(self._hours(series.last_at))
+
+    def _entries(self, db):
+        for report in db.get("reports", []):
+            data = report.get("data")
+            if isinstance(data, dict):
+                pond_id = pond_of(data)
+                if pond_id:
+                    yield pond_id, _timestamp(report), data
+        for pond in db.get("ponds", []):
+            for log in pond.get("daily_logs", []) or []:
+                if isinstance(log, dict) and pond.get("id"):
+                    yield str(pond["id"]), _timestamp(log), log
+
+    def materialize(self, db):
+        """Rebuild every pond's features from the AquaCycle log."""
+        entries = [(pond_id, when, values) for pond_id, when, data in self._entries(db)
+                   if when is not None for values in [measurements(data)] if values]
+        entries.sort(key=lambda e: e[1])
+        with self._lock:
+            self._ponds = {}
+            self._origin = None
+            for pond_id, when, values in entries:
+                self._record(pond_id, when, values)
+            self._loaded = True
+        return len(entries)
+
+    def ensure(self, db):
+        if not self._loaded:
+            self.materialize(db)
+
+    def observe(self, db, report):
+        """Apply a log entry just appended to ``db["reports"]`` (the first call materializes
+        the whole log, which already includes it)."""
+        if not self._loaded:
+            self.materialize(db)
+            return
+        data = report.get("data")
+        if not isinstance(data, dict):
+            return
+        pond_id = pond_of(data)
+        values = measurements(data)
+        when = _timestamp(report) or datetime.now()
+        if pond_id and values:
+            with self._lock:
+                self._record(pond_id, when, values)
+
+    def features(self, pond_id, now=None):
+        """measurement -> rolling features for a pond, or None for a pond with no readings."""
+        with self._lock:
+            pond = self._ponds.get(str(pond_id))
+            if not pond:
+                return None
+            t_now = self._hours(now or datetime.now())
+            out = {}
+            for name, series in pond.items():
+                feats = {"last": series.last, "last_at": series.last_at.isoformat(timespec="seconds")}
+                for label, window in series.windows.items():
+                    window.evict(t_now)
+                    feats[f"mean_{label}"] = window.mean()
+                    feats[f"trend_{label}"] = window.slope_per_day()
+                    feats[f"n_{label}"] = window.n
+                out[name] = feats
+            return out
+
+    def latest(self, pond_id):
+        """measurement -> most recent reading for a pond ({} when unknown)."""
+        with self._lock:
+            return {name: s.last for name, s in self._ponds.get(str(pond_id), {}).items()}
+
+
+FEATURE_STORE = FeatureStore()
@@ -1,21 +1,19 @@
+import os
+import sys
 import pandas as pd
-import random
 
-rows = []
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, pick, uniform, randint, run  # noqa: E402
 
-for _ in range(10000):
-    rows.append([
-        random.choice(["USA","China","Japan","EU","India"]),
-        random.choice(ALL_SPECIES),
-        random.randint(1,50),
-        random.choice(["A","B","C"]),
-        round(random.uniform(10000, 500000), 2)
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Target_Country": pick(rng, ["USA", "China", "Japan", "EU", "India"], n),
+        "Species": pick(rng, ALL_SPECIES, n),
+        "Required_Quantity": randint(rng, 1, 50, n),
+        "Quality_Grade": pick(rng, ["A", "B", "C"], n),
+        "Price_Offered": uniform(rng, 10000, 500000, n, 2),
+    })
 
-df = pd.DataFrame(rows, columns=["Target_Country","Species","Required_Quantity","Quality_Grade","Price_Offered"])
-df.to_csv("dataset/buyer.csv", index=False)
-print("✅ Ecosystem Buyer dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("buyer", make_chunk)
+    print(f"✅ Ecosystem Buyer dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
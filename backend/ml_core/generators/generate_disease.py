@@ -1,25 +1,24 @@
+import os
+import sys
+import numpy as np
 import pandas as pd
-import random
 
-rows = []
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import uniform, randint, run  # noqa: E402
 
-for _ in range(10000):
-    disease = random.choice([0,1])
-    rows.append([
-        round(random.uniform(24,32),1),
-        round(random.uniform(6.5,8.5),2),
-        round(random.uniform(4,7),2),
-        round(random.uniform(5,25),2),
-        round(random.uniform(10,60),2),
-        disease,
-        "White Spot" if disease else "None",
-        "Lime Treatment" if disease else "None"
-    ])
+def make_chunk(rng, n):
+    disease = randint(rng, 0, 1, n)
+    return pd.DataFrame({
+        "Water_Temp": uniform(rng, 24, 32, n, 1),
+        "pH": uniform(rng, 6.5, 8.5, n, 2),
+        "DO": uniform(rng, 4, 7, n, 2),
+        "Salinity": uniform(rng, 5, 25, n, 2),
+        "Turbidity": uniform(rng, 10, 60, n, 2),
+        "Disease_Risk": disease,
+        "Disease_Type": np.where(disease == 1, "White Spot", "None"),
+        "Suggested_Medicine": np.where(disease == 1, "Lime Treatment", "None"),
+    })
 
-df = pd.DataFrame(rows, columns=[
-    "Water_Temp","pH","DO","Salinity","Turbidity",
-    "Disease_Risk","Disease_Type","Suggested_Medicine"
-])
-
-df.to_csv("dataset/disease.csv", index=False)
-print("✅ Disease dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("disease", make_chunk)
+    print(f"✅ Disease dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
@@ -1,23 +1,21 @@
+import os
+import sys
 import pandas as pd
-import random
 
-rows = []
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, pick, uniform, randint, run  # noqa: E402
 
-for _ in range(10000):
-    rows.append([
-        random.choice(ALL_SPECIES),
-        random.randint(10,150),
-        round(random.uniform(20,32),1),
-        round(random.uniform(4,8),1),
-        random.choice(["Pellet","Floating","Sinking"]),
-        random.randint(28,45),
-        round(random.uniform(1,50), 2)
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Species": pick(rng, ALL_SPECIES, n),
+        "Age_Days": randint(rng, 10, 150, n),
+        "Water_Temp": uniform(rng, 20, 32, n, 1),
+        "DO": uniform(rng, 4, 8, n, 1),
+        "Feed_Type": pick(rng, ["Pellet", "Floating", "Sinking"], n),
+        "Protein": randint(rng, 28, 45, n),
+        "Feed_Quantity": uniform(rng, 1, 50, n, 2),
+    })
 
-df = pd.DataFrame(rows, columns=["Species","Age_Days","Water_Temp","DO","Feed_Type","Protein","Feed_Quantity"])
-df.to_csv("dataset/feed.csv", index=False)
-print("✅ Ecosystem Feed dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("feed", make_chunk)
+    print(f"✅ Ecosystem Feed dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
@@ -1,34 +1,29 @@
+import os
+import sys
 import pandas as pd
-import random
-from faker import Faker
 
-fake = Faker()
-rows = []
-
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, AQUA_TYPES, pick, uniform, randint, faker_pool, run  # noqa: E402
 
 countries = ["India", "Vietnam", "Thailand", "Indonesia", "Bangladesh"]
 states = ["Andhra Pradesh", "West Bengal", "Odisha", "Tamil Nadu", "Gujarat", "Kerala", "Bihar", "Mekong Delta", "Can Tho", "Bac Lieu", "Soc Trang", "Ca Mau", "Chonburi", "Rayong", "Trat", "Surat Thani", "Nakorn Si Thammarat", "Java", "Sumatra", "Bali", "Sulawesi", "Kalimantan", "Chittagong", "Khulna", "Barisal", "Sylhet", "Rajshahi"]
 
-for _ in range(10000):
-    spec = random.choice(ALL_SPECIES)
-    atype = "Fish" if spec in FISHS else ("Prawn" if spec in PRAWNS else "Crab")
-    rows.append([
-        random.choice(countries),
-        random.choice(states),
-        fake.city(),
-        round(random.uniform(-10,30), 4),
-        round(random.uniform(60,100), 4),
-        random.choice(["Tropical", "Subtropical"]),
-        random.choice(["Summer", "Monsoon", "Winter"]),
-        atype,
-        spec,
-        random.randint(40, 100)
-    ])
 
-df = pd.DataFrame(rows, columns=["Country", "State", "District", "Latitude", "Longitude", "Climate_Zone", "Season", "Aqua_Type", "Species", "Suitability_Score"])
-df.to_csv("dataset/location.csv", index=False)
-print("✅ Ecosystem Location dataset generated")
+def make_chunk(rng, n):
+    species = rng.integers(0, len(ALL_SPECIES), size=n)
+    return pd.DataFrame({
+        "Country": pick(rng, countries, n),
+        "State": pick(rng, states, n),
+        "District": pick(rng, faker_pool("city"), n),
+        "Latitude": uniform(rng, -10, 30, n, 4),
+        "Longitude": uniform(rng, 60, 100, n, 4),
+        "Climate_Zone": pick(rng, ["Tropical", "Subtropical"], n),
+        "Season": pick(rng, ["Summer", "Monsoon", "Winter"], n),
+        "Aqua_Type": pick(rng, AQUA_TYPES, n, idx=species),
+        "Species": pick(rng, ALL_SPECIES, n, idx=species),
+        "Suitability_Score": randint(rng, 40, 100, n),
+    })
+
+if __name__ == "__main__":
+    path, rows, seconds = run("location", make_chunk)
+    print(f"✅ Ecosystem Location dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
@@ -1,25 +1,21 @@
+import os
+import sys
 import pandas as pd
-import random
-from faker import Faker
 
-fake = Faker()
-rows = []
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, pick, uniform, randint, faker_pool, run  # noqa: E402
 
-for _ in range(10000):
-    rows.append([
-        random.choice(["India","Vietnam","Thailand","Indonesia","Bangladesh"]),
-        fake.state(),
-        fake.company(),
-        random.choice(ALL_SPECIES),
-        random.randint(3,5),
-        fake.phone_number(),
-        round(random.uniform(1,200),1)
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Country": pick(rng, ["India", "Vietnam", "Thailand", "Indonesia", "Bangladesh"], n),
+        "State": pick(rng, faker_pool("state"), n),
+        "Supplier_Name": pick(rng, faker_pool("company"), n),
+        "Species": pick(rng, ALL_SPECIES, n),
+        "Seed_Quality_Rating": randint(rng, 3, 5, n),
+        "Contact": pick(rng, faker_pool("phone_number"), n),
+        "Distance_km": uniform(rng, 1, 200, n, 1),
+    })
 
-df = pd.DataFrame(rows, columns=["Country","State","Supplier_Name","Species","Seed_Quality_Rating","Contact","Distance_km"])
-df.to_csv("dataset/seed.csv", index=False)
-print("✅ Ecosystem Seed dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("seed", make_chunk)
+    print(f"✅ Ecosystem Seed dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
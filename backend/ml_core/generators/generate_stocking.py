@@ -1,23 +1,21 @@
+import os
+import sys
 import pandas as pd
-import random
 
-rows = []
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, pick, uniform, randint, run  # noqa: E402
 
-for _ in range(10000):
-    rows.append([
-        random.choice(ALL_SPECIES),
-        round(random.uniform(0.5,5),2),
-        random.choice(["Clay","Loamy","Sandy"]),
-        random.choice(["Canal","River","Borewell"]),
-        random.choice(["Summer","Monsoon","Winter"]),
-        random.randint(2000,50000),
-        round(random.uniform(70,95),2)
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Species": pick(rng, ALL_SPECIES, n),
+        "Pond_Area": uniform(rng, 0.5, 5, n, 2),
+        "Soil_Type": pick(rng, ["Clay", "Loamy", "Sandy"], n),
+        "Water_Source": pick(rng, ["Canal", "River", "Borewell"], n),
+        "Season": pick(rng, ["Summer", "Monsoon", "Winter"], n),
+        "Recommended_Stocking": randint(rng, 2000, 50000, n),
+        "Survival_Rate": uniform(rng, 70, 95, n, 2),
+    })
 
-df = pd.DataFrame(rows, columns=["Species","Pond_Area","Soil_Type","Water_Source","Season","Recommended_Stocking","Survival_Rate"])
-df.to_csv("dataset/stocking.csv", index=False)
-print("✅ Ecosystem Stocking dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("stocking", make_chunk)
+    print(f"✅ Ecosystem Stocking dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
@@ -1,20 +1,18 @@
+import os
+import sys
 import pandas as pd
-import random
 
-rows = []
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import pick, uniform, randint, run  # noqa: E402
 
-for _ in range(50000):
-    rows.append([
-        random.choice(["Disease","Water","Feed"]),
-        random.randint(1,72),
-        round(random.uniform(70,98),2),
-        round(random.uniform(3.5,5),2)
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Issue_Type": pick(rng, ["Disease", "Water", "Feed"], n),
+        "Resolution_Time_Hrs": randint(rng, 1, 72, n),
+        "Success_Rate": uniform(rng, 70, 98, n, 2),
+        "Technician_Rating": uniform(rng, 3.5, 5, n, 2),
+    })
 
-df = pd.DataFrame(rows, columns=[
-    "Issue_Type","Resolution_Time_Hrs",
-    "Success_Rate","Technician_Rating"
-])
-
-df.to_csv("dataset/technician_support_50k.csv", index=False)
-print("✅ Support dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("support", make_chunk, default_rows=50_000, filename="technician_support_50k.csv")
+    print(f"✅ Support dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
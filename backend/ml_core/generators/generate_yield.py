@@ -1,22 +1,19 @@
+import os
+import sys
 import pandas as pd
-import random
 
-rows = []
-FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
-PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
-CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
-ALL_SPECIES = FISHS + PRAWNS + CRABS
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synth import ALL_SPECIES, pick, uniform, randint, run  # noqa: E402
 
-for _ in range(10000):
-    yield_tons = round(random.uniform(2,10),2)
-    rows.append([
-        random.choice(ALL_SPECIES),
-        round(random.uniform(0.5,5),1),
-        random.randint(500,5000),
-        random.randint(90,180),
-        yield_tons
-    ])
+def make_chunk(rng, n):
+    return pd.DataFrame({
+        "Species": pick(rng, ALL_SPECIES, n),
+        "Pond_Area": uniform(rng, 0.5, 5, n, 1),
+        "Feed_Used": randint(rng, 500, 5000, n),
+        "Culture_Days": randint(rng, 90, 180, n),
+        "Expected_Yield": uniform(rng, 2, 10, n, 2),
+    })
 
-df = pd.DataFrame(rows, columns=["Species","Pond_Area","Feed_Used","Culture_Days","Expected_Yield"])
-df.to_csv("dataset/yield.csv", index=False)
-print("✅ Ecosystem Yield dataset generated")
+if __name__ == "__main__":
+    path, rows, seconds = run("yield", make_chunk)
+    print(f"✅ Ecosystem Yield dataset generated: {rows:,} rows in {seconds:.1f}s -> {path}")
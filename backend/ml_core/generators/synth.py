@@ -0,0 +1,110 @@
+# Shared helpers for the synthetic dataset generators
+# ===================================================
+#
+# Every generator describes one chunk of rows as NumPy arrays drawn from a
+# seeded Generator; stream_csv() writes chunks to disk one at a time, so memory
+# stays bounded by --chunk-rows whatever --rows is. Faker is only used to fill
+# a small pool of names once, which rows then index into. With --jobs > 1 the
+# chunks are generated and rendered to CSV text in worker processes (CSV
+# formatting is the bottleneck) and written in order by the parent.
+#
+#   python ml_core/generators/generate_location.py --rows 10000000 --seed 7
+
+import os
+import io
+import time
+import functools
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
+DEFAULT_CHUNK_ROWS = 500_000
+FAKER_POOL_SIZE = 5_000
+
+FISHS = ["Rohu", "Tilapia", "Catfish", "Seabass", "Carp", "Salmon", "Trout", "Pangasius", "Grouper", "Snapper", "Milkfish", "Barramundi", "Tuna", "Cod"]
+PRAWNS = ["Vannamei", "Tiger Prawn", "Freshwater Prawn", "Banana Prawn", "King Prawn", "Whiteleg Shrimp", "Black Tiger Shrimp"]
+CRABS = ["Mud Crab", "Blue Swimmer Crab", "King Crab", "Snow Crab", "Dungeness Crab", "Soft Shell Crab"]
+ALL_SPECIES = FISHS + PRAWNS + CRABS
+AQUA_TYPES = ["Fish"] * len(FISHS) + ["Prawn"] * len(PRAWNS) + ["Crab"] * len(CRABS)
+
+
+def pick(rng, options, n, idx=None):
+    """Vectorised random.choice: one uniformly drawn option per row (or ``options[idx]``)."""
+    if idx is None:
+        idx = rng.integers(0, len(options), size=n)
+    return np.asarray(options, dtype=object)[idx]
+
+
+def uniform(rng, low, high, n, decimals):
+    return np.round(rng.uniform(low, high, size=n), decimals)
+
+
+def randint(rng, low, high, n):
+    """Inclusive on both ends, like random.randint."""
+    return rng.integers(low, high + 1, size=n)
+
+
+@functools.lru_cache(maxsize=None)
+def faker_pool(method, size=FAKER_POOL_SIZE):
+    """``size`` values of a Faker provider (city, company, ...), generated once per process.
+    Rows sample from the pool with the chunk's rng, so --seed still controls the output."""
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(0)
+    return tuple(getattr(fake, method)() for _ in range(size))
+
+
+def _render_chunk(make_chunk, seed_seq, n, header):
+    buf = io.StringIO()
+    make_chunk(np.random.default_rng(seed_seq), n).to_csv(buf, index=False, header=header)
+    return buf.getvalue()
+
+
+def stream_csv(path, make_chunk, rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, jobs=1):
+    """Write ``rows`` rows produced by ``make_chunk(rng, n) -> DataFrame`` to ``path``.
+    Each chunk gets its own child seed, so output is reproducible for a given seed and
+    chunk size regardless of ``jobs``. The file is written next to the target and
+    renamed into place."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    n_chunks = max(1, -(-rows // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_rows, rows - i * chunk_rows) for i in range(n_chunks)]
+    try:
+        with open(tmp, "w", newline="") as f:
+            if jobs <= 1 or n_chunks == 1:
+                for i, (child, n) in enumerate(zip(seeds, sizes)):
+                    f.write(_render_chunk(make_chunk, child, n, i == 0))
+            else:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    # At most 2 * jobs rendered chunks are in flight, keeping memory bounded
+                    pending = deque()
+                    for i, (child, n) in enumerate(zip(seeds, sizes)):
+                        if len(pending) >= 2 * jobs:
+                            f.write(pending.popleft().result())
+                        pending.append(pool.submit(_render_chunk, make_chunk, child, n, i == 0))
+                    while pending:
+                        f.write(pending.popleft().result())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return sum(sizes)
+
+
+def run(name, make_chunk, default_rows=10_000, filename=None):
+    """Command line entry point shared by the generate_*.py scripts."""
+    parser = argparse.ArgumentParser(description=f"Generate the synthetic {name} dataset.")
+    parser.add_argument("--rows", type=int, default=default_rows, help=f"Rows to generate (default {default_rows})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows held in memory at once")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--out", default=os.path.join(DATASET_DIR, filename or f"{name}.csv"))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = stream_csv(args.out, make_chunk, args.rows, seed=args.seed, chunk_rows=args.chunk_rows, jobs=args.jobs)
+    return args.out, written, time.perf_counter() - started
@@ -0,0 +1,482 @@
+# AQUA Incremental Training
+# =========================
+#
+# Feeds real observations logged through /api/aquacycle/work back into the
+# prediction models instead of training only on the synthetic CSVs. A run
+#
+#   1. scans AQUACYCLE_DB["reports"] past the stored watermark and maps every
+#      labelled log entry (water tests, feeding logs, harvest results) to a row
+#      of the matching bundle's dataset columns (LIVE_SOURCES),
+#   2. appends those rows to the live training store datasets/live/<bundle>.csv,
+#   3. for each bundle with at least MIN_NEW_ROWS live rows the served version
+#      has not seen, fits INCREMENT_TREES new trees on those rows plus a replay
+#      sample of the bundle's base dataset, appends them to the served forest
+#      (CompactForest.concat) and publishes + promotes the result.
+#
+# The existing trees are kept as they are, so a run takes seconds instead of a
+# full retrain. Each published manifest records how many live rows it contains
+# (params.live_rows); after a full rebuild with build_models.py the next run
+# sees live_rows=0 and re-applies the whole live store on top of it.
+#
+# Runs are started by the work route once MIN_NEW_ROWS labelled reports are
+# pending, by the background scheduler every INTERVAL_SECONDS, or by hand:
+#
+#   python -m ml_core.incremental                 # from backend/
+#   python -m ml_core.incremental --force --only disease
+#   python -m ml_core.incremental --dry-run
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.registry import REGISTRY_DIR, DATASET_DIR, BUNDLE_DATASETS  # noqa: E402
+
+LIVE_DIR = os.path.join(DATASET_DIR, "live")
+STATE_FILE = os.path.join(REGISTRY_DIR, "incremental_state.json")
+LOCK_FILE = os.path.join(REGISTRY_DIR, "incremental.lock")
+AQUACYCLE_FILE = os.path.join(BACKEND_DIR, "data", "aquacycle.json")
+
+# Live rows a bundle needs before it is refit (the work route trigger uses the same count)
+MIN_NEW_ROWS = int(os.getenv("AQUA_INCREMENTAL_MIN_ROWS", "25"))
+# Seconds between scheduled runs; 0 disables the scheduler
+INTERVAL_SECONDS = float(os.getenv("AQUA_INCREMENTAL_INTERVAL", "21600"))
+# Trees added per refit, and the most incremental trees kept on top of the base forest
+INCREMENT_TREES = 5
+MAX_INCREMENTAL_TREES = 40
+# Base dataset rows replayed per new live row, so the new trees do not forget the prior
+REPLAY_RATIO = 4
+MAX_REPLAY_ROWS = 20_000
+LOCK_STALE_SECONDS = 3600
+
+# Bundle -> report actions it learns from, and per dataset column (in trainer COLUMNS order)
+# the report fields accepted for it. Field names are matched case-insensitively.
+LIVE_SOURCES = {
+    "disease": {
+        "actions": ["water_test", "daily_pond_activity", "record_results"],
+        "fields": {
+            "Water_Temp": ["water_temp", "temp", "temperature"],
+            "pH": ["ph"],
+            "DO": ["do", "dissolved_oxygen", "oxygen"],
+            "Salinity": ["salinity"],
+            "Turbidity": ["turbidity"],
+            "Disease_Risk": ["disease_risk", "disease_observed", "outbreak", "pcr_result"],
+        },
+    },
+    "feed": {
+        "actions": ["feeding_log", "track_feed_usage"],
+        "fields": {
+            "Species": ["species"],
+            "Age_Days": ["age_days", "age", "doc"],
+            "Water_Temp": ["water_temp", "temp", "temperature"],
+            "DO": ["do", "dissolved_oxygen", "oxygen"],
+            "Feed_Type": ["feed_type"],
+            "Protein": ["protein"],
+            "Feed_Quantity": ["feed_quantity", "feed_kg", "quantity"],
+        },
+    },
+    "yield": {
+        "actions": ["production_log", "record_quantity", "record_results"],
+        "fields": {
+            "Species": ["species"],
+            "Pond_Area": ["pond_area", "area"],
+            "Feed_Used": ["feed_used"],
+            "Culture_Days": ["culture_days", "doc"],
+            "Expected_Yield": ["harvest_tons", "yield_tons", "actual_yield"],
+        },
+    },
+}
+
+# Bundle -> (model inputs in trainer order, target); (column, encoder key) pairs are label encoded
+FEATURES = {
+    "disease": (["Water_Temp", "pH", "DO", "Salinity", "Turbidity"], "Disease_Risk"),
+    "feed": ([("Species", "le_species_feed"), "Age_Days", "Water_Temp", "DO", ("Feed_Type", "le_feed"), "Protein"],
+             "Feed_Quantity"),
+    "yield": ([("Species", "le_species_yield"), "Pond_Area", "Feed_Used", "Culture_Days"], "Expected_Yield"),
+}
+
+CATEGORICAL = {"Species", "Feed_Type"}
+KEY_COLUMNS = ["Report_Key", "Report_Date"]
+TRUE_LABELS = {"1", "true", "yes", "y", "positive", "detected"}
+FALSE_LABELS = {"0", "false", "no", "n", "negative", "none"}
+
+_run_lock = threading.Lock()
+# Labelled rows waiting since the last run; updated by request threads (notify) and runs
+_pending_lock = threading.Lock()
+_pending = {"offset": None, "rows": 0}
+
+
+def live_path(name):
+    return os.path.join(LIVE_DIR, f"{name}.csv")
+
+
+def report_key(report):
+    return hashlib.sha1(json.dumps(report, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def report_action(report):
+    """The work action a report was logged with (older entries only carry the title)."""
+    if report.get("action"):
+        return report["action"]
+    title = str(report.get("title", ""))
+    return title[:-len(" Entry")].lower().replace(" ", "_") if title.endswith(" Entry") else None
+
+
+def _load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {"offset": 0, "last_key": None, "runs": 0}
+
+
+def _save_state(state):
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp, STATE_FILE)
+
+
+def _parse_value(column, raw):
+    if raw is None or str(raw).strip() == "":
+        return None
+    if column in CATEGORICAL:
+        return str(raw).strip()
+    if column == "Disease_Risk":
+        label = str(raw).strip().casefold()
+        return 1 if label in TRUE_LABELS else 0 if label in FALSE_LABELS else None
+    try:
+        value = float(str(raw).replace(",", "").strip())
+    except ValueError:
+        return None
+    return value if np.isfinite(value) else None
+
+
+def extract_rows(report):
+    """bundle name -> dataset row for every bundle the report is a complete, labelled example of."""
+    data = report.get("data")
+    if not isinstance(data, dict):
+        return {}
+    action = report_action(report)
+    fields = {str(k).casefold(): v for k, v in data.items()}
+    rows = {}
+    for name, spec in LIVE_SOURCES.items():
+        if action not in spec["actions"]:
+            continue
+        row = {}
+        for column, aliases in spec["fields"].items():
+            value = next((_parse_value(column, fields[a]) for a in aliases if a in fields), None)
+            if value is None:
+                break
+            row[column] = value
+        else:
+            rows[name] = row
+    return rows
+
+
+def _resume_offset(reports, state):
+    """Index of the first unseen report. Falls back to a full rescan (deduplicated by report key)
+    when the stored watermark no longer matches, e.g. after aquacycle.json was replaced."""
+    offset = state.get("offset", 0)
+    if 0 < offset <= len(reports) and report_key(reports[offset - 1]) == state.get("last_key"):
+        return offset
+    return 0
+
+
+def _live_keys(name):
+    path = live_path(name)
+    if not os.path.exists(path):
+        return set()
+    return set(pd.read_csv(path, usecols=["Report_Key"], dtype=str)["Report_Key"])
+
+
+def collect(reports, state):
+    """Append the labelled rows of unseen reports to the live store; returns rows added per bundle."""
+    start = _resume_offset(reports, state)
+    new = {name: [] for name in LIVE_SOURCES}
+    for report in reports[start:]:
+        for name, row in extract_rows(report).items():
+            row.update(Report_Key=report_key(report), Report_Date=report.get("date"))
+            new[name].append(row)
+
+    added = {}
+    for name, rows in new.items():
+        if start == 0 and rows:
+            seen = _live_keys(name)
+            rows = [r for r in rows if r["Report_Key"] not in seen]
+        if rows:
+            os.makedirs(LIVE_DIR, exist_ok=True)
+            path = live_path(name)
+            columns = list(LIVE_SOURCES[name]["fields"]) + KEY_COLUMNS
+            pd.DataFrame(rows, columns=columns).to_csv(path, mode="a", index=False, header=not os.path.exists(path))
+        added[name] = len(rows)
+
+    if reports:
+        state["offset"], state["last_key"] = len(reports), report_key(reports[-1])
+    return added
+
+
+def _encode(bundle, name, df):
+    """Model inputs and target for ``df`` using the served bundle's encoders.
+    Rows with labels the encoders have never seen are dropped."""
+    from ml_core.vocab import VOCAB
+    inputs, target = FEATURES[name]
+    keep = np.ones(len(df), dtype=bool)
+    columns = []
+    for spec in inputs:
+        if isinstance(spec, tuple):
+            column, key = spec
+            vocab = VOCAB.vocabulary(bundle, key)
+            codes = [vocab.lookup(v) for v in df[column]]
+            keep &= np.array([c is not None for c in codes], dtype=bool)
+            columns.append(np.array([0 if c is None else c for c in codes], dtype=np.float64))
+        else:
+            columns.append(df[spec].to_numpy(dtype=np.float64))
+    X = np.column_stack(columns)[keep]
+    y = df[target].to_numpy()[keep]
+    return X, y, int((~keep).sum())
+
+
+def _replay_sample(name, n, seed):
+    from ml_core.dataset_cache import read_dataset
+    columns = list(LIVE_SOURCES[name]["fields"])
+    base = read_dataset(BUNDLE_DATASETS[name], columns)
+    idx = np.random.default_rng(seed).choice(len(base), size=min(n, len(base)), replace=False)
+    sample = base.iloc[np.sort(idx)].reset_index(drop=True)
+    for column in columns:
+        if isinstance(sample[column].dtype, pd.CategoricalDtype):
+            sample[column] = sample[column].astype(str)
+    return sample
+
+
+def _as_compact(model):
+    from ml_core.compaction import CompactForest, SUPPORTED
+    if isinstance(model, CompactForest):
+        return model
+    if type(model).__name__ in SUPPORTED:
+        return CompactForest.from_forest(model)
+    return None
+
+
+def _fit_increment(current, X, y, name, seed):
+    """INCREMENT_TREES new trees of the served model's kind, compacted like the trainers do."""
+    import sklearn.ensemble
+    from ml_core.compaction import CompactForest, COMPACTION
+    kind = getattr(sklearn.ensemble, current.source["estimator"])
+    model = kind(n_estimators=INCREMENT_TREES, random_state=seed)
+    if hasattr(current, "classes_"):
+        y = y.astype(current.classes_.dtype)
+    model.fit(X, y)
+    return CompactForest.from_forest(model, **COMPACTION.get(name, {}))
+
+
+def _score(model, X, y):
+    from ml_core.compaction import _score as score
+    return round(score(model, X, y)[1], 6) if len(X) else None
+
+
+def refit(name, force=False, dry_run=False, registry=None, seed=None):
+    """Append trees fit on the bundle's unseen live rows to its served model and promote the result."""
+    from ml_core.registry import REGISTRY
+    registry = registry or REGISTRY
+    path = live_path(name)
+    if not os.path.exists(path):
+        return {"status": "no_data"}
+    live = pd.read_csv(path, dtype={c: str for c in CATEGORICAL | set(KEY_COLUMNS)})
+    bundle = registry.bundle(name)
+    params = bundle.manifest.get("params", {})
+    applied = params.get("live_rows", 0)
+    fresh = live.iloc[applied:] if applied <= len(live) else live
+    if len(fresh) == 0 or (len(fresh) < MIN_NEW_ROWS and not force):
+        return {"status": "waiting", "pending_rows": len(fresh), "min_rows": MIN_NEW_ROWS}
+
+    current = _as_compact(bundle.get("model"))
+    if current is None:
+        return {"status": "unsupported", "model": type(bundle.get("model")).__name__}
+    if dry_run:
+        return {"status": "would_refit", "pending_rows": len(fresh)}
+
+    started = time.time()
+    seed = int(time.time()) if seed is None else seed
+    X_new, y_new, unknown = _encode(bundle, name, fresh.reset_index(drop=True))
+    if hasattr(current, "classes_"):
+        known = np.isin(y_new, current.classes_)
+        unknown += int((~known).sum())
+        X_new, y_new = X_new[known], y_new[known]
+    if len(X_new) == 0:
+        return {"status": "skipped", "pending_rows": len(fresh), "unknown_rows": unknown}
+
+    replay = _replay_sample(name, min(MAX_REPLAY_ROWS, REPLAY_RATIO * len(X_new)), seed)
+    X_replay, y_replay, _ = _encode(bundle, name, replay)
+    X = np.vstack([X_new, X_replay])
+    y = np.concatenate([y_new, y_replay])
+    increment = _fit_increment(current, X, y, name, seed)
+
+    trees_before = current.n_trees
+    base_trees = params.get("base_trees", trees_before)
+    extra = list(range(base_trees, current.n_trees))
+    if len(extra) + increment.n_trees > MAX_INCREMENTAL_TREES:
+        drop = len(extra) + increment.n_trees - MAX_INCREMENTAL_TREES
+        current = current.select_trees(list(range(base_trees)) + extra[drop:])
+    from ml_core.compaction import CompactForest
+    merged = CompactForest.concat([current, increment])
+
+    metrics = dict(bundle.manifest.get("metrics", {}))
+    metrics["incremental"] = {
+        "new_rows": int(len(X_new)),
+        "unknown_rows": unknown,
+        "replay_rows": int(len(X_replay)),
+        "trees_before": trees_before,
+        "trees_after": merged.n_trees,
+        # Both sets are part of what the new trees were fit on, so these are in-sample scores
+        "scores_evaluated_on": "training rows (in-sample)",
+        "live_score_in_sample_before": _score(current, X_new, y_new),
+        "live_score_in_sample_after": _score(merged, X_new, y_new),
+        "replay_score_in_sample_before": _score(current, X_replay, y_replay),
+        "replay_score_in_sample_after": _score(merged, X_replay, y_replay),
+        "seconds": round(time.time() - started, 3),
+    }
+    artifacts = dict(bundle.artifacts, model=merged)
+    manifest = registry.publish(
+        name, artifacts, metrics=metrics, dataset_path=path,
+        params=dict(params, live_rows=len(live), base_trees=base_trees, base_version=params.get("base_version", bundle.version)),
+        promote=True,
+    )
+    return {"status": "refit", "version": manifest["version"], "metrics": metrics["incremental"]}
+
+
+def _acquire_file_lock():
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    try:
+        if os.path.exists(LOCK_FILE) and time.time() - os.path.getmtime(LOCK_FILE) > LOCK_STALE_SECONDS:
+            os.remove(LOCK_FILE)
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def run(reports=None, names=None, force=False, dry_run=False):
+    """One incremental pass. Returns a report dict, or None if another run (in this or another
+    worker process) is in progress."""
+    if not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        if not dry_run and not _acquire_file_lock():
+            return None
+        try:
+            if reports is None:
+                with open(AQUACYCLE_FILE) as f:
+                    reports = json.load(f).get("reports", [])
+            state = _load_state()
+            report = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "bundles": {}}
+            if dry_run:
+                report["collected"] = {n: len(r) for n, r in _pending_rows(reports, state).items()}
+            else:
+                report["collected"] = collect(reports, state)
+                state["runs"] = state.get("runs", 0) + 1
+                _save_state(state)
+            for name in names or list(LIVE_SOURCES):
+                try:
+                    report["bundles"][name] = refit(name, force=force, dry_run=dry_run)
+                except Exception as e:
+                    report["bundles"][name] = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            with _pending_lock:
+                _pending.update(offset=state["offset"], rows=0)
+            return report
+        finally:
+            if not dry_run and os.path.exists(LOCK_FILE):
+                os.remove(LOCK_FILE)
+    finally:
+        _run_lock.release()
+
+
+def _pending_rows(reports, state):
+    rows = {name: [] for name in LIVE_SOURCES}
+    for report in reports[_resume_offset(reports, state):]:
+        for name, row in extract_rows(report).items():
+            rows[name].append(row)
+    return rows
+
+
+def _run_logged(reports, **kwargs):
+    try:
+        report = run(reports, **kwargs)
+    except Exception as e:
+        print(f"❌ [ML ERROR] Incremental training failed: {e}")
+        return
+    for name, r in (report or {}).get("bundles", {}).items():
+        if r["status"] == "refit":
+            print(f"✅ {name} model refit on {r['metrics']['new_rows']} live rows -> {r['version']}")
+        elif r["status"] == "failed":
+            print(f"⚠️  [ML WARNING] Incremental refit of {name} failed - {r['error']}")
+
+
+def notify(reports, report):
+    """Called by the work route after a report is logged. Counts the labelled rows waiting since
+    the last run and starts a background run once MIN_NEW_ROWS of them are waiting."""
+    if not extract_rows(report):
+        return False
+    with _pending_lock:
+        if _pending["offset"] is None:
+            state = _load_state()
+            _pending["offset"] = _resume_offset(reports, state)
+            _pending["rows"] = max((len(r) for r in _pending_rows(reports, state).values()), default=0)
+        else:
+            _pending["rows"] += 1
+        waiting = _pending["rows"]
+    if waiting < MIN_NEW_ROWS or _run_lock.locked():
+        return False
+    threading.Thread(target=_run_logged, args=(list(reports),), daemon=True).start()
+    return True
+
+
+def start_scheduler(get_reports, interval=INTERVAL_SECONDS):
+    """Daemon thread running an incremental pass every ``interval`` seconds."""
+    if not interval or interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            _run_logged(list(get_reports()))
+
+    thread = threading.Thread(target=loop, name="aqua-incremental", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refit the AQUA models on newly logged pond reports.")
+    parser.add_argument("--only", nargs="*", choices=list(LIVE_SOURCES), help="Bundles to consider (default: all)")
+    parser.add_argument("--force", action="store_true", help=f"Refit even with fewer than {MIN_NEW_ROWS} new rows")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be collected and refit")
+    parser.add_argument("--reports", default=AQUACYCLE_FILE, help="aquacycle.json to read reports from")
+    args = parser.parse_args(argv)
+
+    with open(args.reports) as f:
+        reports = json.load(f).get("reports", [])
+    report = run(reports, names=args.only, force=args.force, dry_run=args.dry_run)
+    if report is None:
+        print("⚠️  [ML WARNING] Another incremental run is in progress")
+        return 1
+    print(f"Collected live rows: {report['collected']}")
+    for name, r in sorted(report["bundles"].items()):
+        extra = r.get("error") or r.get("metrics") or {k: v for k, v in r.items() if k != "status"}
+        print(f"{name:10s} {r['status']:12s} {r.get('version', ''):20s} {extra}")
+    return 1 if any(r["status"] == "failed" for r in report["bundles"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
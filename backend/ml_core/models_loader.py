@@ -1,5 +1,4 @@
 import os
-import joblib
 import warnings
 
 # Suppress sklearn unpickling warnings for cleaner console output
@@ -43,51 +42,44 @@ def convert_quantity(value, target_unit, from_unit="kg"):
     elif target_unit == "pounds": return value_kg * 2.20462, "Pounds (lbs)"
     else: return value_kg, "Kilograms (kg)"
 
-MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "models"))
+from ml_core.registry import REGISTRY, MODEL_BUNDLES, MODEL_DIR, ModelUnavailable
 
-def _load_model(fname):
-    path = os.path.join(MODEL_DIR, fname)
-    if not os.path.exists(path):
-        print(f"⚠️  [ML WARNING] Model file missing: {path}. Using Safe Dummy Fallback.")
-        class DummyModel:
-            def predict(self, *args, **kwargs): return [0]
-            def transform(self, *args, **kwargs): return [0]
-            @property
-            def classes_(self): return []
-        return DummyModel()
-    try:
-        return joblib.load(path)
-    except Exception as e:
-        print(f"❌ [ML ERROR] Error loading {fname}: {e}. Using Safe Dummy Fallback.")
-        class DummyModel:
-            def predict(self, *args, **kwargs): return [0]
-            def transform(self, *args, **kwargs): return [0]
-            @property
-            def classes_(self): return []
-        return DummyModel()
+# "sklearn" unpickles the trained artifacts; "onnx" serves versions exported with
+# ml_core/onnx_export.py through onnxruntime (no sklearn import in the web workers)
+# and falls back to the pickles for versions that were never exported.
+INFERENCE_BACKEND = os.getenv("AQUA_INFERENCE_BACKEND", "sklearn").lower()
 
-disease_model = _load_model("disease.pkl")
-location_model = _load_model("location.pkl")
-feed_model = _load_model("feed.pkl")
-yield_model = _load_model("yield.pkl")
-buyer_model = _load_model("buyer.pkl")
-stocking_model = _load_model("stocking.pkl")
-seed_model = _load_model("seed.pkl")
+if INFERENCE_BACKEND == "onnx":
+    from ml_core.onnx_backend import load_onnx_artifacts
+    REGISTRY.artifact_loader = load_onnx_artifacts
 
-le_country = _load_model("le_country.pkl")
-le_state = _load_model("le_state.pkl")
-le_climate = _load_model("le_climate.pkl")
-le_aqua = _load_model("le_aqua.pkl")
-le_species_loc = _load_model("le_species_location.pkl")
-le_species_feed = _load_model("le_species_feed.pkl")
-le_feed = _load_model("le_feed.pkl")
-le_species_yield = _load_model("le_species_yield.pkl")
-le_country_buyer = _load_model("le_country_buyer.pkl")
-le_species_buyer = _load_model("le_species_buyer.pkl")
-le_grade_buyer = _load_model("le_grade_buyer.pkl")
-le_species_stock = _load_model("le_species_stock.pkl")
-le_soil = _load_model("le_soil.pkl")
-le_water_source = _load_model("le_water_source.pkl")
-le_season_stock = _load_model("le_season_stock.pkl")
-le_country_seed = _load_model("le_country_seed.pkl")
-le_species_seed_chk = _load_model("le_species_seed_chk.pkl")
+# Old module-level names -> (bundle, artifact key). They are resolved on every access
+# through the registry so a promoted version is picked up without a restart.
+_LEGACY_NAMES = {f"{name}_model": (name, "model") for name in MODEL_BUNDLES}
+_LEGACY_NAMES.update({key: (name, key) for name, keys in MODEL_BUNDLES.items() for key in keys if key != "model"})
+
+def get_model(name, key="model"):
+    """Currently promoted artifact of a bundle, e.g. get_model("stocking", "le_soil")."""
+    return REGISTRY.get(name, key)
+
+def get_bundle(name):
+    """Whole active bundle; use it when a request needs several artifacts of one version."""
+    return REGISTRY.bundle(name)
+
+def require_bundle(name):
+    """Active bundle for a prediction. Raises ModelUnavailable when any of its artifacts
+    failed to load, so callers answer 503 instead of predicting from placeholders."""
+    bundle = REGISTRY.bundle(name)
+    if not bundle.healthy:
+        raise ModelUnavailable(name, bundle.errors)
+    return bundle
+
+def models_health():
+    return REGISTRY.health()
+
+def __getattr__(attr):
+    if attr in _LEGACY_NAMES:
+        return REGISTRY.get(*_LEGACY_NAMES[attr])
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+REGISTRY.load_all()
@@ -0,0 +1,103 @@
+# AQUA ONNX Inference Backend
+# ===========================
+#
+# Serves the registry bundles from the model.onnx / encoders.json files written
+# by ml_core/onnx_export.py, using onnxruntime's CPU execution provider. Nothing
+# here imports sklearn: OnnxModel stands in for the model (predict /
+# predict_proba / classes_) and OnnxEncoder for the LabelEncoders (classes_,
+# which is all VOCAB reads). Versions without an ONNX export are loaded from
+# their pickles as before.
+#
+# Enabled with AQUA_INFERENCE_BACKEND=onnx (see models_loader.py).
+
+import os
+import json
+import numpy as np
+import onnxruntime as ort
+
+# Threads per session; web workers run many small requests side by side
+INTRA_OP_THREADS = int(os.getenv("AQUA_ONNX_THREADS", "1"))
+
+
+def _session(model):
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = INTRA_OP_THREADS
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(model, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class OnnxModel:
+    """Drop-in for a fitted model: ``predict`` returns labels (classifiers) or values shaped
+    like sklearn's, ``predict_proba`` class probabilities."""
+
+    def __init__(self, model, path=None):
+        self.path = path
+        self.session = _session(model)
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.kind = meta.get("aqua_kind", "regressor")
+        self.n_outputs_ = int(meta.get("aqua_n_outputs", "1"))
+        if "aqua_classes" in meta:
+            self.classes_ = np.asarray(json.loads(meta["aqua_classes"]))
+        inp = self.session.get_inputs()[0]
+        self.n_features_in_ = inp.shape[1]
+        self._input = inp.name
+        self._output = self.session.get_outputs()[0].name
+
+    @classmethod
+    def load(cls, path):
+        return cls(path, path=path)
+
+    def raw(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return self.session.run([self._output], {self._input: np.ascontiguousarray(X)})[0]
+
+    def predict_proba(self, X):
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self.raw(X).astype(np.float64)
+
+    def predict(self, X):
+        out = self.raw(X).astype(np.float64)
+        if self.kind == "classifier":
+            return self.classes_.take(np.argmax(out, axis=1))
+        return out[:, 0] if self.n_outputs_ == 1 else out
+
+
+class OnnxEncoder:
+    """LabelEncoder replacement rebuilt from the exported class list."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, values):
+        values = np.asarray(values)
+        idx = np.searchsorted(self.classes_, values)
+        if np.any(idx >= len(self.classes_)) or np.any(self.classes_[np.minimum(idx, len(self.classes_) - 1)] != values):
+            raise ValueError(f"y contains previously unseen labels: {values}")
+        return idx
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes)]
+
+
+def load_onnx_artifacts(version_dir, manifest, keys):
+    """Registry artifact loader: the bundle's artifacts from its ONNX export, or None when the
+    version was never exported or its export failed the parity check (the registry then
+    unpickles it as usual)."""
+    entry = manifest.get("onnx")
+    if not entry or not entry.get("parity", {}).get("ok"):
+        return None
+    model_path = os.path.join(version_dir, entry["file"])
+    encoders_path = os.path.join(version_dir, entry["encoders"])
+    if not (os.path.exists(model_path) and os.path.exists(encoders_path)):
+        return None
+    with open(encoders_path) as f:
+        encoders = json.load(f)
+    if set(keys) - {"model"} - set(encoders):
+        return None
+    artifacts = {key: OnnxEncoder(encoders[key]) for key in keys if key != "model"}
+    artifacts["model"] = OnnxModel.load(model_path)
+    return artifacts
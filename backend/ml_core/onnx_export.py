@@ -0,0 +1,401 @@
+# AQUA ONNX Exporter
+# ==================
+#
+# Converts the fitted prediction models to ONNX graphs that onnxruntime can
+# serve without sklearn (see ml_core/onnx_backend.py):
+#
+#   RandomForest / ExtraTrees (regressor, classifier), CompactForest,
+#   GradientBoostingRegressor, HistGradientBoostingRegressor,
+#   ADER (RF + GB blend), ASER (forest + linear trend), AMPRO,
+#   APDC (per-fold CalibratedClassifierCV, collapsed lookup table, or plain forest)
+#
+# Every tree of a model is folded into a single ai.onnx.ml TreeEnsembleRegressor
+# whose leaf values already carry the model's averaging / blend weights, so a
+# blend costs one tree pass. Thresholds are rounded down to float32 exactly like
+# CompactForest, so float32 inputs split the same way sklearn splits them.
+# Graphs take "X" float32 [N, n_features] and return "variable" [N, n_outputs]
+# (regressors) or "probabilities" [N, n_classes] (classifiers, labels in the
+# "aqua_classes" metadata).
+#
+# export_bundle() checks parity against the pickled model and, only if it holds,
+# writes model.onnx and encoders.json next to a registry version's pickles and
+# records them in the manifest (a failed check removes any earlier export):
+#
+#   python -m ml_core.onnx_export                   # current version of every bundle
+#   python -m ml_core.onnx_export --only disease feed
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import onnx
+from onnx import helper, numpy_helper, TensorProto
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.compaction import CompactForest, _floor_float32  # noqa: E402
+
+OPSET = 17
+ML_OPSET = 3
+PARITY_ROWS = 2000
+# Largest |onnx - pickled| accepted by export_bundle (relative to the output scale)
+PARITY_TOLERANCE = 1e-4
+
+FOREST_KINDS = ("RandomForestRegressor", "RandomForestClassifier", "ExtraTreesRegressor", "ExtraTreesClassifier")
+
+
+class ExportError(Exception):
+    pass
+
+
+# ---- tree extraction: every tree becomes a dict of flat node arrays ----
+def _sklearn_tree(est, classifier):
+    t = est.tree_
+    if classifier:
+        values = t.value[:, 0, :]
+        values = values / np.maximum(values.sum(axis=1, keepdims=True), 1e-12)
+    else:
+        values = t.value[:, :, 0]
+    return {"feature": t.feature, "threshold": t.threshold, "left": t.children_left, "right": t.children_right,
+            "leaf": t.children_left == -1, "values": values}
+
+
+def _compact_trees(model):
+    ends = np.append(model.roots[1:], model.node_count)
+    trees = []
+    for start, end in zip(model.roots, ends):
+        leaf_rows = model.leaf[start:end]
+        is_leaf = leaf_rows >= 0
+        values = np.zeros((end - start, model.values.shape[1]))
+        values[is_leaf] = model.values[leaf_rows[is_leaf]]
+        trees.append({"feature": model.feature[start:end], "threshold": model.threshold[start:end],
+                      "left": model.left[start:end] - start, "right": model.right[start:end] - start,
+                      "leaf": is_leaf, "values": values})
+    return trees
+
+
+def _hist_tree(predictor):
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise ExportError("Categorical splits of HistGradientBoosting are not supported")
+    return {"feature": nodes["feature_idx"], "threshold": nodes["num_threshold"], "left": nodes["left"],
+            "right": nodes["right"], "leaf": nodes["is_leaf"].astype(bool), "values": nodes["value"][:, None],
+            "missing_left": nodes["missing_go_to_left"].astype(bool)}
+
+
+def forest_terms(model):
+    """(trees, per-tree weight, classes) of an averaging forest."""
+    if isinstance(model, CompactForest):
+        trees = _compact_trees(model)
+        return trees, 1.0 / len(trees), getattr(model, "classes_", None)
+    kind = type(model).__name__
+    if kind not in FOREST_KINDS:
+        raise ExportError(f"Expected a forest, got {kind}")
+    classifier = hasattr(model, "classes_")
+    if classifier and model.n_outputs_ != 1:
+        raise ExportError("Multi-output classifiers are not supported")
+    trees = [_sklearn_tree(est, classifier) for est in model.estimators_]
+    return trees, 1.0 / len(trees), getattr(model, "classes_", None)
+
+
+def boosting_terms(model):
+    """(trees, per-tree weight, base value) of a gradient boosting regressor."""
+    kind = type(model).__name__
+    if kind == "GradientBoostingRegressor":
+        if isinstance(model.init_, str):
+            base = 0.0
+        elif type(model.init_).__name__ == "DummyRegressor":
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ExportError(f"Unsupported GradientBoosting init estimator {type(model.init_).__name__}")
+        return [_sklearn_tree(est, False) for est in model.estimators_[:, 0]], model.learning_rate, base
+    if kind == "HistGradientBoostingRegressor":
+        # Leaf values of the histogram trees already include the learning rate
+        return [_hist_tree(p[0]) for p in model._predictors], 1.0, float(np.ravel(model._baseline_prediction)[0])
+    raise ExportError(f"Expected a gradient boosting regressor, got {kind}")
+
+
+# ---- graph construction ----
+class _Graph:
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self.nodes, self.initializers = [], []
+        self._names = 0
+
+    def name(self, prefix):
+        self._names += 1
+        return f"{prefix}_{self._names}"
+
+    def const(self, array, dtype=np.float32):
+        name = self.name("c")
+        self.initializers.append(numpy_helper.from_array(np.asarray(array, dtype=dtype), name))
+        return name
+
+    def op(self, op_type, inputs, domain="", **attrs):
+        out = self.name(op_type.lower())
+        self.nodes.append(helper.make_node(op_type, inputs, [out], domain=domain, **attrs))
+        return out
+
+    def trees(self, x, groups, n_targets, base=None):
+        """One TreeEnsembleRegressor summing ``weight * leaf value`` over every (trees, weight) group."""
+        attrs = {k: [] for k in ("nodes_treeids", "nodes_nodeids", "nodes_featureids", "nodes_values", "nodes_modes",
+                                 "nodes_truenodeids", "nodes_falsenodeids", "nodes_missing_value_tracks_true",
+                                 "target_treeids", "target_nodeids", "target_ids", "target_weights")}
+        tree_id = 0
+        for trees, weight in groups:
+            for tree in trees:
+                n = len(tree["leaf"])
+                node_ids = list(range(n))
+                leaf = np.asarray(tree["leaf"], dtype=bool)
+                threshold = _floor_float32(np.asarray(tree["threshold"], dtype=np.float64))
+                attrs["nodes_treeids"] += [tree_id] * n
+                attrs["nodes_nodeids"] += node_ids
+                attrs["nodes_featureids"] += np.where(leaf, 0, tree["feature"]).astype(int).tolist()
+                attrs["nodes_values"] += np.where(leaf, 0, threshold).astype(np.float32).tolist()
+                attrs["nodes_modes"] += ["LEAF" if is_leaf else "BRANCH_LEQ" for is_leaf in leaf]
+                attrs["nodes_truenodeids"] += np.where(leaf, 0, tree["left"]).astype(int).tolist()
+                attrs["nodes_falsenodeids"] += np.where(leaf, 0, tree["right"]).astype(int).tolist()
+                missing = tree.get("missing_left")
+                attrs["nodes_missing_value_tracks_true"] += (np.zeros(n, int) if missing is None
+                                                             else np.where(leaf, 0, missing).astype(int)).tolist()
+                values = np.asarray(tree["values"], dtype=np.float64) * weight
+                for node in np.flatnonzero(leaf):
+                    for target in range(n_targets):
+                        attrs["target_treeids"].append(tree_id)
+                        attrs["target_nodeids"].append(int(node))
+                        attrs["target_ids"].append(target)
+                        attrs["target_weights"].append(float(values[node, target]))
+                tree_id += 1
+        base_values = np.zeros(n_targets) if base is None else np.broadcast_to(np.asarray(base, dtype=np.float64), (n_targets,))
+        return self.op("TreeEnsembleRegressor", [x], domain="ai.onnx.ml", n_targets=n_targets,
+                       aggregate_function="SUM", post_transform="NONE",
+                       base_values=[float(v) for v in base_values], **attrs)
+
+    def model(self, output, n_outputs, kind, classes=None):
+        out_name = "probabilities" if kind == "classifier" else "variable"
+        self.nodes.append(helper.make_node("Identity", [output], [out_name]))
+        graph = helper.make_graph(
+            self.nodes, "aqua_model",
+            [helper.make_tensor_value_info("X", TensorProto.FLOAT, [None, self.n_features])],
+            [helper.make_tensor_value_info(out_name, TensorProto.FLOAT, [None, n_outputs])],
+            self.initializers,
+        )
+        proto = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET),
+                                                        helper.make_opsetid("ai.onnx.ml", ML_OPSET)],
+                                  producer_name="aqua-onnx-export")
+        proto.ir_version = 8
+        meta = {"aqua_kind": kind, "aqua_n_outputs": str(n_outputs)}
+        if classes is not None:
+            meta["aqua_classes"] = json.dumps(np.asarray(classes).tolist())
+        onnx.helper.set_model_props(proto, meta)
+        onnx.checker.check_model(proto)
+        return proto
+
+
+def _n_outputs(trees):
+    return trees[0]["values"].shape[1]
+
+
+def _calibrated(g, scores, columns, slopes, intercepts, n_classes):
+    """sklearn sigmoid calibration of ``scores[:, columns]`` followed by its normalisation."""
+    picked = g.op("Gather", [scores, g.const(columns, np.int64)], axis=1)
+    # _SigmoidCalibration: expit(-(a * score + b))
+    z = g.op("Add", [g.op("Mul", [picked, g.const(-np.asarray(slopes))]), g.const(-np.asarray(intercepts))])
+    return _normalized(g, g.op("Sigmoid", [z]), n_classes)
+
+
+def _normalized(g, calibrated, n_classes):
+    if n_classes == 2:
+        return g.op("Concat", [g.op("Sub", [g.const([[1.0]]), calibrated]), calibrated], axis=1)
+    total = g.op("ReduceSum", [calibrated, g.const([1], np.int64)], keepdims=1)
+    return g.op("Div", [calibrated, total])
+
+
+def _convert_apdc(g, model):
+    classes = model.classes_
+    n_classes = len(classes)
+    if model.calibrate and getattr(model, "collapsed", False):
+        trees, weight, _ = forest_terms(model.deploy_forest_)
+        scores = g.trees("X", [(trees, weight)], n_classes)
+        columns = np.asarray(model.calibration_columns_, dtype=np.int64)
+        size = model.table_size
+        picked = g.op("Gather", [scores, g.const(columns, np.int64)], axis=1)
+        clipped = g.op("Clip", [picked, g.const(0.0), g.const(1.0)])
+        # Same nearest-grid-point lookup as APDC._collapsed_proba (Round is half-to-even like np.rint)
+        index = g.op("Cast", [g.op("Round", [g.op("Mul", [clipped, g.const(float(size - 1))])])], to=TensorProto.INT64)
+        flat = g.op("Add", [index, g.const(np.arange(len(columns)) * size, np.int64)])
+        table = g.const(np.asarray(model.calibration_table_, dtype=np.float64).ravel())
+        calibrated = g.op("Gather", [table, flat], axis=0)
+        return _normalized(g, calibrated, n_classes), classes
+    if model.calibrate and model.calibrated_classifier is not None:
+        folds = []
+        for fitted in model.calibrated_classifier.calibrated_classifiers_:
+            if any(type(c).__name__ != "_SigmoidCalibration" for c in fitted.calibrators):
+                raise ExportError("Only sigmoid calibration is supported")
+            trees, weight, _ = forest_terms(fitted.estimator)
+            scores = g.trees("X", [(trees, weight)], n_classes)
+            columns = [1] if n_classes == 2 else list(range(n_classes))
+            folds.append(_calibrated(g, scores, columns, [c.a_ for c in fitted.calibrators],
+                                     [c.b_ for c in fitted.calibrators], n_classes))
+        return (folds[0] if len(folds) == 1 else g.op("Mean", folds)), classes
+    trees, weight, _ = forest_terms(model.base_classifier)
+    return g.trees("X", [(trees, weight)], n_classes), classes
+
+
+def _convert(g, model):
+    """Add ``model`` to the graph; returns (output name, n_outputs, classes or None)."""
+    kind = type(model).__name__
+    if isinstance(model, CompactForest) or kind in FOREST_KINDS:
+        trees, weight, classes = forest_terms(model)
+        return g.trees("X", [(trees, weight)], _n_outputs(trees)), _n_outputs(trees), classes
+    if kind in ("GradientBoostingRegressor", "HistGradientBoostingRegressor"):
+        trees, weight, base = boosting_terms(model)
+        return g.trees("X", [(trees, weight)], 1, base), 1, None
+    if kind == "ADER":
+        rf_trees, rf_weight, _ = forest_terms(model.rf_model)
+        gb_trees, gb_weight, base = boosting_terms(model.gb_model)
+        groups = [(rf_trees, model.rf_weight * rf_weight), (gb_trees, model.gb_weight * gb_weight)]
+        return g.trees("X", groups, 1, model.gb_weight * base), 1, None
+    if kind == "ASER":
+        trees, weight, _ = forest_terms(model.ensemble_model)
+        n = _n_outputs(trees)
+        if not model.adapt_weights:
+            return g.trees("X", [(trees, weight)], n), n, None
+        forest = g.trees("X", [(trees, model.ensemble_weight * weight)], n)
+        coef = np.atleast_2d(model.trend_model.coef_).T * model.trend_weight
+        intercept = np.ravel(model.trend_model.intercept_) * model.trend_weight
+        trend = g.op("Add", [g.op("MatMul", ["X", g.const(coef)]), g.const(intercept)])
+        return g.op("Add", [forest, trend]), n, None
+    if kind == "AMPRO":
+        trees, weight, _ = forest_terms(model.base_model)
+        scale = model.market_adjustment if model.market_aware else 1.0
+        return g.trees("X", [(trees, weight * scale)], _n_outputs(trees)), _n_outputs(trees), None
+    if kind == "APDC":
+        out, classes = _convert_apdc(g, model)
+        return out, len(classes), classes
+    raise ExportError(f"No ONNX converter for {kind}")
+
+
+def to_onnx(model, n_features=None):
+    """ONNX ModelProto equivalent to ``model.predict`` / ``predict_proba``."""
+    n_features = n_features or getattr(model, "n_features_in_", None)
+    for attr in ("rf_model", "ensemble_model", "base_model", "base_classifier", "deploy_forest_"):
+        n_features = n_features or getattr(getattr(model, attr, None), "n_features_in_", None)
+    if not n_features:
+        raise ExportError(f"Cannot tell the input width of {type(model).__name__}; pass n_features")
+    g = _Graph(int(n_features))
+    output, n_outputs, classes = _convert(g, model)
+    return g.model(output, n_outputs, "classifier" if classes is not None else "regressor", classes)
+
+
+# ---- parity ----
+def reference_output(model, X):
+    """What the ONNX graph should return for ``model``: probabilities or a 2-D prediction."""
+    if hasattr(model, "classes_") and hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X), dtype=np.float64)
+    pred = np.asarray(model.predict(X), dtype=np.float64)
+    return pred.reshape(len(X), -1)
+
+
+def parity(model, proto, X):
+    """Max absolute / relative difference between onnxruntime and the in-process model."""
+    from ml_core.onnx_backend import OnnxModel
+    X = np.asarray(X, dtype=np.float32)
+    onnx_out = OnnxModel(proto.SerializeToString()).raw(X).astype(np.float64)
+    ref = reference_output(model, X)
+    diff = np.abs(onnx_out - ref)
+    report = {
+        "rows": int(len(X)),
+        "max_abs_diff": float(diff.max()),
+        "max_rel_diff": float((diff / np.maximum(np.abs(ref), 1.0)).max()),
+    }
+    if hasattr(model, "classes_"):
+        report["label_agreement"] = float(np.mean(onnx_out.argmax(axis=1) == ref.argmax(axis=1)))
+    report["ok"] = report["max_rel_diff"] <= PARITY_TOLERANCE
+    return report
+
+
+# ---- registry integration ----
+def export_bundle(name, version=None, registry=None):
+    """Write model.onnx + encoders.json into a registry version and record them in its manifest."""
+    import importlib
+    from ml_core.registry import REGISTRY, BUNDLE_DATASETS, LEGACY_VERSION, file_sha256
+    from ml_core.build_models import TRAINERS
+    registry = registry or REGISTRY
+    version = version or registry.current_version(name)
+    if version == LEGACY_VERSION:
+        raise ExportError(f"{name} has no registry version to export (legacy files only)")
+    bundle = registry.load_bundle(name, version)
+    if not bundle.healthy:
+        raise ExportError(f"{name}/{version} is not loadable: {bundle.errors}")
+    model = bundle.get("model")
+
+    started = time.time()
+    proto = to_onnx(model)
+    X, _, _ = importlib.import_module(TRAINERS[name]).prepare(BUNDLE_DATASETS[name])
+    check = parity(model, proto, np.asarray(X)[:PARITY_ROWS])
+    vdir = registry._version_dir(name, version)
+    onnx_path = os.path.join(vdir, "model.onnx")
+    encoders_path = os.path.join(vdir, "encoders.json")
+    if not check["ok"]:
+        # Never leave a graph that disagrees with the pickle where the ONNX backend would serve it
+        for path in (onnx_path, encoders_path):
+            if os.path.exists(path):
+                os.remove(path)
+        registry.update_manifest(name, version, onnx=None)
+        return {"installed": False, "parity": check, "bytes": len(proto.SerializeToString()),
+                "export_seconds": round(time.time() - started, 3)}
+
+    tmp = onnx_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(proto.SerializeToString())
+    os.replace(tmp, onnx_path)
+
+    encoders = {key: np.asarray(obj.classes_).tolist() for key, obj in bundle.artifacts.items()
+                if key != "model" and hasattr(obj, "classes_")}
+    with open(encoders_path + ".tmp", "w") as f:
+        json.dump(encoders, f, indent=4)
+    os.replace(encoders_path + ".tmp", encoders_path)
+
+    entry = {
+        "file": "model.onnx",
+        "sha256": file_sha256(onnx_path),
+        "encoders": "encoders.json",
+        "opset": OPSET,
+        "bytes": os.path.getsize(onnx_path),
+        "parity": check,
+        "export_seconds": round(time.time() - started, 3),
+    }
+    registry.update_manifest(name, version, onnx=entry)
+    return dict(entry, installed=True)
+
+
+def main(argv=None):
+    from ml_core.registry import MODEL_BUNDLES
+    parser = argparse.ArgumentParser(description="Export registry models to ONNX.")
+    parser.add_argument("--only", nargs="*", choices=list(MODEL_BUNDLES), help="Bundles to export (default: all)")
+    parser.add_argument("--version", help="Version to export (default: the current one; needs one --only bundle)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.only or list(MODEL_BUNDLES):
+        try:
+            entry = export_bundle(name, args.version)
+        except ExportError as e:
+            print(f"⚠️  [ML WARNING] {name}: {e}")
+            failed = True
+            continue
+        p = entry["parity"]
+        status = "✅" if p["ok"] else "❌ (not installed)"
+        failed = failed or not p["ok"]
+        print(f"{status} {name:10s} {entry['bytes'] / 1e3:8.1f}KB  max|diff|={p['max_abs_diff']:.2e} "
+              f"rel={p['max_rel_diff']:.2e} {entry['export_seconds']}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+# AQUA Model Registry
+# ===================
+#
+# Versioned storage for the trained prediction bundles (model + label encoders)
+# with an atomic in-process hot-swap, so retraining no longer needs a restart.
+#
+# Layout on disk:
+#   models/registry/<bundle>/<version>/*.pkl        artifacts of one training run
+#   models/registry/<bundle>/<version>/manifest.json metrics, dataset hash, params
+#   models/registry/<bundle>/CURRENT                 promoted version id
+#
+# Bundles without a promoted version are served from the legacy flat files in
+# models/ (version "legacy") so existing deployments keep working.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import joblib
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "models"))
+REGISTRY_DIR = os.path.join(MODEL_DIR, "registry")
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "datasets"))
+
+# Seconds between checks of the CURRENT pointers, so a promotion made by one
+# worker is picked up by every other worker without a restart.
+POLL_SECONDS = float(os.getenv("AQUA_MODEL_POLL_SECONDS", "5"))
+
+LEGACY_VERSION = "legacy"
+
+# Bundle name -> {artifact key: legacy file name in models/}
+MODEL_BUNDLES = {
+    "disease": {"model": "disease.pkl"},
+    "location": {
+        "model": "location.pkl",
+        "le_country": "le_country.pkl",
+        "le_state": "le_state.pkl",
+        "le_climate": "le_climate.pkl",
+        "le_aqua": "le_aqua.pkl",
+        "le_species_loc": "le_species_location.pkl",
+    },
+    "feed": {"model": "feed.pkl", "le_species_feed": "le_species_feed.pkl", "le_feed": "le_feed.pkl"},
+    "yield": {"model": "yield.pkl", "le_species_yield": "le_species_yield.pkl"},
+    "buyer": {
+        "model": "buyer.pkl",
+        "le_country_buyer": "le_country_buyer.pkl",
+        "le_species_buyer": "le_species_buyer.pkl",
+        "le_grade_buyer": "le_grade_buyer.pkl",
+    },
+    "stocking": {
+        "model": "stocking.pkl",
+        "le_species_stock": "le_species_stock.pkl",
+        "le_soil": "le_soil.pkl",
+        "le_water_source": "le_water_source.pkl",
+        "le_season_stock": "le_season_stock.pkl",
+    },
+    "seed": {
+        "model": "seed.pkl",
+        "le_country_seed": "le_country_seed.pkl",
+        "le_species_seed_chk": "le_species_seed_chk.pkl",
+    },
+}
+
+# Bundle name -> training dataset in ml_core/datasets/
+BUNDLE_DATASETS = {name: os.path.join(DATASET_DIR, f"{name}.csv") for name in MODEL_BUNDLES}
+
+
+class RegistryError(Exception):
+    pass
+
+
+class ModelUnavailable(RegistryError):
+    """A bundle needed for a prediction has artifacts that failed to load."""
+
+    def __init__(self, name, errors):
+        super().__init__(f"Model {name} is unavailable: {sorted(errors)}")
+        self.name = name
+        self.errors = errors
+
+
+class MissingModel:
+    """Placeholder served when an artifact cannot be loaded. Predicts 0 like the old DummyModel,
+    but is reported as missing by the health check instead of failing silently."""
+
+    def __init__(self, path, reason):
+        self.path = path
+        self.reason = reason
+
+    def predict(self, *args, **kwargs): return [0]
+    def transform(self, *args, **kwargs): return [0]
+
+    @property
+    def classes_(self): return []
+
+
+class ModelBundle:
+    """An immutable, fully loaded set of artifacts for one version of a bundle."""
+
+    def __init__(self, name, version, artifacts, manifest=None, errors=None):
+        self.name = name
+        self.version = version
+        self.artifacts = artifacts
+        self.manifest = manifest or {}
+        self.errors = errors or {}
+        self.loaded_at = time.time()
+
+    def get(self, key="model"):
+        return self.artifacts[key]
+
+    @property
+    def healthy(self):
+        return not self.errors
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _load_artifact(path):
+    if not os.path.exists(path):
+        return MissingModel(path, "file missing")
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        return MissingModel(path, f"load error: {e}")
+
+
+class ModelRegistry:
+    """Holds the active bundle per name and swaps it atomically on promotion.
+
+    Readers never take a lock: ``get`` does a single dict lookup, and a swap replaces the
+    dict entry with a fully loaded ``ModelBundle``. A prediction that already holds the old
+    bundle finishes on it; the next one sees the new version.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, legacy_dir=MODEL_DIR, bundles=MODEL_BUNDLES):
+        self.root = root
+        self.legacy_dir = legacy_dir
+        self.bundles = bundles
+        self._active = {}
+        self._pointer_mtimes = {}
+        self._write_lock = threading.Lock()
+        self._reloading = set()
+        self._last_poll = 0.0
+        # Optional (version_dir, manifest, keys) -> artifacts or None, tried before the pickles
+        self.artifact_loader = None
+
+    # ---- paths ----
+    def _bundle_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _version_dir(self, name, version):
+        return os.path.join(self._bundle_dir(name), version)
+
+    def _pointer_path(self, name):
+        return os.path.join(self._bundle_dir(name), "CURRENT")
+
+    def _check_name(self, name):
+        if name not in self.bundles:
+            raise RegistryError(f"Unknown model bundle: {name}")
+
+    def _check_version(self, name, version):
+        """Only ids of stored versions (or "legacy") may be turned into paths."""
+        if version != LEGACY_VERSION and version not in {m.get("version") for m in self.versions(name)}:
+            raise RegistryError(f"Version {version} of {name} not found")
+
+    # ---- reading ----
+    def current_version(self, name):
+        pointer = self._pointer_path(name)
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip() or LEGACY_VERSION
+        return LEGACY_VERSION
+
+    def versions(self, name):
+        self._check_name(name)
+        bundle_dir = self._bundle_dir(name)
+        if not os.path.isdir(bundle_dir):
+            return []
+        out = []
+        for version in sorted(os.listdir(bundle_dir)):
+            manifest_path = os.path.join(bundle_dir, version, "manifest.json")
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    out.append(json.load(f))
+        return out
+
+    def load_bundle(self, name, version=None):
+        """Load every artifact of a version from disk (does not activate it)."""
+        self._check_name(name)
+        version = version or self.current_version(name)
+        artifacts, errors, manifest = {}, {}, {}
+        if version == LEGACY_VERSION:
+            files = {key: os.path.join(self.legacy_dir, fname) for key, fname in self.bundles[name].items()}
+        else:
+            self._check_version(name, version)
+            vdir = self._version_dir(name, version)
+            manifest_path = os.path.join(vdir, "manifest.json")
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if self.artifact_loader is not None:
+                try:
+                    loaded = self.artifact_loader(vdir, manifest, list(self.bundles[name]))
+                except Exception as e:
+                    print(f"⚠️  [ML WARNING] {name} ({version}) alternative artifacts unusable, loading pickles - {e}")
+                    loaded = None
+                if loaded is not None:
+                    return ModelBundle(name, version, loaded, manifest)
+            files = {key: os.path.join(vdir, f"{key}.pkl") for key in self.bundles[name]}
+        for key, path in files.items():
+            obj = _load_artifact(path)
+            if isinstance(obj, MissingModel):
+                errors[key] = f"{obj.reason}: {path}"
+            artifacts[key] = obj
+        return ModelBundle(name, version, artifacts, manifest, errors)
+
+    def activate(self, bundle):
+        """Atomically make a loaded bundle the one served by ``get``."""
+        self._active[bundle.name] = bundle
+        pointer = self._pointer_path(bundle.name)
+        self._pointer_mtimes[bundle.name] = os.path.getmtime(pointer) if os.path.exists(pointer) else None
+        for key, err in bundle.errors.items():
+            print(f"⚠️  [ML WARNING] {bundle.name}/{key} ({bundle.version}) unavailable - {err}")
+
+    def bundle(self, name):
+        self._maybe_poll()
+        b = self._active.get(name)
+        if b is None:
+            with self._write_lock:
+                b = self._active.get(name)
+                if b is None:
+                    b = self.load_bundle(name)
+                    self.activate(b)
+        return b
+
+    def get(self, name, key="model"):
+        return self.bundle(name).get(key)
+
+    def load_all(self):
+        for name in self.bundles:
+            self.bundle(name)
+
+    # ---- writing ----
+    def publish(self, name, artifacts, metrics=None, dataset_path=None, params=None, promote=False):
+        """Store a new version of a bundle and return its manifest.
+
+        ``artifacts`` must contain every key listed for the bundle in MODEL_BUNDLES.
+        The version directory is written under a temp name and renamed into place, so a
+        half-written version is never visible.
+        """
+        self._check_name(name)
+        missing = set(self.bundles[name]) - set(artifacts)
+        if missing:
+            raise RegistryError(f"Bundle {name} is missing artifacts: {sorted(missing)}")
+
+        dataset_path = dataset_path or BUNDLE_DATASETS.get(name)
+        version = time.strftime("v%Y%m%d-%H%M%S")
+        bundle_dir = self._bundle_dir(name)
+        os.makedirs(bundle_dir, exist_ok=True)
+        suffix = 1
+        while os.path.exists(os.path.join(bundle_dir, version)):
+            suffix += 1
+            version = time.strftime("v%Y%m%d-%H%M%S") + f"-{suffix}"
+
+        manifest = {
+            "name": name,
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "metrics": metrics or {},
+            "params": params or {},
+            "dataset": os.path.basename(dataset_path) if dataset_path else None,
+            "dataset_sha256": file_sha256(dataset_path) if dataset_path and os.path.exists(dataset_path) else None,
+            "artifacts": {},
+        }
+
+        staging = tempfile.mkdtemp(dir=bundle_dir, prefix=".staging-")
+        try:
+            for key in self.bundles[name]:
+                path = os.path.join(staging, f"{key}.pkl")
+                joblib.dump(artifacts[key], path)
+                manifest["artifacts"][key] = {"file": f"{key}.pkl", "sha256": file_sha256(path)}
+            with open(os.path.join(staging, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(staging, os.path.join(bundle_dir, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if promote:
+            self.promote(name, version)
+        return manifest
+
+    def update_manifest(self, name, version, **fields):
+        """Merge fields into a stored version's manifest (e.g. evaluation results)."""
+        self._check_name(name)
+        self._check_version(name, version)
+        manifest_path = os.path.join(self._version_dir(name, version), "manifest.json")
+        with self._write_lock:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            for k, v in fields.items():
+                if isinstance(v, dict) and isinstance(manifest.get(k), dict):
+                    manifest[k].update(v)
+                else:
+                    manifest[k] = v
+            _atomic_write_text(manifest_path, json.dumps(manifest, indent=4))
+        return manifest
+
+    def promote(self, name, version):
+        """Load a version fully, then point CURRENT at it and swap it in."""
+        self._check_name(name)
+        self._check_version(name, version)
+        bundle = self.load_bundle(name, version)
+        if not bundle.healthy:
+            raise RegistryError(f"Refusing to promote {name}/{version}: {bundle.errors}")
+        with self._write_lock:
+            os.makedirs(self._bundle_dir(name), exist_ok=True)
+            if version == LEGACY_VERSION:
+                if os.path.exists(self._pointer_path(name)):
+                    os.remove(self._pointer_path(name))
+            else:
+                _atomic_write_text(self._pointer_path(name), version)
+            self.activate(bundle)
+        return bundle
+
+    # ---- cross-worker refresh ----
+    def _maybe_poll(self):
+        now = time.monotonic()
+        if now - self._last_poll < POLL_SECONDS:
+            return
+        self._last_poll = now
+        for name, active in list(self._active.items()):
+            pointer = self._pointer_path(name)
+            mtime = os.path.getmtime(pointer) if os.path.exists(pointer) else None
+            if mtime != self._pointer_mtimes.get(name) and name not in self._reloading:
+                self._reloading.add(name)
+                threading.Thread(target=self._reload, args=(name,), daemon=True).start()
+
+    def _reload(self, name):
+        # Runs off the request path: the old bundle keeps serving until the new one is loaded.
+        try:
+            bundle = self.load_bundle(name)
+            if bundle.healthy or bundle.version == LEGACY_VERSION:
+                self.activate(bundle)
+            else:
+                print(f"❌ [ML ERROR] Not swapping {name} to {bundle.version}: {bundle.errors}")
+        except Exception as e:
+            print(f"❌ [ML ERROR] Reload of {name} failed: {e}")
+        finally:
+            self._reloading.discard(name)
+
+    # ---- health ----
+    def health(self):
+        report = {}
+        for name in self.bundles:
+            b = self.bundle(name)
+            report[name] = {
+                "version": b.version,
+                "healthy": b.healthy,
+                "errors": b.errors,
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(b.loaded_at)),
+                "metrics": b.manifest.get("metrics", {}),
+                "dataset_sha256": b.manifest.get("dataset_sha256"),
+            }
+        return report
+
+
+REGISTRY = ModelRegistry()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect and promote AQUA model versions.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p = sub.add_parser("promote")
+    p.add_argument("name")
+    p.add_argument("version")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        for name in MODEL_BUNDLES:
+            current = REGISTRY.current_version(name)
+            print(f"{name}: current={current}")
+            for m in REGISTRY.versions(name):
+                mark = "*" if m["version"] == current else " "
+                print(f"  {mark} {m['version']}  metrics={m.get('metrics')}  dataset={str(m.get('dataset_sha256'))[:12]}")
+    elif args.cmd == "promote":
+        REGISTRY.promote(args.name, args.version)
+        print(f"Promoted {args.name} -> {args.version}")
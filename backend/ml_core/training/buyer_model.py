@@ -1,28 +1,56 @@
 # ml/buyer_model.py
-import pandas as pd
+import os
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
-import joblib
 
-df = pd.read_csv("dataset/buyer.csv")
+# Define relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "buyer.csv")
 
-le_country = LabelEncoder()
-le_species = LabelEncoder()
-le_grade = LabelEncoder()
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Target_Country', 'Species', 'Required_Quantity', 'Quality_Grade', 'Price_Offered']
 
-df['Country_enc'] = le_country.fit_transform(df['Target_Country'])
-df['Species_enc'] = le_species.fit_transform(df['Species'])
-df['Grade_enc'] = le_grade.fit_transform(df['Quality_Grade'])
 
-X = df[['Country_enc', 'Species_enc', 'Required_Quantity', 'Grade_enc']]
-y = df['Price_Offered']
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
 
-model = RandomForestRegressor(n_estimators=20, random_state=42)
-model.fit(X, y)
+    le_country = LabelEncoder()
+    le_species = LabelEncoder()
+    le_grade = LabelEncoder()
 
-joblib.dump(model, "models/buyer.pkl")
-joblib.dump(le_country, "models/le_country_buyer.pkl")
-joblib.dump(le_species, "models/le_species_buyer.pkl")
-joblib.dump(le_grade, "models/le_grade_buyer.pkl")
+    df['Country_enc'] = le_country.fit_transform(df['Target_Country'])
+    df['Species_enc'] = le_species.fit_transform(df['Species'])
+    df['Grade_enc'] = le_grade.fit_transform(df['Quality_Grade'])
 
-print("Buyer model trained and saved successfully!")
+    X = df[['Country_enc', 'Species_enc', 'Required_Quantity', 'Grade_enc']]
+    y = df['Price_Offered']
+
+    return X, y, {
+        "le_country_buyer": le_country,
+        "le_species_buyer": le_species,
+        "le_grade_buyer": le_grade,
+    }
+
+
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the buyer price model; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
+
+    model = RandomForestRegressor(n_estimators=20, random_state=42)
+    model.fit(X, y)
+
+    metrics = {"train_rows": len(X), "train_r2": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("buyer", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("buyer", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Buyer model trained and promoted as version {manifest['version']}")
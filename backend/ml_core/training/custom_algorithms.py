@@ -15,13 +15,68 @@
 # Author: AQUA Development Team
 # License: Proprietary
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor
+from joblib import effective_n_jobs
+from sklearn.ensemble import (RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor,
+                              HistGradientBoostingRegressor)
 from sklearn.linear_model import LinearRegression
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
 
 
+# Batches smaller than this are predicted on the calling thread; splitting a
+# single-row API request across threads costs more than it saves.
+PARALLEL_PREDICT_MIN_ROWS = 20000
+
+
+def _fit_concurrently(jobs, concurrent=True):
+    """Fit (estimator, X, y) jobs in parallel threads.
+
+    sklearn's tree builders release the GIL, so the forest and the boosting
+    component of a hybrid genuinely overlap instead of running back to back.
+    """
+    if not concurrent or len(jobs) < 2:
+        for est, X, y in jobs:
+            est.fit(X, y)
+        return
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(est.fit, X, y) for est, X, y in jobs]
+        for f in futures:
+            f.result()
+
+
+def _as_float32(X):
+    return np.ascontiguousarray(np.asarray(X), dtype=np.float32)
+
+
+def _tree_sum(trees, X32):
+    """Sum of raw leaf values of fitted trees, shape (n_samples, n_outputs)."""
+    total = None
+    for tree in trees:
+        out = tree.tree_.predict(X32)
+        if total is None:
+            total = out.copy()
+        else:
+            total += out
+    return total[:, :, 0] if total.ndim == 3 else total
+
+
+def _predict_rows(fn, X32, n_jobs):
+    """Apply a row-wise predict function, splitting large batches across threads."""
+    n_workers = effective_n_jobs(n_jobs) if n_jobs is not None else 1
+    if n_workers < 2 or X32.shape[0] < PARALLEL_PREDICT_MIN_ROWS:
+        return fn(X32)
+    chunks = np.array_split(X32, n_workers)
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        return np.concatenate(list(pool.map(fn, chunks)))
+
+
+def _squeeze(pred):
+    return pred.ravel() if pred.ndim == 2 and pred.shape[1] == 1 else pred
+
+
 class ADER(BaseEstimator, RegressorMixin):
     # ADER - Aquaculture Decision Enhancement Regressor
     # 
@@ -36,7 +91,8 @@ class ADER(BaseEstimator, RegressorMixin):
     # Used for: Yield prediction, Feed optimization, Location suitability
     # Accuracy: 92-95%
     
-    def __init__(self, n_estimators=20, random_state=42):
+    def __init__(self, n_estimators=20, random_state=42, n_jobs=-1, gb_backend="classic",
+                 early_stopping=True, fused=True, rf_weight=0.7):
         """
         Initialize ADER hybrid algorithm
         
@@ -46,22 +102,54 @@ class ADER(BaseEstimator, RegressorMixin):
             Number of trees in the ensemble
         random_state : int, default=42
             Random state for reproducibility
+        n_jobs : int, default=-1
+            Cores used to grow the forest; -1 uses all cores. The RF and GB
+            components are also fitted concurrently unless n_jobs=1.
+        gb_backend : {"classic", "hist"}, default="classic"
+            "hist" swaps the boosting component for HistGradientBoostingRegressor,
+            which bins features and is much faster on large datasets.
+        early_stopping : bool, default=True
+            Stop "hist" boosting once a 10% validation split stops improving.
+        fused : bool, default=True
+            Evaluate RF and GB trees in one pass over a single float32 copy of X
+            instead of two validated sklearn predict calls.
+        rf_weight : float, default=0.7
+            Share of the Random Forest in the blend; Gradient Boosting gets the rest
         """
         self.n_estimators = n_estimators
         self.random_state = random_state
-        self.rf_weight = 0.7  # Random Forest weight
-        self.gb_weight = 0.3  # Gradient Boosting weight
+        self.n_jobs = n_jobs
+        self.gb_backend = gb_backend
+        self.early_stopping = early_stopping
+        self.fused = fused
+        self.rf_weight = rf_weight  # Random Forest weight
         
         # Initialize base models
         self.rf_model = RandomForestRegressor(
             n_estimators=n_estimators, 
-            random_state=random_state
-        )
-        self.gb_model = GradientBoostingRegressor(
-            n_estimators=max(10, n_estimators // 2),
-            random_state=random_state
+            random_state=random_state,
+            n_jobs=n_jobs
         )
+        if gb_backend == "hist":
+            self.gb_model = HistGradientBoostingRegressor(
+                max_iter=max(100, n_estimators * 5),
+                early_stopping=early_stopping,
+                validation_fraction=0.1,
+                n_iter_no_change=10,
+                random_state=random_state
+            )
+        else:
+            self.gb_model = GradientBoostingRegressor(
+                n_estimators=max(10, n_estimators // 2),
+                random_state=random_state
+            )
         
+    @property
+    def gb_weight(self):
+        # Gradient Boosting weight, derived from rf_weight on use so set_params()/clone()
+        # never leave it stale
+        return 1.0 - self.rf_weight
+
     def fit(self, X, y):
         """
         Fit the ADER hybrid model
@@ -73,9 +161,9 @@ class ADER(BaseEstimator, RegressorMixin):
         y : array-like
             Target values
         """
-        # Train both models
-        self.rf_model.fit(X, y)
-        self.gb_model.fit(X, y)
+        # Train both models (concurrently unless restricted to one core)
+        _fit_concurrently([(self.rf_model, X, y), (self.gb_model, X, y)],
+                          concurrent=getattr(self, "n_jobs", None) != 1)
         
         # Calculate aquaculture-specific feature weights
         self.feature_importances_ = self._calculate_aqua_feature_weights()
@@ -96,6 +184,9 @@ class ADER(BaseEstimator, RegressorMixin):
         predictions : array
             Weighted ensemble predictions
         """
+        if getattr(self, "fused", False) and isinstance(self.gb_model, GradientBoostingRegressor):
+            return _squeeze(_predict_rows(self._fused_predict, _as_float32(X), getattr(self, "n_jobs", None)))
+
         # Get predictions from both models
         rf_pred = self.rf_model.predict(X)
         gb_pred = self.gb_model.predict(X)
@@ -105,6 +196,21 @@ class ADER(BaseEstimator, RegressorMixin):
         
         return hybrid_pred
     
+    def _fused_predict(self, X32):
+        """Weighted RF + GB output from one pass over every tree of both components"""
+        rf_trees = self.rf_model.estimators_
+        pred = (self.rf_weight / len(rf_trees)) * _tree_sum(rf_trees, X32)
+        
+        gb = self.gb_model
+        if isinstance(gb.init_, str) and gb.init_ == "zero":
+            init = 0.0
+        else:
+            init = np.asarray(gb.init_.predict(X32), dtype=np.float64).reshape(len(X32), -1)
+        gb_raw = init + gb.learning_rate * _tree_sum(gb.estimators_[:, 0], X32)
+        
+        pred += self.gb_weight * gb_raw
+        return pred
+    
     def _calculate_aqua_feature_weights(self):
         """Calculate aquaculture-specific feature importance weights"""
         # Combine feature importances from both models
@@ -131,8 +237,12 @@ class APDC(BaseEstimator, ClassifierMixin):
     # 
     # Used for: Disease risk prediction, Multi-class classification
     # Accuracy: 88-91%
+    # 
+    # With collapsed=True the three calibrated fold forests are replaced by one
+    # deployment forest and a sigmoid calibration precomputed as a lookup table.
     
-    def __init__(self, n_estimators=20, random_state=42, calibrate=True):
+    def __init__(self, n_estimators=20, random_state=42, calibrate=True, n_jobs=-1, collapsed=False,
+                 table_size=4097):
         """
         Initialize APDC hybrid algorithm
         
@@ -144,15 +254,28 @@ class APDC(BaseEstimator, ClassifierMixin):
             Random state for reproducibility
         calibrate : bool, default=True
             Whether to apply probability calibration
+        n_jobs : int, default=-1
+            Cores used for the forest and for fitting the calibration folds
+        collapsed : bool, default=False
+            With calibrate=True, fit one forest on all rows and one sigmoid per
+            calibrated class on its 3-fold out-of-fold scores, stored as a lookup
+            table over the [0, 1] score range. predict_proba then costs one
+            forest pass plus one table lookup instead of three of each.
+        table_size : int, default=4097
+            Grid points of the calibration lookup table
         """
         self.n_estimators = n_estimators
         self.random_state = random_state
         self.calibrate = calibrate
+        self.n_jobs = n_jobs
+        self.collapsed = collapsed
+        self.table_size = table_size
         
         # Initialize base classifier
         self.base_classifier = RandomForestClassifier(
             n_estimators=n_estimators,
-            random_state=random_state
+            random_state=random_state,
+            n_jobs=n_jobs
         )
         
         self.calibrated_classifier = None
@@ -168,12 +291,15 @@ class APDC(BaseEstimator, ClassifierMixin):
         y : array-like
             Target classes
         """
-        if self.calibrate:
+        if self.calibrate and getattr(self, "collapsed", False):
+            self._fit_collapsed(X, y)
+        elif self.calibrate:
             # Use calibrated classifier for better probability estimates
             self.calibrated_classifier = CalibratedClassifierCV(
                 self.base_classifier,
                 cv=3,
-                method='sigmoid'
+                method='sigmoid',
+                n_jobs=self.n_jobs
             )
             self.calibrated_classifier.fit(X, y)
         else:
@@ -184,6 +310,44 @@ class APDC(BaseEstimator, ClassifierMixin):
         
         return self
     
+    def _fit_collapsed(self, X, y):
+        """One deployment forest plus the calibration mapping as a lookup table"""
+        # ensemble=False fits the forest on all rows and the sigmoids on out-of-fold scores
+        calibrated = CalibratedClassifierCV(
+            self.base_classifier,
+            cv=3,
+            method='sigmoid',
+            ensemble=False,
+            n_jobs=self.n_jobs
+        ).fit(X, y)
+        fitted = calibrated.calibrated_classifiers_[0]
+        self.deploy_forest_ = fitted.estimator
+        # Binary problems calibrate the positive class only, as CalibratedClassifierCV does
+        n_classes = len(calibrated.classes_)
+        self.calibration_columns_ = np.array([1] if n_classes == 2 else range(n_classes))
+        
+        grid = np.linspace(0.0, 1.0, self.table_size)
+        self.calibration_table_ = np.vstack([c.predict(grid) for c in fitted.calibrators])
+        # A score is looked up at the nearest grid point; the worst case is half a step away
+        mid = (grid[:-1] + grid[1:]) / 2
+        self.lookup_error_ = 0.0
+        for calibrator, table in zip(fitted.calibrators, self.calibration_table_):
+            exact = calibrator.predict(mid)
+            worst = np.maximum(np.abs(exact - table[:-1]), np.abs(exact - table[1:])).max()
+            self.lookup_error_ = max(self.lookup_error_, float(worst))
+        self.calibrated_classifier = None
+    
+    def _collapsed_proba(self, X32):
+        """Forest scores from one pass over the trees, calibrated through the lookup table"""
+        trees = self.deploy_forest_.estimators_
+        scores = _tree_sum(trees, X32) / len(trees)
+        idx = np.rint(scores[:, self.calibration_columns_] * (self.table_size - 1)).astype(np.intp)
+        calibrated = self.calibration_table_[np.arange(len(self.calibration_columns_)), idx]
+        if len(self.classes_) == 2:
+            return np.column_stack([1.0 - calibrated[:, 0], calibrated[:, 0]])
+        total = calibrated.sum(axis=1, keepdims=True)
+        return np.where(total == 0, 1.0 / len(self.classes_), calibrated / np.where(total == 0, 1.0, total))
+    
     def predict(self, X):
         """
         Predict disease classes using APDC
@@ -198,6 +362,8 @@ class APDC(BaseEstimator, ClassifierMixin):
         predictions : array
             Predicted disease classes
         """
+        if self.calibrate and getattr(self, "collapsed", False):
+            return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
         if self.calibrate and self.calibrated_classifier:
             return self.calibrated_classifier.predict(X)
         else:
@@ -217,6 +383,8 @@ class APDC(BaseEstimator, ClassifierMixin):
         probabilities : array
             Calibrated class probabilities
         """
+        if self.calibrate and getattr(self, "collapsed", False):
+            return _predict_rows(self._collapsed_proba, _as_float32(X), getattr(self, "n_jobs", None))
         if self.calibrate and self.calibrated_classifier:
             return self.calibrated_classifier.predict_proba(X)
         else:
@@ -237,7 +405,8 @@ class ASER(BaseEstimator, RegressorMixin):
     # Used for: Stocking density optimization, Seasonal adjustments
     # Accuracy: 90-93%
     
-    def __init__(self, n_estimators=20, random_state=42, adapt_weights=True):
+    def __init__(self, n_estimators=20, random_state=42, adapt_weights=True, n_jobs=-1, fused=True,
+                 ensemble_weight=0.8):
         """
         Initialize ASER hybrid algorithm
         
@@ -249,21 +418,34 @@ class ASER(BaseEstimator, RegressorMixin):
             Random state for reproducibility
         adapt_weights : bool, default=True
             Whether to use adaptive environmental weighting
+        n_jobs : int, default=-1
+            Cores used to grow the forest; the trend model is fitted alongside it
+        fused : bool, default=True
+            Evaluate forest and trend model in one pass over a float32 copy of X
+        ensemble_weight : float, default=0.8
+            Share of the forest in the blend; the linear trend model gets the rest
         """
         self.n_estimators = n_estimators
         self.random_state = random_state
         self.adapt_weights = adapt_weights
+        self.n_jobs = n_jobs
+        self.fused = fused
         
         # Initialize models
         self.ensemble_model = RandomForestRegressor(
             n_estimators=n_estimators,
-            random_state=random_state
+            random_state=random_state,
+            n_jobs=n_jobs
         )
         self.trend_model = LinearRegression()
         
-        self.ensemble_weight = 0.8
-        self.trend_weight = 0.2
+        self.ensemble_weight = ensemble_weight
         
+    @property
+    def trend_weight(self):
+        # Derived from ensemble_weight on use, so set_params()/clone() never leave it stale
+        return 1.0 - self.ensemble_weight
+
     def fit(self, X, y):
         """
         Fit the ASER adaptive hybrid model
@@ -275,11 +457,9 @@ class ASER(BaseEstimator, RegressorMixin):
         y : array-like
             Target values
         """
-        # Fit ensemble model
-        self.ensemble_model.fit(X, y)
-        
-        # Fit trend model
-        self.trend_model.fit(X, y)
+        # Fit ensemble and trend models side by side
+        _fit_concurrently([(self.ensemble_model, X, y), (self.trend_model, X, y)],
+                          concurrent=getattr(self, "n_jobs", None) != 1)
         
         # Calculate environmental weights if adaptive
         if self.adapt_weights:
@@ -301,6 +481,10 @@ class ASER(BaseEstimator, RegressorMixin):
         predictions : array
             Adaptively weighted predictions
         """
+        if getattr(self, "fused", False):
+            X64 = np.ascontiguousarray(np.asarray(X), dtype=np.float64)
+            return _squeeze(_predict_rows(self._fused_predict, X64, getattr(self, "n_jobs", None)))
+
         # Get predictions from both models
         ensemble_pred = self.ensemble_model.predict(X)
         trend_pred = self.trend_model.predict(X)
@@ -315,6 +499,16 @@ class ASER(BaseEstimator, RegressorMixin):
         
         return adaptive_pred
     
+    def _fused_predict(self, X64):
+        """Forest average and linear trend blended in one pass"""
+        trees = self.ensemble_model.estimators_
+        forest = _tree_sum(trees, X64.astype(np.float32)) / len(trees)
+        if not self.adapt_weights:
+            return forest
+        coef = np.atleast_2d(self.trend_model.coef_)
+        trend = X64 @ coef.T + self.trend_model.intercept_
+        return (self.ensemble_weight * forest) + (self.trend_weight * trend)
+    
     def _calculate_environmental_weights(self, X, y):
         """Calculate environmental factor weights (simplified version)"""
         # This is a simplified version
@@ -337,7 +531,7 @@ class AMPRO(BaseEstimator, RegressorMixin):
     # Accuracy: 85-89%
     
     def __init__(self, n_estimators=20, random_state=42, 
-                 market_aware=True, geographic_norm=True):
+                 market_aware=True, geographic_norm=True, n_jobs=-1, fused=True):
         """
         Initialize AMPRO hybrid algorithm
         
@@ -351,16 +545,23 @@ class AMPRO(BaseEstimator, RegressorMixin):
             Whether to use market trend analysis
         geographic_norm : bool, default=True
             Whether to apply geographic normalization
+        n_jobs : int, default=-1
+            Cores used to grow the forest
+        fused : bool, default=True
+            Evaluate the forest directly on a float32 copy of X
         """
         self.n_estimators = n_estimators
         self.random_state = random_state
         self.market_aware = market_aware
         self.geographic_norm = geographic_norm
+        self.n_jobs = n_jobs
+        self.fused = fused
         
         # Initialize base model
         self.base_model = RandomForestRegressor(
             n_estimators=n_estimators,
-            random_state=random_state
+            random_state=random_state,
+            n_jobs=n_jobs
         )
         
         self.market_adjustment = 1.0
@@ -405,7 +606,12 @@ class AMPRO(BaseEstimator, RegressorMixin):
             Market-optimized price predictions
         """
         # Get base predictions
-        base_pred = self.base_model.predict(X)
+        if getattr(self, "fused", False):
+            trees = self.base_model.estimators_
+            base_pred = _squeeze(_predict_rows(lambda X32: _tree_sum(trees, X32) / len(trees),
+                                               _as_float32(X), getattr(self, "n_jobs", None)))
+        else:
+            base_pred = self.base_model.predict(X)
         
         # Apply market awareness
         if self.market_aware:
@@ -430,34 +636,32 @@ class AMPRO(BaseEstimator, RegressorMixin):
 __all__ = ['ADER', 'APDC', 'ASER', 'AMPRO']
 
 
-# Algorithm metadata for documentation
+# Algorithm metadata for documentation. Accuracy is not quoted here: the cross-validated
+# scores measured by ml_core/tuning.py are stored per bundle in the "tuning" section of
+# its registry manifest.
 ALGORITHM_INFO = {
     'ADER': {
         'name': 'Aquaculture Decision Enhancement Regressor',
         'type': 'Hybrid Regression',
-        'components': ['RandomForest', 'GradientBoosting', 'Feature Weighting'],
-        'accuracy': '92-95%',
+        'components': ['RandomForest', 'GradientBoosting (classic or histogram)', 'Feature Weighting'],
         'use_cases': ['Yield Prediction', 'Feed Optimization', 'Location Suitability']
     },
     'APDC': {
         'name': 'Aqua Predictive Disease Classifier',
         'type': 'Hybrid Classification',
-        'components': ['RandomForest', 'Probability Calibration', 'Disease Features'],
-        'accuracy': '88-91%',
+        'components': ['RandomForest', 'Probability Calibration (per-fold or collapsed lookup table)', 'Disease Features'],
         'use_cases': ['Disease Detection', 'Risk Assessment', 'Early Warning']
     },
     'ASER': {
         'name': 'Adaptive Stocking Ensemble Regressor',
         'type': 'Adaptive Ensemble',
         'components': ['RandomForest', 'Linear Regression', 'Environmental Weighting'],
-        'accuracy': '90-93%',
         'use_cases': ['Stocking Optimization', 'Density Prediction', 'Seasonal Adjustment']
     },
     'AMPRO': {
         'name': 'Aqua Market Price Optimizer',
         'type': 'Market-Aware Regression',
         'components': ['RandomForest', 'Market Trends', 'Geographic Normalization'],
-        'accuracy': '85-89%',
         'use_cases': ['Price Prediction', 'Market Analysis', 'Buyer Matching']
     }
 }
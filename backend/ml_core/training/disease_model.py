@@ -1,30 +1,48 @@
 # ml/disease_model.py
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import joblib
 import os
+from sklearn.ensemble import RandomForestClassifier
 
 # Define relative paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATASET_PATH = os.path.join(BASE_DIR, "datasets", "disease.csv")
-MODEL_PATH = os.path.join(BASE_DIR, "models", "disease.pkl")
 
-# Load dataset
-if not os.path.exists(DATASET_PATH):
-    raise FileNotFoundError(f"Dataset not found: {DATASET_PATH}")
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Water_Temp', 'pH', 'DO', 'Salinity', 'Turbidity', 'Disease_Risk']
+
+
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    if not os.path.exists(dataset_path):
+        raise FileNotFoundError(f"Dataset not found: {dataset_path}")
+
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
+
+    # Features to match generate_disease.py and app.py requirements
+    X = df[["Water_Temp", "pH", "DO", "Salinity", "Turbidity"]]
+    y = df["Disease_Risk"]
+
+    return X, y, {}
+
 
-df = pd.read_csv(DATASET_PATH)
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the disease risk classifier; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
 
-# Features to match generate_disease.py and app.py requirements
-X = df[["Water_Temp", "pH", "DO", "Salinity", "Turbidity"]]
-y = df["Disease_Risk"]
+    # Train model
+    model = RandomForestClassifier(n_estimators=20, random_state=42)
+    model.fit(X, y)
 
-# Train model
-model = RandomForestClassifier(n_estimators=20, random_state=42)
-model.fit(X, y)
+    metrics = {"train_rows": len(X), "train_accuracy": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("disease", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
 
-# Save model
-os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-joblib.dump(model, MODEL_PATH)
 
-print(f"Disease model trained and saved successfully to {MODEL_PATH}")
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("disease", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Disease model trained and promoted as version {manifest['version']}")
@@ -1,25 +1,50 @@
 # ml/feed_model.py
-import pandas as pd
+import os
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
-import joblib
 
-df = pd.read_csv("dataset/feed.csv")
+# Define relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "feed.csv")
 
-le_species = LabelEncoder()
-le_feed = LabelEncoder()
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Species', 'Age_Days', 'Water_Temp', 'DO', 'Feed_Type', 'Protein', 'Feed_Quantity']
 
-df['Species_enc'] = le_species.fit_transform(df['Species'])
-df['Feed_Type_enc'] = le_feed.fit_transform(df['Feed_Type'])
 
-X = df[['Species_enc', 'Age_Days', 'Water_Temp', 'DO', 'Feed_Type_enc', 'Protein']]
-y = df['Feed_Quantity']
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
 
-model = RandomForestRegressor(n_estimators=20, random_state=42)
-model.fit(X, y)
+    le_species = LabelEncoder()
+    le_feed = LabelEncoder()
 
-joblib.dump(model, "models/feed.pkl")
-joblib.dump(le_species, "models/le_species_feed.pkl")
-joblib.dump(le_feed, "models/le_feed.pkl")
+    df['Species_enc'] = le_species.fit_transform(df['Species'])
+    df['Feed_Type_enc'] = le_feed.fit_transform(df['Feed_Type'])
 
-print("Feed model trained and saved successfully!")
+    X = df[['Species_enc', 'Age_Days', 'Water_Temp', 'DO', 'Feed_Type_enc', 'Protein']]
+    y = df['Feed_Quantity']
+
+    return X, y, {"le_species_feed": le_species, "le_feed": le_feed}
+
+
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the feed quantity model; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
+
+    model = RandomForestRegressor(n_estimators=20, random_state=42)
+    model.fit(X, y)
+
+    metrics = {"train_rows": len(X), "train_r2": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("feed", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("feed", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Feed model trained and promoted as version {manifest['version']}")
@@ -1,24 +1,49 @@
-import pandas as pd
+import os
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
-import joblib
 
-df = pd.read_csv("dataset/seed.csv")
+# Define relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "seed.csv")
 
-le_country = LabelEncoder()
-le_species = LabelEncoder()
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Country', 'Species', 'Distance_km', 'Seed_Quality_Rating']
 
-df['Country_enc'] = le_country.fit_transform(df['Country'])
-df['Species_enc'] = le_species.fit_transform(df['Species'])
 
-X = df[['Country_enc', 'Species_enc', 'Distance_km']]
-y = df['Seed_Quality_Rating']
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
 
-model = RandomForestRegressor(n_estimators=20, random_state=42)
-model.fit(X, y)
+    le_country = LabelEncoder()
+    le_species = LabelEncoder()
 
-joblib.dump(model, "models/seed.pkl")
-joblib.dump(le_country, "models/le_country_seed.pkl")
-joblib.dump(le_species, "models/le_species_seed_chk.pkl")
+    df['Country_enc'] = le_country.fit_transform(df['Country'])
+    df['Species_enc'] = le_species.fit_transform(df['Species'])
 
-print("Seed quality model trained successfully!")
+    X = df[['Country_enc', 'Species_enc', 'Distance_km']]
+    y = df['Seed_Quality_Rating']
+
+    return X, y, {"le_country_seed": le_country, "le_species_seed_chk": le_species}
+
+
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the seed quality model; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
+
+    model = RandomForestRegressor(n_estimators=20, random_state=42)
+    model.fit(X, y)
+
+    metrics = {"train_rows": len(X), "train_r2": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("seed", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("seed", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Seed quality model trained and promoted as version {manifest['version']}")
@@ -1,30 +1,58 @@
-import pandas as pd
+import os
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
-import joblib
 
-df = pd.read_csv("dataset/stocking.csv")
+# Define relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "stocking.csv")
 
-le_species = LabelEncoder()
-le_soil = LabelEncoder()
-le_water = LabelEncoder()
-le_season = LabelEncoder()
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Species', 'Pond_Area', 'Soil_Type', 'Water_Source', 'Season', 'Recommended_Stocking', 'Survival_Rate']
 
-df['Species_enc'] = le_species.fit_transform(df['Species'])
-df['Soil_enc'] = le_soil.fit_transform(df['Soil_Type'])
-df['Water_enc'] = le_water.fit_transform(df['Water_Source'])
-df['Season_enc'] = le_season.fit_transform(df['Season'])
 
-X = df[['Species_enc', 'Pond_Area', 'Soil_enc', 'Water_enc', 'Season_enc']]
-y = df[['Recommended_Stocking', 'Survival_Rate']]
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
 
-model = RandomForestRegressor(n_estimators=20, random_state=42)
-model.fit(X, y)
+    le_species = LabelEncoder()
+    le_soil = LabelEncoder()
+    le_water = LabelEncoder()
+    le_season = LabelEncoder()
 
-joblib.dump(model, "models/stocking.pkl")
-joblib.dump(le_species, "models/le_species_stock.pkl")
-joblib.dump(le_soil, "models/le_soil.pkl")
-joblib.dump(le_water, "models/le_water_source.pkl")
-joblib.dump(le_season, "models/le_season_stock.pkl")
+    df['Species_enc'] = le_species.fit_transform(df['Species'])
+    df['Soil_enc'] = le_soil.fit_transform(df['Soil_Type'])
+    df['Water_enc'] = le_water.fit_transform(df['Water_Source'])
+    df['Season_enc'] = le_season.fit_transform(df['Season'])
 
-print("Stocking model trained successfully!")
+    X = df[['Species_enc', 'Pond_Area', 'Soil_enc', 'Water_enc', 'Season_enc']]
+    y = df[['Recommended_Stocking', 'Survival_Rate']]
+
+    return X, y, {
+        "le_species_stock": le_species,
+        "le_soil": le_soil,
+        "le_water_source": le_water,
+        "le_season_stock": le_season,
+    }
+
+
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the multi-output stocking model; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
+
+    model = RandomForestRegressor(n_estimators=20, random_state=42)
+    model.fit(X, y)
+
+    metrics = {"train_rows": len(X), "train_r2": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("stocking", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("stocking", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Stocking model trained and promoted as version {manifest['version']}")
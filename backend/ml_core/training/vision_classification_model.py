@@ -1,9 +1,9 @@
 import os
 import json
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models # type: ignore
 from tensorflow.keras.applications import MobileNetV2 # type: ignore
-from tensorflow.keras.preprocessing.image import ImageDataGenerator # type: ignore
 
 # ==============================================================================
 # AQUA Platform - Advanced Image Classification System for Aquatic Species
@@ -11,6 +11,8 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator # type: igno
 # This script builds and trains a Convolutional Neural Network (CNN) 
 # to accurately classify new, unseen images of fishes, prawns, and other life.
 # It uses Transfer Learning (MobileNetV2) which provides high recognition accuracy.
+# The frozen backbone's features come from ml_core/vision_embeddings.py, so
+# retraining after new images are labelled only trains the small dense head.
 # ==============================================================================
 
 # Configuration
@@ -18,7 +20,9 @@ DATASET_DIR = os.path.join(os.path.dirname(__file__), '../datasets/aquatic_image
 MODEL_SAVE_PATH = os.path.join(os.path.dirname(__file__), '../models/aqua_vision_model.keras')
 IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
-EPOCHS = 10
+# The head trains from cached backbone features, so epochs are cheap
+EPOCHS = 40
+PATIENCE = 5
 
 def build_model(num_classes):
     """
@@ -51,6 +55,45 @@ def build_model(num_classes):
     
     return model
 
+def build_head(num_classes, dim=1280):
+    """
+    The classification head of build_model on its own, trained from cached backbone features
+    """
+    head = models.Sequential([
+        layers.Input(shape=(dim,)),
+        layers.Dropout(0.3),
+        layers.Dense(128, activation='relu'),
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    head.compile(
+        optimizer='adam',
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return head
+
+class CachedViews(tf.keras.utils.Sequence):
+    """
+    Batches of cached features, one randomly chosen augmented view per image each epoch
+    """
+    def __init__(self, features, rows, labels, views, seed=0):
+        super().__init__()
+        from ml_core.vision_embeddings import sample_views
+        self.sample_views = sample_views
+        self.features, self.rows, self.labels, self.views = features, rows, labels, views
+        self.rng = np.random.default_rng(seed)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.rows) / BATCH_SIZE))
+
+    def __getitem__(self, i):
+        batch = self.order[i * BATCH_SIZE:(i + 1) * BATCH_SIZE]
+        return self.sample_views(self.features, self.rows[batch], self.views, self.rng), self.labels[batch]
+
+    def on_epoch_end(self):
+        self.order = self.rng.permutation(len(self.rows))
+
 def train_system():
     print("Initializing AQUA Vision Classification Training...")
     
@@ -62,62 +105,52 @@ def train_system():
         os.makedirs(os.path.join(DATASET_DIR, 'crabs'), exist_ok=True)
         return
 
-    # Data augmentation for better generalization on unseen images
-    # This prevents the model from memorizing images and improves real-world accuracy
-    train_datagen = ImageDataGenerator(
-        rescale=1./255,
-        rotation_range=30,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        shear_range=0.2,
-        zoom_range=0.2,
-        horizontal_flip=True,
-        validation_split=0.2 # 20% of data for validation
-    )
+    from ml_core.vision_embeddings import EmbeddingCache
 
-    # Load training data
-    train_generator = train_datagen.flow_from_directory(
-        DATASET_DIR,
-        target_size=IMG_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='sparse',
-        subset='training'
-    )
+    # Backbone features are computed once per image (plus fixed augmented views) and
+    # cached; only images added or changed since the last run go through MobileNetV2
+    cache = EmbeddingCache(DATASET_DIR)
+    print(f"Updating embedding cache: {cache.update()}")
+    features, rows, labels, classes, validation = cache.load()
 
-    # Load validation data
-    val_generator = train_datagen.flow_from_directory(
-        DATASET_DIR,
-        target_size=IMG_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='sparse',
-        subset='validation'
-    )
+    num_classes = len(classes)
+    print(f"Detected {num_classes} species classes: {classes}")
     
-    num_classes = len(train_generator.class_indices)
-    print(f"Detected {num_classes} species classes: {train_generator.class_indices}")
-    
-    if num_classes == 0:
+    if num_classes == 0 or len(rows) == 0:
         print("No images found. Please add images to the dataset directory.")
         return
 
-    model = build_model(num_classes)
-    model.summary()
+    head = build_head(num_classes, features.shape[-1])
+    head.summary()
 
     print("Starting training to improve recognition accuracy...")
     
+    # Validation images are scored on their unaugmented view
+    has_validation = validation.any() and (~validation).any()
+    train_rows = rows[~validation] if has_validation else rows
+    train_labels = labels[~validation] if has_validation else labels
+    validation_data = None
+    if has_validation:
+        validation_data = (np.asarray(features[rows[validation], 0], dtype=np.float32), labels[validation])
+
     # Add early stopping to get the best model
     early_stopping = tf.keras.callbacks.EarlyStopping(
-        monitor='val_accuracy', 
-        patience=3, 
+        monitor='val_accuracy' if has_validation else 'accuracy',
+        patience=PATIENCE,
         restore_best_weights=True
     )
     
-    history = model.fit(
-        train_generator,
+    history = head.fit(
+        CachedViews(features, train_rows, train_labels, features.shape[1]),
         epochs=EPOCHS,
-        validation_data=val_generator,
+        validation_data=validation_data,
         callbacks=[early_stopping]
     )
+
+    # Put the trained head on the backbone so serving still loads one model
+    model = build_model(num_classes)
+    for layer, trained in zip(model.layers[-2:], head.layers[-2:]):
+        layer.set_weights(trained.get_weights())
     
     # Save the highly accurate model
     os.makedirs(os.path.dirname(MODEL_SAVE_PATH), exist_ok=True)
@@ -127,11 +160,13 @@ def train_system():
     # Save class indices mapping for predictions
     class_indices_path = os.path.join(os.path.dirname(MODEL_SAVE_PATH), 'vision_classes.json')
     with open(class_indices_path, 'w') as f:
-        # Swap keys and values for easier prediction lookup
-        index_to_class = {v: k for k, v in train_generator.class_indices.items()}
+        # Index -> class name, the order the cache (and flow_from_directory) assigns
+        index_to_class = {i: name for i, name in enumerate(classes)}
         json.dump(index_to_class, f)
         
     print("Training complete! The system is now ready to classify unseen fishes and prawns.")
 
 if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
     train_system()
@@ -1,21 +1,47 @@
 # ml/yield_model.py
-import pandas as pd
+import os
 from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestRegressor
-import joblib
 
-df = pd.read_csv("dataset/yield.csv")
+# Define relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, "datasets", "yield.csv")
 
-le_species = LabelEncoder()
-df['Species_enc'] = le_species.fit_transform(df['Species'])
+# Only these columns are loaded from the columnar dataset cache
+COLUMNS = ['Species', 'Pond_Area', 'Feed_Used', 'Culture_Days', 'Expected_Yield']
 
-X = df[['Species_enc', 'Pond_Area', 'Feed_Used', 'Culture_Days']]
-y = df['Expected_Yield']
 
-model = RandomForestRegressor(n_estimators=20, random_state=42)
-model.fit(X, y)
+def prepare(dataset_path=DATASET_PATH):
+    """Load and encode the dataset; returns (X, y, encoders keyed as in the registry bundle)."""
+    from ml_core.dataset_cache import read_dataset
+    df = read_dataset(dataset_path, COLUMNS)
 
-joblib.dump(model, "models/yield.pkl")
-joblib.dump(le_species, "models/le_species_yield.pkl")
+    le_species = LabelEncoder()
+    df['Species_enc'] = le_species.fit_transform(df['Species'])
 
-print("Yield model trained and saved successfully!")
+    X = df[['Species_enc', 'Pond_Area', 'Feed_Used', 'Culture_Days']]
+    y = df['Expected_Yield']
+
+    return X, y, {"le_species_yield": le_species}
+
+
+def train(dataset_path=DATASET_PATH, compaction=None):
+    """Fit the yield model; returns (registry artifacts, metrics)."""
+    from ml_core.compaction import compact_bundle_model
+    X, y, encoders = prepare(dataset_path)
+
+    model = RandomForestRegressor(n_estimators=20, random_state=42)
+    model.fit(X, y)
+
+    metrics = {"train_rows": len(X), "train_r2": round(model.score(X, y), 4)}
+    model, metrics["compaction"] = compact_bundle_model("yield", model, X, y, compaction)
+    return dict(encoders, model=model), metrics
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(BASE_DIR))
+    from ml_core.registry import REGISTRY
+    artifacts, metrics = train()
+    manifest = REGISTRY.publish("yield", artifacts, metrics=metrics, dataset_path=DATASET_PATH, promote=True)
+    print(f"Yield model trained and promoted as version {manifest['version']}")
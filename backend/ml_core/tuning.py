@@ -0,0 +1,309 @@
+# AQUA Hyperparameter Tuning Harness
+# ==================================
+#
+# Cross-validated grid searches over the custom hybrid algorithms (ADER, APDC,
+# ASER, AMPRO), one search per algorithm/bundle pair in SEARCHES. Every
+# (config, fold) fit runs as its own task in a process pool, and its scores are
+# cached on disk under a key made of the dataset sha256, the code sha256 (the
+# algorithms, the bundle trainer whose prepare() encodes the features, and the
+# dataset loader), the params and the fold split, so a rerun only fits what
+# changed:
+#
+#   models/registry/tuning_cache/<key>.json    scores of one fitted fold
+#   models/registry/tuning_report.json         last search, all configs
+#
+# The report ranks every config by its cross-validated metrics. The best
+# config and its measured cross-validated mean / std are also written into the
+# "tuning" section of the bundle's current registry manifest, keyed by
+# algorithm, so the registry records which hybrid settings were evaluated on
+# the data that version was trained on (bundles without a registry version are
+# skipped).
+#
+#   python -m ml_core.tuning                        # from backend/
+#   python -m ml_core.tuning --only ADER/yield --folds 5 --jobs 4
+#   python -m ml_core.tuning --no-write              # search without touching manifests
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import functools
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from ml_core.registry import REGISTRY_DIR, BUNDLE_DATASETS, LEGACY_VERSION, ModelRegistry, RegistryError  # noqa: E402
+from ml_core.build_models import TRAINERS, cached_sha256, trainer_path  # noqa: E402
+
+CACHE_DIR = os.path.join(REGISTRY_DIR, "tuning_cache")
+HASH_CACHE_FILE = os.path.join(CACHE_DIR, "hash_cache.json")
+REPORT_FILE = os.path.join(REGISTRY_DIR, "tuning_report.json")
+ALGORITHMS_PATH = os.path.join(BACKEND_DIR, "ml_core", "training", "custom_algorithms.py")
+DATASET_LOADER_PATH = os.path.join(BACKEND_DIR, "ml_core", "dataset_cache.py")
+
+DEFAULT_FOLDS = 3
+SEED = 42
+
+# Search name -> algorithm, bundle whose dataset/encoding it is evaluated on, and the grid.
+# Params not in the grid keep the algorithm defaults; n_jobs is pinned to 1 because the
+# process pool already uses every core.
+SEARCHES = {
+    "ADER/yield": {"algorithm": "ADER", "bundle": "yield",
+                   "grid": {"n_estimators": [20, 50], "rf_weight": [0.5, 0.7, 0.9]}},
+    "ADER/feed": {"algorithm": "ADER", "bundle": "feed",
+                  "grid": {"n_estimators": [20, 50], "rf_weight": [0.5, 0.7, 0.9]}},
+    "ADER/location": {"algorithm": "ADER", "bundle": "location",
+                      "grid": {"n_estimators": [20, 50], "rf_weight": [0.5, 0.7, 0.9]}},
+    "APDC/disease": {"algorithm": "APDC", "bundle": "disease",
+                     "grid": {"n_estimators": [20, 50], "collapsed": [False, True]}},
+    "ASER/stocking": {"algorithm": "ASER", "bundle": "stocking",
+                      "grid": {"n_estimators": [20, 50], "ensemble_weight": [0.6, 0.8, 1.0]}},
+    "AMPRO/buyer": {"algorithm": "AMPRO", "bundle": "buyer",
+                    "grid": {"n_estimators": [20, 50, 100]}},
+}
+
+FIXED_PARAMS = {"n_jobs": 1}
+
+
+def grid_configs(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def task_key(dataset_sha, code_sha, algorithm, params, fold, folds):
+    payload = json.dumps({"dataset": dataset_sha, "code": code_sha, "algorithm": algorithm,
+                          "params": params, "fold": fold, "folds": folds, "seed": SEED}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _read_cached(key):
+    path = _cache_path(key)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def _write_cached(key, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = _cache_path(key) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, _cache_path(key))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_bundle_data(bundle):
+    """(X, y) as the bundle's trainer encodes them; cached per worker process."""
+    X, y, _ = importlib.import_module(TRAINERS[bundle]).prepare(BUNDLE_DATASETS[bundle])
+    return np.asarray(X, dtype=np.float64), np.asarray(y)
+
+
+def fold_indices(y, folds, classifier):
+    from sklearn.model_selection import KFold, StratifiedKFold
+    splitter = (StratifiedKFold if classifier else KFold)(n_splits=folds, shuffle=True, random_state=SEED)
+    return list(splitter.split(np.zeros(len(y)), y if classifier else None))
+
+
+def _scores(model, X, y, classifier):
+    if classifier:
+        proba = model.predict_proba(X)
+        onehot = (y[:, None] == model.classes_[None, :]).astype(np.float64)
+        return {
+            "accuracy": float(np.mean(model.classes_[proba.argmax(axis=1)] == y)),
+            "brier": float(np.mean(np.sum((proba - onehot) ** 2, axis=1))),
+        }
+    pred = np.asarray(model.predict(X), dtype=np.float64).reshape(np.shape(y))
+    y = np.asarray(y, dtype=np.float64)
+    ss_res = ((y - pred) ** 2).sum(axis=0)
+    ss_tot = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    return {
+        "r2": float(np.mean(1 - ss_res / np.where(ss_tot == 0, 1, ss_tot))),
+        "mae": float(np.mean(np.abs(y - pred))),
+    }
+
+
+def _run_fold(algorithm, bundle, params, fold, folds):
+    """Executed in a worker process: fit one config on one training fold and score it."""
+    from ml_core.training import custom_algorithms
+    X, y = _load_bundle_data(bundle)
+    cls = getattr(custom_algorithms, algorithm)
+    classifier = algorithm == "APDC"
+    train_idx, test_idx = fold_indices(y, folds, classifier)[fold]
+    model = cls(**params, **FIXED_PARAMS)
+    started = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_s = time.perf_counter() - started
+    started = time.perf_counter()
+    result = _scores(model, X[test_idx], y[test_idx], classifier)
+    result.update(fit_seconds=round(fit_s, 3), score_seconds=round(time.perf_counter() - started, 3),
+                  train_rows=int(len(train_idx)), test_rows=int(len(test_idx)))
+    return result
+
+
+def summarize(configs, fold_results, metric, higher_is_better=True):
+    """Mean/std of every metric per config, best config first."""
+    rows = []
+    for i, params in enumerate(configs):
+        folds = fold_results[i]
+        row = {"params": params}
+        for name in folds[0]:
+            values = np.array([f[name] for f in folds], dtype=np.float64)
+            row[name] = round(float(values.mean()), 6)
+            if name == metric:
+                row[f"{name}_std"] = round(float(values.std()), 6)
+        rows.append(row)
+    rows.sort(key=lambda r: r[metric], reverse=higher_is_better)
+    return rows
+
+
+def search(names=None, folds=DEFAULT_FOLDS, jobs=None, use_cache=True):
+    names = names or list(SEARCHES)
+    hash_cache = {}
+    if os.path.exists(HASH_CACHE_FILE):
+        with open(HASH_CACHE_FILE) as f:
+            hash_cache = json.load(f)
+
+    plans, todo = {}, {}
+    for name in names:
+        spec = SEARCHES[name]
+        dataset_sha = cached_sha256(BUNDLE_DATASETS[spec["bundle"]], hash_cache)
+        # A change to the features prepare() builds must not reuse old folds
+        code_sha = "".join(cached_sha256(p, hash_cache)[:16]
+                           for p in (ALGORITHMS_PATH, trainer_path(spec["bundle"]), DATASET_LOADER_PATH))
+        configs = grid_configs(spec["grid"])
+        results = [[None] * folds for _ in configs]
+        for i, params in enumerate(configs):
+            for fold in range(folds):
+                key = task_key(dataset_sha, code_sha, spec["algorithm"], params, fold, folds)
+                cached = _read_cached(key) if use_cache else None
+                if cached is not None:
+                    results[i][fold] = cached
+                else:
+                    todo[key] = (name, i, fold, params)
+        plans[name] = {"dataset_sha256": dataset_sha, "code_sha256": code_sha, "configs": configs,
+                       "results": results}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(HASH_CACHE_FILE, "w") as f:
+        json.dump(hash_cache, f, indent=4)
+
+    failures = {}
+    if todo:
+        workers = jobs or min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_run_fold, SEARCHES[name]["algorithm"], SEARCHES[name]["bundle"], params, fold, folds): key
+                for key, (name, i, fold, params) in todo.items()
+            }
+            for fut in as_completed(futures):
+                key = futures[fut]
+                name, i, fold, params = todo[key]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    failures.setdefault(name, []).append(f"{params} fold {fold}: {type(e).__name__}: {e}")
+                    continue
+                _write_cached(key, result)
+                plans[name]["results"][i][fold] = result
+
+    report = {}
+    for name, plan in plans.items():
+        spec = SEARCHES[name]
+        metric = "accuracy" if spec["algorithm"] == "APDC" else "r2"
+        complete = [i for i, r in enumerate(plan["results"]) if all(f is not None for f in r)]
+        ranked = summarize([plan["configs"][i] for i in complete], [plan["results"][i] for i in complete], metric)
+        report[name] = {
+            "algorithm": spec["algorithm"],
+            "bundle": spec["bundle"],
+            "metric": metric,
+            "folds": folds,
+            "dataset_sha256": plan["dataset_sha256"],
+            "code_sha256": plan["code_sha256"],
+            "configs_evaluated": len(ranked),
+            "best": ranked[0] if ranked else None,
+            "ranking": ranked,
+            "errors": failures.get(name, []),
+        }
+    report_meta = {"fits_run": len(todo), "fits_cached": sum(len(p["configs"]) * folds for p in plans.values()) - len(todo)}
+    return report, report_meta
+
+
+def write_back(report, registry=None):
+    """Store each search's best config and metrics in its bundle's current manifest.
+    Returns {search name: version updated, or the reason it was not}."""
+    registry = registry or ModelRegistry()
+    out = {}
+    for name, r in report.items():
+        if not r["best"]:
+            out[name] = "no complete config"
+            continue
+        version = registry.current_version(r["bundle"])
+        if version == LEGACY_VERSION:
+            out[name] = "bundle has no registry version (legacy)"
+            continue
+        best = r["best"]
+        entry = {
+            "search": name,
+            "best_params": best["params"],
+            "metric": r["metric"],
+            "cv_mean": best[r["metric"]],
+            "cv_std": best[f"{r['metric']}_std"],
+            "cv_metrics": {k: v for k, v in best.items() if k != "params" and not k.endswith(("_std", "_rows"))},
+            "folds": r["folds"],
+            "configs_evaluated": r["configs_evaluated"],
+            "dataset_sha256": r["dataset_sha256"],
+            "code_sha256": r["code_sha256"],
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        try:
+            registry.update_manifest(r["bundle"], version, tuning={r["algorithm"]: entry})
+        except RegistryError as e:
+            out[name] = str(e)
+            continue
+        out[name] = version
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated search over the AQUA custom algorithms.")
+    parser.add_argument("--only", nargs="*", choices=list(SEARCHES), help="Searches to run (default: all)")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Refit every fold even if a cached result exists")
+    parser.add_argument("--no-write", action="store_true", help="Do not update the registry manifests")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    report, meta = search(args.only, folds=args.folds, jobs=args.jobs, use_cache=not args.no_cache)
+    written = {} if args.no_write else write_back(report)
+    for name, r in report.items():
+        best = r["best"]
+        summary = (f"{r['metric']}={best[r['metric']]:.4f}±{best[r['metric'] + '_std']:.4f} {best['params']}"
+                   if best else "no result")
+        print(f"{name:15s} {summary}  -> {written.get(name, 'not written')}")
+        for err in r["errors"]:
+            print(f"⚠️  [ML WARNING] {name}: {err}")
+
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    tmp = REPORT_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(meta, searches=report, written=written), f, indent=4)
+    os.replace(tmp, REPORT_FILE)
+    print(f"--- {meta['fits_run']} folds fitted, {meta['fits_cached']} from cache, {time.time() - started:.1f}s ---")
+    return 1 if any(r["errors"] for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# AQUA Vision Embedding Cache
+# ===========================
+#
+# The species classifier is a frozen MobileNetV2 with a small dense head
+# (training/vision_classification_model.py). Training used to push every
+# augmented image through the backbone again on every epoch, although the
+# backbone never changes. Its pooled features are now computed once per image
+# and kept on disk, and the head is trained from them:
+#
+#   datasets/.cache/aquatic_images/meta.json      backbone, views, classes, one
+#                                                 entry per image (path, class,
+#                                                 size, mtime, row)
+#   datasets/.cache/aquatic_images/features.npy   float16 [rows, views, 1280],
+#                                                 loaded memory mapped
+#
+# View 0 is the image itself; views 1..AQUA_VISION_AUG_VIEWS are fixed random
+# augmentations drawn with the ImageDataGenerator settings training always
+# used, seeded per image and view so a rebuild reproduces them. Each epoch the
+# trainer picks one view per image, which stands in for on-the-fly augmentation.
+#
+# update() embeds only images that are new or changed (size / mtime) since the
+# last run: rows of unchanged images are copied from the previous file, removed
+# images are dropped. Adding a few labelled images therefore costs a few
+# backbone passes, not a full run. The new cache is built in a staging
+# directory and renamed into place; the old one is renamed aside first and
+# deleted only after that, so a failed update leaves the old cache intact.
+#
+#   python -m ml_core.vision_embeddings          # from backend/: update, print stats
+
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+from ml_core.vision_service import IMG_SIZE, TF_THREADS
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(ML_DIR, "datasets", "aquatic_images")
+CACHE_DIR = os.path.join(ML_DIR, "datasets", ".cache", "aquatic_images")
+FORMAT_VERSION = 1
+
+AUG_VIEWS = int(os.getenv("AQUA_VISION_AUG_VIEWS", "8"))
+# Images x views per backbone forward pass
+EMBED_BATCH = int(os.getenv("AQUA_VISION_EMBED_BATCH", "32"))
+# Rows copied per chunk when carrying unchanged images over to a new cache
+COPY_ROWS = 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+# Share of images held out for validation, chosen by path hash so adding
+# images never moves existing ones between the splits
+VALIDATION_SPLIT = 0.2
+
+# The augmentation ImageDataGenerator applied during training (rescale is done
+# in KerasBackbone.views)
+AUGMENTATION = dict(
+    rotation_range=30,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    shear_range=0.2,
+    zoom_range=0.2,
+    horizontal_flip=True,
+)
+
+_build_lock = threading.Lock()
+
+
+def _seed(path, view):
+    return zlib.crc32(f"{path}:{view}".encode())
+
+
+def is_validation(path):
+    return _seed(path, "split") % 100 < VALIDATION_SPLIT * 100
+
+
+class KerasBackbone:
+    """Frozen ImageNet MobileNetV2 with global average pooling (the model's first
+    two layers), loaded on first use."""
+
+    name = "mobilenet_v2_imagenet_avg"
+    dim = 1280
+
+    def __init__(self, threads=TF_THREADS):
+        self.threads = threads
+        self._model = None
+        self._augment = None
+
+    def _load(self):
+        import tensorflow as tf
+        from tensorflow.keras.applications import MobileNetV2  # type: ignore
+        from tensorflow.keras.preprocessing.image import ImageDataGenerator  # type: ignore
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(self.threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError:
+            pass  # TensorFlow already initialised in this process
+        self._model = MobileNetV2(input_shape=IMG_SIZE + (3,), include_top=False,
+                                  weights="imagenet", pooling="avg")
+        self._augment = ImageDataGenerator(**AUGMENTATION)
+
+    def views(self, path, rel_path, count):
+        """``count`` views of the image as float32 [count, h, w, 3] in [0, 1]."""
+        from tensorflow.keras.utils import load_img, img_to_array  # type: ignore
+        if self._model is None:
+            self._load()
+        pixels = img_to_array(load_img(path, target_size=IMG_SIZE))
+        out = np.empty((count,) + pixels.shape, dtype=np.float32)
+        out[0] = pixels
+        for v in range(1, count):
+            out[v] = self._augment.random_transform(pixels, seed=_seed(rel_path, v))
+        out /= 255.0
+        return out
+
+    def __call__(self, batch):
+        if self._model is None:
+            self._load()
+        return np.asarray(self._model.predict_on_batch(batch))
+
+
+def scan(dataset_dir=DATASET_DIR):
+    """Class names (sorted, as flow_from_directory orders them) and one entry per image."""
+    classes = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    entries = []
+    for label in classes:
+        for root, _, files in os.walk(os.path.join(dataset_dir, label)):
+            for fname in sorted(files):
+                if not fname.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                full = os.path.join(root, fname)
+                st = os.stat(full)
+                entries.append({"path": os.path.relpath(full, dataset_dir).replace(os.sep, "/"),
+                                "label": label, "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+    entries.sort(key=lambda e: e["path"])
+    return classes, entries
+
+
+class EmbeddingCache:
+    def __init__(self, dataset_dir=DATASET_DIR, cache_dir=CACHE_DIR, views=AUG_VIEWS, backbone=None):
+        self.dataset_dir = dataset_dir
+        self.cache_dir = cache_dir
+        self.views = views + 1      # the original plus the augmentations
+        self.backbone = backbone or KerasBackbone()
+
+    def meta(self):
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta.get("format") != FORMAT_VERSION or meta.get("backbone") != self.backbone.name
+                or meta.get("views") != self.views):
+            return None
+        return meta
+
+    def update(self):
+        """Bring the cache in line with the dataset directory, embedding only new or
+        changed images. Returns counts of embedded / reused / removed images."""
+        with _build_lock:
+            return self._update()
+
+    def _update(self):
+        started = time.perf_counter()
+        classes, entries = scan(self.dataset_dir)
+        old = self.meta()
+        old_rows = {}
+        if old:
+            old_rows = {(e["path"], e["label"], e["size"], e["mtime_ns"]): e["row"] for e in old["images"]}
+        reuse = [(i, old_rows[(e["path"], e["label"], e["size"], e["mtime_ns"])])
+                 for i, e in enumerate(entries) if (e["path"], e["label"], e["size"], e["mtime_ns"]) in old_rows]
+        todo = sorted(set(range(len(entries))) - {i for i, _ in reuse})
+        stats = {"images": len(entries), "embedded": len(todo), "reused": len(reuse),
+                 "removed": len(old["images"]) - len(reuse) if old else 0, "failed": 0}
+        if old and not todo and not stats["removed"] and old["classes"] == classes:
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            return stats
+
+        parent = os.path.dirname(self.cache_dir)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+        try:
+            features = np.lib.format.open_memmap(os.path.join(staging, "features.npy"), mode="w+",
+                                                 dtype=np.float16, shape=(len(entries), self.views, self.backbone.dim))
+            if reuse:
+                previous = np.load(os.path.join(self.cache_dir, "features.npy"), mmap_mode="r")
+                for start in range(0, len(reuse), COPY_ROWS):
+                    dst, src = zip(*reuse[start:start + COPY_ROWS])
+                    features[list(dst)] = previous[list(src)]
+                del previous
+
+            failed = set()
+            group = max(1, EMBED_BATCH // self.views)
+            for start in range(0, len(todo), group):
+                rows, batch = [], []
+                for i in todo[start:start + group]:
+                    try:
+                        batch.append(self.backbone.views(os.path.join(self.dataset_dir, entries[i]["path"]),
+                                                         entries[i]["path"], self.views))
+                        rows.append(i)
+                    except Exception as e:
+                        print(f"⚠️  [ML WARNING] Skipping {entries[i]['path']}: {e}")
+                        failed.add(i)
+                if rows:
+                    out = self.backbone(np.concatenate(batch))
+                    features[rows] = out.reshape(len(rows), self.views, -1).astype(np.float16)
+            features.flush()
+            del features
+
+            images = [dict(e, row=i) for i, e in enumerate(entries) if i not in failed]
+            stats["failed"] = len(failed)
+            meta = {"format": FORMAT_VERSION, "backbone": self.backbone.name, "dim": self.backbone.dim,
+                    "views": self.views, "img_size": list(IMG_SIZE), "classes": classes, "images": images}
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            self._swap(staging)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def _swap(self, staging):
+        """Put the staged cache in place. The old one is renamed aside first and only
+        deleted once the new one is in, so a failure leaves a complete cache behind."""
+        if not os.path.exists(self.cache_dir):
+            os.replace(staging, self.cache_dir)
+            return
+        retired = staging + ".old"
+        os.replace(self.cache_dir, retired)
+        try:
+            os.replace(staging, self.cache_dir)
+        except Exception:
+            os.replace(retired, self.cache_dir)
+            raise
+        shutil.rmtree(retired, ignore_errors=True)
+
+    def load(self):
+        """(features, rows, labels, classes, validation): the memory-mapped feature array,
+        each image's row in it, its class index, the class names and a validation mask."""
+        meta = self.meta()
+        if meta is None:
+            raise FileNotFoundError(f"No embedding cache in {self.cache_dir}; run update() first")
+        features = np.load(os.path.join(self.cache_dir, "features.npy"), mmap_mode="r")
+        index = {c: i for i, c in enumerate(meta["classes"])}
+        rows = np.array([e["row"] for e in meta["images"]], dtype=np.int64)
+        labels = np.array([index[e["label"]] for e in meta["images"]], dtype=np.int64)
+        validation = np.array([is_validation(e["path"]) for e in meta["images"]], dtype=bool)
+        return features, rows, labels, meta["classes"], validation
+
+
+def sample_views(features, rows, views, rng):
+    """One randomly chosen view per row, as a float32 [len(rows), dim] array."""
+    return np.asarray(features[rows, rng.integers(0, views, size=len(rows))], dtype=np.float32)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or refresh the vision embedding cache.")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--views", type=int, default=AUG_VIEWS, help="Augmented views per image")
+    args = parser.parse_args(argv)
+
+    cache = EmbeddingCache(args.dataset, views=args.views)
+    stats = cache.update()
+    print(f"✅ Embedding cache {cache.cache_dir}: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
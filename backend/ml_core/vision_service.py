@@ -0,0 +1,346 @@
+# AQUA Vision Inference Service
+# =============================
+#
+# Serves the Keras species classifier trained by
+# training/vision_classification_model.py from inside the web worker, instead
+# of one CLI run of training/vision_predict.py per image:
+#
+#   - the model and vision_classes.json are loaded once per worker process, on
+#     first use (or VISION.load() at start-up); a missing model just makes
+#     VISION.available() false so callers fall back to Gemini / keywords
+#   - TensorFlow is held to AQUA_VISION_THREADS intra-op threads and one
+#     inter-op thread so it does not fight the request threads for the CPU
+#   - request threads decode the image and queue it; one batching thread takes
+#     up to AQUA_VISION_BATCH queued images (waiting at most
+#     AQUA_VISION_BATCH_WAIT_MS for the batch to fill), resizes each straight
+#     into its slot of a preallocated input array and runs a single forward pass
+#   - preprocessing is plain NumPy: nearest-neighbour resize to IMG_SIZE (what
+#     keras' load_img(target_size=...) does) and the same 1/255 rescale as
+#     training
+#   - read_image() takes an upload stream into a bounded buffer, checking the
+#     byte limit per chunk and the width/height from the file header as soon as
+#     it has arrived, so oversized images are refused before they are read in
+#     full or decoded (PNG, JPEG, GIF, BMP and WEBP headers are parsed; HEIC,
+#     AVIF and TIFF are recognised by their magic bytes and keep only the byte
+#     limit; anything else is refused)
+#
+#   python -m ml_core.vision_service shrimp.jpg tilapia.png     # from backend/
+
+import os
+import sys
+import json
+import time
+import queue
+import struct
+import argparse
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.getenv("AQUA_VISION_MODEL", os.path.join(ML_DIR, "models", "aqua_vision_model.keras"))
+CLASSES_PATH = os.getenv("AQUA_VISION_CLASSES", os.path.join(ML_DIR, "models", "vision_classes.json"))
+IMG_SIZE = (224, 224)
+
+BATCH_SIZE = int(os.getenv("AQUA_VISION_BATCH", "8"))
+BATCH_WAIT = float(os.getenv("AQUA_VISION_BATCH_WAIT_MS", "10")) / 1000
+TF_THREADS = int(os.getenv("AQUA_VISION_THREADS", "2"))
+# Seconds a request waits for its batch before giving up on the model
+REQUEST_TIMEOUT = float(os.getenv("AQUA_VISION_TIMEOUT", "5"))
+# Below this the result is reported as low confidence (as in vision_predict.py)
+HIGH_CONFIDENCE = 0.8
+
+# Upload limits: encoded size, longest side and decoded pixel count
+MAX_UPLOAD_BYTES = int(float(os.getenv("AQUA_VISION_MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+MAX_SIDE = int(os.getenv("AQUA_VISION_MAX_SIDE", "8192"))
+MAX_PIXELS = int(os.getenv("AQUA_VISION_MAX_PIXELS", "40000000"))
+UPLOAD_CHUNK = 64 * 1024
+# JPEG start-of-frame markers (the ones carrying the image size)
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class ImageRejected(ValueError):
+    """An upload that is not a supported image or is outside the limits."""
+
+
+class ImageTooLarge(ImageRejected):
+    pass
+
+
+# image_dimensions() result for image formats recognised by their magic bytes but without
+# a header parser here: they skip the pixel check and go to the decoder / Gemini as uploaded
+UNKNOWN_SIZE = "unknown"
+# ISO-BMFF "ftyp" brands of HEIF / AVIF photos (what phones upload)
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif", b"avis"}
+TIFF_MAGIC = (b"II*\x00", b"MM\x00*")
+
+
+def _webp_dimensions(head):
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    raise ImageRejected("corrupt WEBP header")
+
+
+def image_dimensions(head):
+    """(width, height) from the start of a PNG, JPEG, GIF, BMP or WEBP file; None while
+    more bytes are needed; UNKNOWN_SIZE for HEIC / AVIF / TIFF. Raises ImageRejected for
+    a corrupt header or anything else."""
+    if head[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", head[16:24]) if len(head) >= 24 else None
+    if head[:4] == b"GIF8":
+        return struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _webp_dimensions(head)
+    if head[:2] == b"BM":
+        if len(head) < 26:
+            return None
+        width, height = struct.unpack("<ii", head[18:26])
+        return abs(width), abs(height)
+    if head[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 <= len(head):
+            if head[i] != 0xFF:
+                raise ImageRejected("corrupt JPEG header")
+            marker = head[i + 1]
+            if marker == 0xFF:      # fill byte
+                i += 1
+            elif marker in JPEG_SOF:
+                height, width = struct.unpack(">HH", head[i + 5:i + 9])
+                return width, height
+            elif marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 2
+            else:
+                i += 2 + struct.unpack(">H", head[i + 2:i + 4])[0]
+        return None
+    if head[:4] in TIFF_MAGIC:
+        return UNKNOWN_SIZE
+    if len(head) < 12:
+        return None
+    if head[4:8] == b"ftyp" and bytes(head[8:12]) in HEIF_BRANDS:
+        return UNKNOWN_SIZE
+    raise ImageRejected("unsupported image format (PNG, JPEG, GIF, BMP, WEBP, HEIC, AVIF or TIFF expected)")
+
+
+def check_dimensions(width, height):
+    if max(width, height) > MAX_SIDE or width * height > MAX_PIXELS:
+        raise ImageTooLarge(f"image is {width}x{height}; limit {MAX_SIDE}px per side, {MAX_PIXELS} pixels")
+    if not width or not height:
+        raise ImageRejected("image has no pixels")
+
+
+def read_image(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Read an encoded image from a file-like stream in UPLOAD_CHUNK pieces; returns
+    (bytes, (width, height)), or (bytes, None) for HEIC / AVIF / TIFF, whose headers
+    are not parsed.
+    Stops with ImageTooLarge as soon as the stream passes ``max_bytes`` or its header
+    shows too many pixels."""
+    buf = bytearray()
+    size = None
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ImageTooLarge(f"upload exceeds {max_bytes} bytes")
+        if size is None:
+            size = image_dimensions(buf)
+            if size is not None and size != UNKNOWN_SIZE:
+                check_dimensions(*size)
+    if size is None:
+        raise ImageRejected("truncated image")
+    return bytes(buf), (None if size == UNKNOWN_SIZE else size)
+
+
+def decode_image(data):
+    """Encoded image bytes (JPEG/PNG/GIF/BMP, WEBP where TensorFlow supports it) -> uint8 HxWx3 array."""
+    import tensorflow as tf
+    return tf.io.decode_image(data, channels=3, expand_animations=False).numpy()
+
+
+def _nearest_index(src, dst):
+    # Source pixel sampled for each destination pixel (pixel-centre nearest neighbour)
+    return np.minimum(((np.arange(dst) + 0.5) * (src / dst)).astype(np.intp), src - 1)
+
+
+def preprocess(pixels, out=None):
+    """Resize uint8 pixels (HxW, HxWx1/3/4) to IMG_SIZE and rescale to [0, 1] float32,
+    writing into ``out`` (an IMG_SIZE + (3,) float32 view) when given."""
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    if pixels.shape[2] == 1:
+        pixels = np.repeat(pixels, 3, axis=2)
+    elif pixels.shape[2] == 4:
+        pixels = pixels[:, :, :3]
+    rows = _nearest_index(pixels.shape[0], IMG_SIZE[0])
+    cols = _nearest_index(pixels.shape[1], IMG_SIZE[1])
+    if out is None:
+        out = np.empty(IMG_SIZE + (3,), dtype=np.float32)
+    np.divide(pixels[rows[:, None], cols], np.float32(255), out=out)
+    return out
+
+
+def load_keras(model_path, classes_path, threads):
+    """(predict_fn, class_mapping) for the trained classifier."""
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # The TF runtime was already initialised in this process; keep its pools
+        pass
+    model = tf.keras.models.load_model(model_path, compile=False)
+    with open(classes_path) as f:
+        class_mapping = json.load(f)
+    return model.predict_on_batch, class_mapping
+
+
+class VisionService:
+    def __init__(self, model_path=MODEL_PATH, classes_path=CLASSES_PATH, batch_size=BATCH_SIZE,
+                 batch_wait=BATCH_WAIT, threads=TF_THREADS, loader=load_keras):
+        self.model_path = model_path
+        self.classes_path = classes_path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.threads = threads
+        self.loader = loader
+        self._predict = None
+        self.class_mapping = {}
+        self._failed_mtime = False   # model file mtime at the last failed load (None: missing)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self.stats = {"images": 0, "batches": 0, "max_batch": 0, "errors": 0}
+
+    def _model_mtime(self):
+        try:
+            return os.path.getmtime(self.model_path)
+        except OSError:
+            return None
+
+    def load(self):
+        """Load the model once; False (and no retry until the model file changes) if it can't be."""
+        if self._predict is not None:
+            return True
+        with self._lock:
+            if self._predict is not None:
+                return True
+            mtime = self._model_mtime()
+            if mtime == self._failed_mtime:
+                return False
+            try:
+                if mtime is None:
+                    raise FileNotFoundError(f"{self.model_path} not found (run training/vision_classification_model.py)")
+                predict, self.class_mapping = self.loader(self.model_path, self.classes_path, self.threads)
+            except Exception as e:
+                self._failed_mtime = mtime
+                print(f"⚠️  [ML WARNING] Vision model unavailable: {e}")
+                return False
+            # Input array the batching thread resizes images into
+            self._batch = np.empty((self.batch_size,) + IMG_SIZE + (3,), dtype=np.float32)
+            threading.Thread(target=self._run, name="aqua-vision", daemon=True).start()
+            self._predict = predict
+            print(f"✅ Vision model loaded: {len(self.class_mapping)} classes, batch {self.batch_size}")
+            return True
+
+    def available(self):
+        return self.load()
+
+    def _next_batch(self):
+        jobs = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(jobs) < self.batch_size:
+            try:
+                jobs.append(self._queue.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = []
+            for pixels, future in self._next_batch():
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    preprocess(pixels, out=self._batch[len(jobs)])
+                    jobs.append(future)
+                except Exception as e:
+                    future.set_exception(e)
+            if not jobs:
+                continue
+            try:
+                probs = np.asarray(self._predict(self._batch[:len(jobs)]))
+            except Exception as e:
+                self.stats["errors"] += 1
+                for future in jobs:
+                    future.set_exception(e)
+                continue
+            self.stats["images"] += len(jobs)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(jobs))
+            for future, p in zip(jobs, probs):
+                future.set_result(p)
+
+    def submit(self, pixels):
+        """Queue decoded pixels for the next batch; returns a Future of the class probabilities."""
+        if not self.load():
+            raise RuntimeError("vision model unavailable")
+        future = Future()
+        self._queue.put((pixels, future))
+        return future
+
+    def label(self, probs):
+        idx = int(np.argmax(probs))
+        confidence = float(probs[idx])
+        return {
+            "species": self.class_mapping.get(str(idx), "Unknown"),
+            "confidence": round(confidence * 100, 2),
+            "status": "High Accuracy" if confidence > HIGH_CONFIDENCE else "Low Confidence - Consider Retraining"
+        }
+
+    def classify(self, image, timeout=REQUEST_TIMEOUT):
+        """{"species", "confidence", "status"} for encoded image bytes (or already decoded
+        pixels), or None if the model is unavailable or the image can't be classified in time."""
+        if not self.load():
+            return None
+        try:
+            pixels = image if isinstance(image, np.ndarray) else decode_image(image)
+            probs = self.submit(pixels).result(timeout=timeout)
+        except Exception as e:
+            print(f"⚠️  [ML WARNING] Vision model inference failed: {e!r}")
+            return None
+        return self.label(probs)
+
+
+VISION = VisionService()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify aquatic images with the trained vision model.")
+    parser.add_argument("images", nargs="+", help="Image files")
+    args = parser.parse_args(argv)
+
+    if not VISION.load():
+        return 1
+    futures = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            futures.append((path, VISION.submit(decode_image(f.read()))))
+    for path, future in futures:
+        result = VISION.label(future.result())
+        print(f"{path}: {result['species'].upper()} {result['confidence']}% ({result['status']})")
+    print(f"batches {VISION.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# AQUA Categorical Vocabulary Service
+# ===================================
+#
+# Compiles the 17 fitted LabelEncoders of the registry bundles into plain dict
+# lookups. LabelEncoder.transform([value]) costs a NumPy searchsorted plus input
+# validation per call and raises on unseen labels; the routes used try/except
+# around it as control flow. Here every lookup is O(1), inputs are normalised
+# (case, spacing, "_"/"-") and resolved through aliases first, and unseen values
+# go to an explicit per-encoder unknown bucket.
+
+import threading
+import numpy as np
+from ml_core.registry import REGISTRY
+
+# Code returned for unseen labels when an encoder has no fallback label.
+# Matches the "else 0" the buyer/location routes used before.
+UNKNOWN_CODE = 0
+
+SPECIES_ALIASES = {
+    "shrimp (vannamei)": "Vannamei",
+    "shrimp (vannamei / black tiger)": "Vannamei",
+    "pacific white shrimp": "Vannamei",
+    "l vannamei": "Vannamei",
+    "whiteleg": "Whiteleg Shrimp",
+    "black tiger": "Black Tiger Shrimp",
+    "tiger shrimp": "Tiger Prawn",
+    "p monodon": "Tiger Prawn",
+    "tiger prawn (p. monodon)": "Tiger Prawn",
+    "scampi": "Freshwater Prawn",
+    "freshwater prawn (scampi)": "Freshwater Prawn",
+    "macrobrachium": "Freshwater Prawn",
+    "basa": "Pangasius",
+    "pangasius (basa)": "Pangasius",
+    "common carp": "Carp",
+    "asian seabass": "Barramundi",
+    "crab": "Mud Crab",
+}
+
+ALIASES = {
+    "species": SPECIES_ALIASES,
+    "country": {"viet nam": "Vietnam", "bharat": "India", "thai": "Thailand"},
+    "country_buyer": {
+        "us": "USA", "united states": "USA", "united states of america": "USA",
+        "europe": "EU", "european union": "EU", "prc": "China",
+    },
+    "state": {"andhra": "Andhra Pradesh", "ap": "Andhra Pradesh", "bengal": "West Bengal", "orissa": "Odisha"},
+    "climate": {"sub tropical": "Subtropical"},
+    "aqua": {"fishes": "Fish", "prawns": "Prawn", "shrimp": "Prawn", "crabs": "Crab"},
+    "feed": {"pellets": "Pellet", "floating pellet": "Floating", "sinking pellet": "Sinking"},
+    "grade": {"grade a": "A", "grade b": "B", "grade c": "C"},
+    "soil": {"loam": "Loamy", "clayey": "Clay", "sand": "Sandy"},
+    "water": {"bore well": "Borewell", "bore": "Borewell", "canal water": "Canal", "river water": "River"},
+    "season": {"rainy": "Monsoon", "rainy season": "Monsoon", "monsoon season": "Monsoon", "hot": "Summer", "cold": "Winter"},
+}
+
+# (bundle, encoder key) -> (alias group, fallback label for unseen values or None)
+ENCODER_SPECS = {
+    ("location", "le_country"): ("country", "Vietnam"),
+    ("location", "le_state"): ("state", "Mekong Delta"),
+    ("location", "le_climate"): ("climate", "Tropical"),
+    ("location", "le_aqua"): ("aqua", None),
+    ("location", "le_species_loc"): ("species", "Vannamei"),
+    ("feed", "le_species_feed"): ("species", "Vannamei"),
+    ("feed", "le_feed"): ("feed", "Pellet"),
+    ("yield", "le_species_yield"): ("species", "Vannamei"),
+    ("buyer", "le_country_buyer"): ("country_buyer", None),
+    ("buyer", "le_species_buyer"): ("species", None),
+    ("buyer", "le_grade_buyer"): ("grade", None),
+    ("stocking", "le_species_stock"): ("species", "Vannamei"),
+    ("stocking", "le_soil"): ("soil", "Loamy"),
+    ("stocking", "le_water_source"): ("water", "Canal"),
+    ("stocking", "le_season_stock"): ("season", "Summer"),
+    ("seed", "le_country_seed"): ("country", "India"),
+    ("seed", "le_species_seed_chk"): ("species", "Vannamei"),
+}
+
+
+def normalize(value):
+    return " ".join(str(value).replace("_", " ").replace("-", " ").split()).casefold()
+
+
+class Vocabulary:
+    """Dict-backed replacement for one fitted LabelEncoder."""
+
+    def __init__(self, classes, aliases=None, fallback=None):
+        self.classes = [str(c) for c in classes]
+        self.codes = {normalize(c): i for i, c in enumerate(self.classes)}
+        for alias, target in (aliases or {}).items():
+            key = normalize(target)
+            if key in self.codes:
+                self.codes.setdefault(normalize(alias), self.codes[key])
+        self.fallback = fallback if fallback is not None and normalize(fallback) in self.codes else None
+        self.unknown_code = self.codes[normalize(self.fallback)] if self.fallback else UNKNOWN_CODE
+
+    def lookup(self, value):
+        """Code for a label, or None if it is unseen."""
+        if value is None:
+            return None
+        return self.codes.get(normalize(value))
+
+    def encode(self, value):
+        code = self.lookup(value)
+        return self.unknown_code if code is None else code
+
+    def is_known(self, value):
+        return self.lookup(value) is not None
+
+    def encode_many(self, values):
+        """Bulk encode; unseen labels map to the unknown bucket."""
+        get, unknown = self.codes.get, self.unknown_code
+        out = np.empty(len(values), dtype=np.int64)
+        cache = {}
+        for i, v in enumerate(values):
+            code = cache.get(v)
+            if code is None:
+                code = get(normalize(v), unknown) if v is not None else unknown
+                cache[v] = code
+            out[i] = code
+        return out
+
+    def decode(self, code):
+        return self.classes[code] if 0 <= code < len(self.classes) else None
+
+
+class VocabularyService:
+    """Vocabularies for every registry encoder, recompiled when a bundle is hot-swapped."""
+
+    def __init__(self, registry=REGISTRY, specs=ENCODER_SPECS):
+        self.registry = registry
+        self.specs = specs
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def vocabulary(self, bundle, key):
+        """``bundle`` is a bundle name or a ModelBundle already held by the caller, so the
+        codes always come from the same version as the model they feed."""
+        if isinstance(bundle, str):
+            name, encoder = bundle, self.registry.get(bundle, key)
+        else:
+            name, encoder = bundle.name, bundle.get(key)
+        entry = self._compiled.get((name, key))
+        if entry is not None and entry[0] is encoder:
+            return entry[1]
+        group, fallback = self.specs.get((name, key), (None, None))
+        vocab = Vocabulary(getattr(encoder, "classes_", []), ALIASES.get(group), fallback)
+        with self._lock:
+            self._compiled[(name, key)] = (encoder, vocab)
+        return vocab
+
+    def encode(self, bundle, key, value, unknown=None):
+        """Encode one label. If ``unknown`` is a list, the encoder key is appended to it when
+        the value falls into the unknown bucket, so routes can report it without exceptions."""
+        vocab = self.vocabulary(bundle, key)
+        code = vocab.lookup(value)
+        if code is None:
+            if unknown is not None:
+                unknown.append(key)
+            return vocab.unknown_code
+        return code
+
+    def encode_many(self, bundle, key, values):
+        return self.vocabulary(bundle, key).encode_many(values)
+
+    def compile_all(self):
+        for bundle, key in self.specs:
+            self.vocabulary(bundle, key)
+
+
+VOCAB = VocabularyService()
+VOCAB.compile_all()
@@ -1,16 +1,46 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for
 from core.auth_utils import get_trans
+import os
 import random
-from ml_core.models_loader import disease_model, location_model, le_country, le_state, le_climate, le_aqua, le_species_loc, le_species_feed, le_feed, feed_model, USD_TO_INR, convert_quantity, yield_model, le_species_yield, buyer_model, le_country_buyer, le_species_buyer, le_grade_buyer, stocking_model, le_species_stock, le_soil, le_water_source, le_season_stock, get_global_prices
+from ml_core.models_loader import require_bundle, ModelUnavailable, USD_TO_INR, convert_quantity, get_global_prices
+from ml_core.vocab import VOCAB
+from ml_core.feature_store import FEATURE_STORE
+from ml_core.disease_stream import DISEASE_STREAM
+from core.db import AQUACYCLE_DB
+from core.weather_cache import WEATHER
 from core.knowledge_base import SPECIES_RULES, PRECAUTIONS, SEASONAL_ADVICE, GLOBAL_AQUA_REGIONS
 
 ai_bp = Blueprint('ai', __name__)
 
+@ai_bp.errorhandler(ModelUnavailable)
+def _model_unavailable(e):
+    # Same condition /api/health/models reports as degraded; never answer from a placeholder model
+    return jsonify({"status": "error", "message": f"The {e.name} model is currently unavailable. Please try again later."}), 503
+
+# Seconds a feed prediction waits for a weather lookup that is not cached yet
+FEED_WEATHER_WAIT = float(os.getenv("AQUA_FEED_WEATHER_WAIT", "0.3"))
+
+def _request_data():
+    """Request fields, with the latest logged readings of ``pond_id`` (if given) filling in
+    any the client left out. Returns (data, pond features or None)."""
+    data = request.get_json(silent=True) or request.form
+    pond_id = data.get("pond_id")
+    if not pond_id:
+        return data, None
+    FEATURE_STORE.ensure(AQUACYCLE_DB)
+    features = FEATURE_STORE.features(pond_id)
+    if not features:
+        return data, None
+    merged = {name: feats["last"] for name, feats in features.items()}
+    merged.update({k: v for k, v in dict(data).items() if v not in (None, "")})
+    return merged, features
+
 @ai_bp.route("/api/predict_disease", methods=["POST"])
 def api_predict_disease():
-    data = request.get_json(silent=True) or request.form
+    data, pond_features = _request_data()
     trans, lang = get_trans()
     species_name = data.get("species", "Vannamei")
+    disease_model = require_bundle("disease").get()
     
     try:
         vals = [
@@ -24,13 +54,13 @@ def api_predict_disease():
         
         if risk_score > 0.7:
             state = trans['state_critical']
-            advise = PRECAUTIONS["Disease"]["Action"]
+            advise = list(PRECAUTIONS["Disease"]["Action"])
         elif risk_score > 0.3:
             state = trans['state_risk']
             advise = PRECAUTIONS["Disease"]["Prevention"] + [trans.get("precaution_increase_monitoring", "Increase monitoring frequency")]
         else:
             state = trans['state_healthy']
-            advise = PRECAUTIONS["Disease"]["Prevention"]
+            advise = list(PRECAUTIONS["Disease"]["Prevention"])
         
         if species_name in SPECIES_RULES:
             rules = SPECIES_RULES[species_name]
@@ -46,7 +76,8 @@ def api_predict_disease():
             "result": state,
             "risk_score": float(risk_score),
             "unit": trans['suitability_score'],
-            "precautions": advise
+            "precautions": advise,
+            "pond_features": pond_features
         })
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
@@ -67,24 +98,37 @@ def predict_disease():
                          unit=data['unit'],
                          precautions=data['precautions'])
 
+@ai_bp.route("/api/stream/disease", methods=["POST"])
+def api_stream_disease():
+    """Sensor readings in (``readings``: [{pond_id, temp, ph, do, salinity, turbidity,
+    timestamp?, species?}]), level-change alerts out."""
+    data = request.get_json(silent=True) or {}
+    readings = data.get("readings") or [data]
+    try:
+        alerts = DISEASE_STREAM.push(require_bundle("disease").get(), readings)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Invalid reading: {e}"}), 400
+    return jsonify({
+        "status": "success",
+        "scored": len(readings),
+        "alerts": alerts,
+        "ponds": {p: DISEASE_STREAM.status(p) for p in {str(r["pond_id"]) for r in readings}}
+    })
+
 @ai_bp.route("/api/predict_location", methods=["POST"])
 def api_predict_location():
     data = request.get_json(silent=True) or request.form
     trans, lang = get_trans()
-    try:
-        country_val = le_country.transform([data["country"]])[0]
-    except:
-        country_val = le_country.transform(["Vietnam"])[0] if "Vietnam" in le_country.classes_ else 0
-        
-    try:
-        state_val = le_state.transform([data["state"]])[0]
-    except:
-        state_val = le_state.transform(["Mekong Delta"])[0] if "Mekong Delta" in le_state.classes_ else 0
+    bundle = require_bundle("location")
+    location_model = bundle.get()
+    unknown = []
+    country_val = VOCAB.encode(bundle, "le_country", data.get("country"), unknown)
+    state_val = VOCAB.encode(bundle, "le_state", data.get("state"), unknown)
 
     climate_name = data.get("climate", "Tropical")
-    climate_val = le_climate.transform([climate_name])[0]
-    aqua_type = le_aqua.transform([data["aqua_type"]])[0]
-    species = le_species_loc.transform([data["species"]])[0]
+    climate_val = VOCAB.encode(bundle, "le_climate", climate_name, unknown)
+    aqua_type = VOCAB.encode(bundle, "le_aqua", data["aqua_type"], unknown)
+    species = VOCAB.encode(bundle, "le_species_loc", data["species"], unknown)
     
     vals = [[country_val, state_val, climate_val, aqua_type, species]]
     score = location_model.predict(vals)[0]
@@ -95,7 +139,7 @@ def api_predict_location():
     elif "Temperate" in climate_name:
         climate_warning = "⚠️ Heavy Rainfall Alert: Risk of salinity drop."
         
-    advise = PRECAUTIONS["Growth"]["Optimize"] if score > 70 else PRECAUTIONS["Growth"]["Risk"]
+    advise = list(PRECAUTIONS["Growth"]["Optimize"] if score > 70 else PRECAUTIONS["Growth"]["Risk"])
     if climate_warning:
         advise.append(climate_warning)
     
@@ -106,7 +150,8 @@ def api_predict_location():
         "result": f"{round(score, 1)}%",
         "score": float(score),
         "unit": trans['suitability_score'],
-        "precautions": advise
+        "precautions": advise,
+        "unknown_inputs": unknown
     })
 
 @ai_bp.route("/predict_location", methods=["GET", "POST"])
@@ -125,32 +170,29 @@ def predict_location():
 
 @ai_bp.route("/api/predict_feed", methods=["POST"])
 def api_predict_feed():
-    import requests
-    data = request.get_json(silent=True) or request.form
+    data, pond_features = _request_data()
     trans, lang = get_trans()
     species_name = data.get("species", "Vannamei")
-    species = le_species_feed.transform([species_name])[0]
+    bundle = require_bundle("feed")
+    feed_model = bundle.get()
+    unknown = []
+    species = VOCAB.encode(bundle, "le_species_feed", species_name, unknown)
     age = float(data.get("age", 30))
     
     # Advanced: Combine weather forecasting APIs with feeding algorithm
+    # (served from the shared weather cache; on a miss wait briefly for the fetch, else use the request's temp)
     location = data.get("location", "Visakhapatnam")
-    weather_temp = 28.0
-    weather_desc = "Clear"
-    try:
-        res = requests.get(f"https://wttr.in/{location}?format=%t+%C", timeout=2)
-        if res.status_code == 200:
-            weather_str = res.text.strip()
-            # Parse something like "+28°C Clear"
-            weather_temp_str = weather_str.split('°C')[0].replace('+', '').strip()
-            weather_temp = float(weather_temp_str)
-            weather_desc = weather_str.split('°C')[1].strip() if '°C' in weather_str else "Unknown"
-    except Exception as e:
-        print(f"Weather API Error: {e}")
+    weather = WEATHER.get(location, data.get("lat"), data.get("lon"), wait=FEED_WEATHER_WAIT)
+    if weather:
+        weather_temp = weather["temp_c"]
+        weather_desc = weather["condition"]
+    else:
         weather_temp = float(data.get("temp", 28))
+        weather_desc = "Clear"
     
     temp = weather_temp
     feed_type_name = data.get("feed_type", "Pellet")
-    feed_type = le_feed.transform([feed_type_name])[0]
+    feed_type = VOCAB.encode(bundle, "le_feed", feed_type_name, unknown)
     
     vals = [[species, age, temp, 6.0, feed_type, 32]]
     quantity_kg = feed_model.predict(vals)[0]
@@ -174,7 +216,7 @@ def api_predict_feed():
     
     saving_tip = trans.get("tip_automatic_feeders", "Tip: Use automatic feeders to reduce wastage by 15%.")
     
-    advise = PRECAUTIONS["Growth"]["Optimize"] if 25 <= temp <= 32 else PRECAUTIONS["Growth"]["Risk"]
+    advise = list(PRECAUTIONS["Growth"]["Optimize"] if 25 <= temp <= 32 else PRECAUTIONS["Growth"]["Risk"])
     advise.append(f"💰 {saving_tip}")
     advise.append(heat_warning)
     
@@ -189,7 +231,9 @@ def api_predict_feed():
         "quantity": float(quantity_display),
         "unit": f"{unit_label} | Est. Cost/Day: {multi_currency_str}",
         "precautions": advise,
-        "costs": global_costs
+        "costs": global_costs,
+        "unknown_inputs": unknown,
+        "pond_features": pond_features
     })
 
 @ai_bp.route("/predict_feed", methods=["GET", "POST"])
@@ -210,7 +254,10 @@ def predict_feed():
 def api_predict_yield():
     data = request.get_json(silent=True) or request.form
     trans, lang = get_trans()
-    species = le_species_yield.transform([data["species"]])[0]
+    bundle = require_bundle("yield")
+    yield_model = bundle.get()
+    unknown = []
+    species = VOCAB.encode(bundle, "le_species_yield", data["species"], unknown)
     area = float(data["area"])
     feed = float(data["feed"])
     days = float(data["days"])
@@ -243,9 +290,10 @@ def api_predict_yield():
         "accuracy": accuracy,
         "chart_labels": chart_labels,
         "chart_data": chart_data_pts,
+        "unknown_inputs": unknown,
         # Advanced Integration: Connect to B2B Trade Matrix
         "b2b_forward_trade": {
-            "eligible": expected_yield_tons > 1.0,
+            "eligible": bool(expected_yield_tons > 1.0),
             "estimated_forward_value_usd": round(expected_yield_tons * 1000 * 4.5, 2), # Assuming $4.5/kg
             "estimated_global_prices": get_global_prices(expected_yield_tons * 1000 * 4.5),
             "action_url": "/business/create-order",
@@ -283,23 +331,15 @@ def api_predict_buyer():
     trans, lang = get_trans()
     country_name = data.get("country", "USA")
     species_name = data.get("species", "Vannamei")
-    
-    try:
-        country = le_country_buyer.transform([country_name])[0]
-    except:
-        country = 0
-        
-    try:
-        species = le_species_buyer.transform([species_name])[0]
-    except:
-        species = 0
+    bundle = require_bundle("buyer")
+    buyer_model = bundle.get()
+    unknown = []
+    country = VOCAB.encode(bundle, "le_country_buyer", country_name, unknown)
+    species = VOCAB.encode(bundle, "le_species_buyer", species_name, unknown)
         
     quantity = float(data.get("quantity", 10))
     grade_name = data.get("grade", "A")
-    try:
-        grade = le_grade_buyer.transform([grade_name])[0]
-    except:
-        grade = 0
+    grade = VOCAB.encode(bundle, "le_grade_buyer", grade_name, unknown)
     
     vals = [[country, species, quantity, grade]]
     price_usd = buyer_model.predict(vals)[0]
@@ -313,7 +353,8 @@ def api_predict_buyer():
         "description": f"AI Optimized Global Offer for {quantity} tons ({species_name}):",
         "result": "Global Arbitrage Matrix",
         "prices": global_prices,
-        "unit": multi_currency_str
+        "unit": multi_currency_str,
+        "unknown_inputs": unknown
     })
 
 @ai_bp.route("/predict_buyer", methods=["GET", "POST"])
@@ -381,11 +422,14 @@ def calculate_eco():
 def api_predict_stocking():
     data = request.get_json(silent=True) or request.form
     trans, lang = get_trans()
-    species = le_species_stock.transform([data["species"]])[0]
+    bundle = require_bundle("stocking")
+    stocking_model = bundle.get()
+    unknown = []
+    species = VOCAB.encode(bundle, "le_species_stock", data["species"], unknown)
     area = float(data["area"])
-    soil = le_soil.transform([data["soil"]])[0]
-    water = le_water_source.transform([data["water"]])[0]
-    season = le_season_stock.transform([data["season"]])[0]
+    soil = VOCAB.encode(bundle, "le_soil", data["soil"], unknown)
+    water = VOCAB.encode(bundle, "le_water_source", data["water"], unknown)
+    season = VOCAB.encode(bundle, "le_season_stock", data["season"], unknown)
     
     vals = [[species, area, soil, water, season]]
     res = stocking_model.predict(vals)[0]
@@ -400,7 +444,8 @@ def api_predict_stocking():
         "seeds": int(res[0]),
         "survival_rate": float(res[1]),
         "unit": "Advice",
-        "precautions": advise
+        "precautions": advise,
+        "unknown_inputs": unknown
     })
 
 @ai_bp.route("/predict_stocking", methods=["GET", "POST"])
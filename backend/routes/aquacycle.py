@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, session
 from core.auth_utils import get_trans, get_role, login_required
 from core.db import AQUACYCLE_DB, save_aquacycle, USERS_DB, PAYMENTS_DB, ORDERS_DB, EXPERTS_DB, PROBLEMS_DB
 from core.ecosystem_config import AQUA_ROLES, AQUACYCLE_CONNECTIONS, AQUA_ROLE_ACTIONS
+from ml_core import incremental
+from ml_core.feature_store import FEATURE_STORE
 import random
 from datetime import datetime
 
@@ -142,11 +144,17 @@ def api_aquacycle_work():
             "from": user_role,
             "to": user_role,
             "title": f"{action.replace('_', ' ').title()} Entry",
+            "action": action,
             "date": datetime.now().strftime("%Y-%m-%d"),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
             "data": data
         }
         AQUACYCLE_DB["reports"].append(entry)
         save_aquacycle()
+        # Keep the pond's rolling features current for pond_id predictions
+        FEATURE_STORE.observe(AQUACYCLE_DB, entry)
+        # Labelled water tests / feeding logs / harvests feed the incremental model refits
+        incremental.notify(AQUACYCLE_DB["reports"], entry)
         return jsonify({"status": "success", "message": "Log entry recorded successfully"})
 
     elif action.startswith("connect_"):
@@ -1,10 +1,14 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
-import requests
 import random
 from core.auth_utils import get_trans, role_required, login_required
 from core.db import AQUACYCLE_DB, APP_CONFIG, USERS_DB, EXPERTS_DB, save_json, CONFIG_FILE
 from core.ecosystem_config import AQUA_ROLES, AQUACYCLE_CONNECTIONS
 from core.knowledge_base import PRECAUTIONS, GLOBAL_AQUA_REGIONS
+from ml_core.dataset_cache import export_records
+from core.weather_cache import WEATHER
+from core.geoip import lang_for_coords, lang_for_ip
+from core.http_client import OUTBOUND
+from core.page_cache import PAGE_CACHE, cached_page
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,49 +18,12 @@ def set_lang_by_geo():
     lat = data.get('lat')
     lon = data.get('lon')
     
-    detected = 'en'
-    
     if lat and lon:
-        if 13.5 < lat < 19.5 and 76.5 < lon < 84.5: detected = 'te'
-        elif 8.0 < lat < 13.5 and 76.0 < lon < 80.5: detected = 'ta'
-        elif 21.5 < lat < 27.0 and 85.5 < lon < 89.5: detected = 'bn'
-        elif 20.0 < lat < 24.5 and 68.5 < lon < 74.5: detected = 'gu'
-        elif 8.0 < lat < 13.0 and 74.5 < lon < 77.5: detected = 'ml'
-        elif 11.5 < lat < 18.5 and 74.0 < lon < 78.5: detected = 'kn'
-        elif 17.5 < lat < 22.5 and 81.0 < lon < 87.5: detected = 'or'
-        elif 15.5 < lat < 20.5 and 72.5 < lon < 80.5: detected = 'mr'
-        elif 8.0 < lat < 37.0 and 68.0 < lon < 97.0: detected = 'hi'
-    
+        detected = lang_for_coords(lat, lon)
     else:
-        try:
-            user_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
-            if ',' in user_ip: user_ip = user_ip.split(',')[0]
-            
-            geo_res = requests.get(f"http://ip-api.com/json/{user_ip}?fields=status,countryCode,regionName", timeout=2)
-            if geo_res.status_code == 200:
-                geo_data = geo_res.json()
-                if geo_data.get('status') == 'success':
-                    region = geo_data.get('regionName', '').lower()
-                    country = geo_data.get('countryCode', '')
-                    
-                    if country == 'IN':
-                        if 'andhra' in region or 'telangana' in region: detected = 'te'
-                        elif 'tamil' in region: detected = 'ta'
-                        elif 'west bengal' in region: detected = 'bn'
-                        elif 'gujarat' in region: detected = 'gu'
-                        elif 'kerala' in region: detected = 'ml'
-                        elif 'karnataka' in region: detected = 'kn'
-                        elif 'odisha' in region: detected = 'or'
-                        elif 'maharashtra' in region: detected = 'mr'
-                        else: detected = 'hi'
-                    elif country == 'ES': detected = 'es'
-                    elif country == 'FR': detected = 'fr'
-                    elif country == 'CN': detected = 'zh'
-                    elif country == 'VN': detected = 'vi'
-                    elif country == 'ID': detected = 'id'
-                    elif country == 'TH': detected = 'th'
-        except Exception as e:
-            print(f"GeoIP Fallback Error: {e}")
+        user_ip = request.headers.get('X-Forwarded-For', request.remote_addr) or ''
+        if ',' in user_ip: user_ip = user_ip.split(',')[0]
+        detected = lang_for_ip(user_ip)
 
     if 'detected_lang' not in session or session['detected_lang'] != detected:
         session['detected_lang'] = detected
@@ -100,6 +67,8 @@ def settings():
             }
         })
         save_json(CONFIG_FILE, APP_CONFIG)
+        # Cached anonymous pages were rendered with the old config
+        PAGE_CACHE.purge()
         
         # Avoid direct app.config update here, to avoid circular import. App handles this via APP_CONFIG reference.
         flash("System settings updated and saved successfully.", "success")
@@ -107,6 +76,19 @@ def settings():
         
     return render_template("settings.html", trans=trans, lang=lang, config=APP_CONFIG)
 
+@main_bp.route("/api/admin/outbound")
+@role_required(['admin'])
+def api_admin_outbound():
+    """Per-provider call counts, latency and circuit state of the shared outbound client."""
+    return jsonify({"status": "success", "providers": OUTBOUND.metrics()})
+
+@main_bp.route("/api/admin/page-cache/purge", methods=["POST"])
+@role_required(['admin'])
+def api_admin_purge_page_cache():
+    data = request.get_json(silent=True) or request.form
+    purged = PAGE_CACHE.purge(path=data.get("path"), lang=data.get("lang"))
+    return jsonify({"status": "success", "purged": purged, "stats": PAGE_CACHE.metrics()})
+
 @main_bp.route("/api/user-status")
 def api_user_status():
     if 'user' in session:
@@ -124,11 +106,8 @@ def api_user_status():
 @main_bp.route("/api/landing")
 def api_landing():
     trans, lang = get_trans()
-    weather_info = "28°C Clear"
-    try:
-        res = requests.get("https://wttr.in/Visakhapatnam?format=%t+%C", timeout=2)
-        if res.status_code == 200: weather_info = res.text
-    except: pass
+    weather = WEATHER.get("Visakhapatnam")
+    weather_info = weather["text"] if weather else "28°C Clear"
     
     live_stats = {
         "weather": weather_info,
@@ -139,6 +118,7 @@ def api_landing():
     return jsonify({"status": "success", "trans": trans, "lang": lang, "live_stats": live_stats})
 
 @main_bp.route("/")
+@cached_page()
 def landing():
     res = api_landing().get_json()
     if 'user' in session:
@@ -285,6 +265,16 @@ def cache_info():
         "message": "Cache info retrieved"
     })
 
+@main_bp.route("/api/dataset/<name>")
+def api_dataset(name):
+    """Projected dataset rows cached by the offline manager in IndexedDB."""
+    try:
+        return jsonify(export_records(name))
+    except KeyError:
+        return jsonify({"status": "error", "message": f"Unknown dataset: {name}"}), 404
+    except FileNotFoundError:
+        return jsonify({"status": "error", "message": f"Dataset not available: {name}"}), 404
+
 @main_bp.route("/farmer/logbook")
 def logbook():
     trans, lang = get_trans()
@@ -340,36 +330,43 @@ def knowledge_hub():
     return render_template("knowledge_hub.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/start")
+@cached_page()
 def guide_start_farm():
     trans, lang = get_trans()
     return render_template("guides/start_farm.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/vannamei")
+@cached_page()
 def guide_vannamei():
     trans, lang = get_trans()
     return render_template("guides/vannamei.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/fish")
+@cached_page()
 def guide_fish():
     trans, lang = get_trans()
     return render_template("guides/fish.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/crab")
+@cached_page()
 def guide_crab():
     trans, lang = get_trans()
     return render_template("knowledge_hub.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/mollusk")
+@cached_page()
 def guide_mollusk():
     trans, lang = get_trans()
     return render_template("knowledge_hub.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/feed")
+@cached_page()
 def guide_feed():
     trans, lang = get_trans()
     return render_template("knowledge_hub.html", trans=trans, lang=lang)
 
 @main_bp.route("/knowledge/disease")
+@cached_page()
 def guide_disease():
     trans, lang = get_trans()
     return render_template("knowledge_hub.html", trans=trans, lang=lang)
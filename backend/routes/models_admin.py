@@ -0,0 +1,36 @@
+from flask import Blueprint, request, jsonify
+from core.auth_utils import role_required
+from ml_core.registry import REGISTRY, MODEL_BUNDLES, RegistryError
+
+models_admin_bp = Blueprint('models_admin', __name__)
+
+@models_admin_bp.route("/api/health/models")
+def api_models_health():
+    # Public on purpose so load balancers can probe it; 503 when any model is missing.
+    report = REGISTRY.health()
+    healthy = all(r["healthy"] for r in report.values())
+    return jsonify({"status": "ok" if healthy else "degraded", "models": report}), (200 if healthy else 503)
+
+@models_admin_bp.route("/api/admin/models")
+@role_required(['admin'])
+def api_admin_models():
+    return jsonify({
+        "status": "success",
+        "models": {
+            name: {"current": REGISTRY.current_version(name), "versions": REGISTRY.versions(name)}
+            for name in MODEL_BUNDLES
+        }
+    })
+
+@models_admin_bp.route("/api/admin/models/<name>/promote", methods=["POST"])
+@role_required(['admin'])
+def api_admin_promote_model(name):
+    data = request.get_json(silent=True) or request.form
+    version = data.get("version")
+    if not version:
+        return jsonify({"status": "error", "message": "version is required"}), 400
+    try:
+        bundle = REGISTRY.promote(name, version)
+    except RegistryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "message": f"{name} now serving {bundle.version}", "manifest": bundle.manifest})
@@ -1,126 +1,295 @@
 from flask import Blueprint, request, jsonify, render_template
 from core.db import AQUAVISION_DB, save_aquavision
+from core.auth_utils import role_required
+from core.keyword_automaton import KeywordAutomaton
+from core.vision_cache import VISION_CACHE, image_key, try_decode
+from core.vision_jobs import VISION_JOBS, QueueFull
+from ml_core.vision_service import VISION, MAX_UPLOAD_BYTES, ImageRejected, ImageTooLarge, read_image
+import os
+import base64
 import random
+import hashlib
 from datetime import datetime
 
 vision_bp = Blueprint('vision', __name__)
 
+# Seconds an analyze request waits for its Gemini job before answering from the
+# local identifiers with the job id. 0 (the default) never holds the worker: the
+# page polls /api/vision/jobs/<id> for Gemini's verdict.
+GEMINI_DEADLINE = float(os.getenv("AQUA_GEMINI_DEADLINE", "0"))
+# Model confidence (%) needed to answer from the in-process classifier alone
+VISION_MIN_CONFIDENCE = float(os.getenv("AQUA_VISION_MIN_CONFIDENCE", "80"))
+# Room for multipart boundaries and the small form fields next to the image
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Longest wait on GET /api/vision/jobs/<id>?wait= (each wait holds a worker, so
+# clients poll again with backoff rather than long-polling)
+MAX_JOB_WAIT = 2
+
+AQUA_IDENTIFIERS = {
+    "shrimp": {"type": "Tiger Prawn (P. monodon)", "disease": "White Spot Syndrome (WSSV)", "severity": "CRITICAL THREAT", "desc": "Neural core detected calcified WSSV patterns on carapace. Urgent isolation required."},
+    "vannamei": {"type": "Vannamei Shrimp", "disease": "Early Mortality (EMS/AHPND)", "severity": "CRITICAL THREAT", "desc": "Abnormal hepatopancreas pigments detected via convolutional scan."},
+    "prawn": {"type": "Macrobrachium", "disease": "Black Gill Disease", "severity": "HIGH RISK", "desc": "Melanized nodules detected in branchial chamber neural mapping."},
+    "tilapia": {"type": "Tilapia", "disease": "Epizootic Ulcerative Syndrome (EUS)", "severity": "CRITICAL THREAT", "desc": "Neural mapping: Deep hemorrhagic ulcers and red sores detected. Highly contagious fungal/bacterial complex."},
+    "fish": {"type": "Freshwater Fish", "disease": "Motile Aeromonas Septicemia (MAS)", "severity": "HIGH RISK", "desc": "Neural biomarkers indicate severe tissue necrosis, red lesions, and hemorrhagic septicemia. Requires immediate antibacterial protocol."},
+    "water": {"type": "Pond Ecosystem", "disease": "Cyanobacteria Bloom", "severity": "MONITORING", "desc": "High chlorophyll-a concentration detected in photosynthetic spectrum."},
+    "pond": {"type": "Water Column", "disease": "Ammonia Spike Probability", "severity": "WARNING", "desc": "Water turbidity pattern matches high-nitrate/ammonia baseline DB."},
+    "crab": {"type": "Mud Crab", "disease": "Shell Disease", "severity": "MEDIUM", "desc": "Chitin-clastic bacterial markers detected on dorsal carapace."}
+}
+
+# Custom labels and built-in identifiers in one automaton, tagged (0, i) for the
+# i-th custom label (training order) and (1, i) for the i-th identifier, so the
+# smallest tag found is the match the old keyword loops would have returned
+CUSTOM_KEYWORDS = list(AQUAVISION_DB.get("custom_labels", {}))
+IDENTIFIER_KEYWORDS = list(AQUA_IDENTIFIERS)
+VISION_KEYWORDS = KeywordAutomaton(
+    [(str(k), (0, i)) for i, k in enumerate(CUSTOM_KEYWORDS)] +
+    [(k, (1, i)) for i, k in enumerate(IDENTIFIER_KEYWORDS)])
+
+def _add_custom_keyword(keyword):
+    if keyword not in CUSTOM_KEYWORDS:
+        CUSTOM_KEYWORDS.append(keyword)
+        VISION_KEYWORDS.add(keyword, (0, len(CUSTOM_KEYWORDS) - 1))
+
+def _keyword_info(tag):
+    group, i = tag
+    if group == 0:
+        return AQUAVISION_DB["custom_labels"][CUSTOM_KEYWORDS[i]]
+    return AQUA_IDENTIFIERS[IDENTIFIER_KEYWORDS[i]]
+
+def _keyword_match(filename, detected_type):
+    """("custom" | "filename" | "detected", tag) for the entry the keyword rules pick:
+    a custom label in either text, else an identifier in the filename, else one in
+    the detected type; (None, None) if nothing matches. One automaton pass per text."""
+    in_filename = VISION_KEYWORDS.find(filename)
+    in_type = VISION_KEYWORDS.find(detected_type) if detected_type else []
+    for source, tags, group in (("custom", in_filename + in_type, 0),
+                                ("filename", in_filename, 1),
+                                ("detected", in_type, 1)):
+        tag = min((t for t in tags if t[0] == group), default=None)
+        if tag:
+            return source, tag
+    return None, None
+
+def _identify(text):
+    """The custom label, then built-in identifier, whose keyword occurs in ``text``."""
+    tag = VISION_KEYWORDS.first(text)
+    return _keyword_info(tag) if tag else None
+
+def _gemini_response(verdict):
+    return {
+        "status": "success",
+        "is_aqua": True,
+        "data": verdict,
+        "confidence": round(random.uniform(92, 99.8), 2),
+        "message": "Powered by Google Gemini Vision AI"
+    }
+
+def _read_upload():
+    """(image_bytes, mime_type, fields, None) for a multipart ("image" field) or raw
+    image/* request body, or (None, None, None, error response)."""
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD:
+        return None, None, None, (jsonify({"status": "error", "message": f"Image exceeds {MAX_UPLOAD_BYTES} bytes"}), 413)
+    if request.mimetype.startswith("image/"):
+        stream, mime_type, fields = request.stream, request.mimetype, request.args
+    else:
+        # Werkzeug spools the multipart body (to disk past 500 KB); cap what it accepts
+        request.max_content_length = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD
+        upload = request.files.get("image")
+        if upload is None:
+            return None, None, None, (jsonify({"status": "error", "message": "Send the image as the 'image' form field or an image/* body"}), 400)
+        stream, mime_type = upload.stream, upload.mimetype
+        fields = dict(request.form)
+        fields.setdefault("filename", upload.filename or "")
+    try:
+        image_bytes, _ = read_image(stream, MAX_UPLOAD_BYTES)
+    except ImageTooLarge as e:
+        return None, None, None, (jsonify({"status": "error", "message": str(e)}), 413)
+    except ImageRejected as e:
+        return None, None, None, (jsonify({"status": "error", "message": str(e)}), 415)
+    return image_bytes, mime_type, fields, None
+
 @vision_bp.route("/ai-vision")
 def ai_vision():
     return render_template("ai_vision.html", vision_stats=AQUAVISION_DB["trained_weights"])
 
 @vision_bp.route("/api/vision/analyze", methods=["POST"])
 def api_vision_analyze():
-    from flask import session
-    from core.db import AQUACYCLE_DB, save_aquacycle
-    import os
-    import base64
-    import json
-    import re
-    
     data = request.get_json() or {}
     filename = data.get("filename", "").lower()
     detected_type = data.get("detected_type", "").lower()
     image_base64 = data.get("image_base64", "")
-    
-    # REAL AI INTEGRATION: Google Gemini Vision
-    gemini_api_key = os.environ.get("GEMINI_API_KEY")
-    if gemini_api_key and image_base64.startswith("data:image"):
+    mime_type = b64_str = None
+    if image_base64.startswith("data:image") and "," in image_base64:
+        header, b64_str = image_base64.split(",", 1)
+        mime_type = header.split(":")[1].split(";")[0]
+    return _analyze(filename, detected_type, mime_type, b64_str=b64_str)
+
+@vision_bp.route("/api/vision/upload", methods=["POST"])
+def api_vision_upload():
+    """Same analysis as /api/vision/analyze for an image sent as multipart/form-data
+    (field "image", optional "filename" / "detected_type") or as a raw image/* body
+    (filename / detected_type in the query string), without the base64 JSON round trip."""
+    image_bytes, mime_type, fields, error = _read_upload()
+    if error:
+        return error
+    return _analyze(fields.get("filename", "").lower(), fields.get("detected_type", "").lower(),
+                    mime_type, image_bytes=image_bytes)
+
+@vision_bp.route("/api/vision/jobs", methods=["POST"])
+def api_vision_job_submit():
+    """Queue an image for Gemini (JSON image_base64 data URL, multipart or raw image/*)
+    and return its job id at once; poll GET /api/vision/jobs/<id> for the verdict."""
+    if not VISION_JOBS.available():
+        return jsonify({"status": "error", "message": "Gemini vision is not configured"}), 503
+    if request.is_json:
+        image_base64 = (request.get_json() or {}).get("image_base64", "")
+        if not image_base64.startswith("data:image") or "," not in image_base64:
+            return jsonify({"status": "error", "message": "image_base64 must be a data:image URL"}), 400
+        header, b64_str = image_base64.split(",", 1)
+        mime_type = header.split(":")[1].split(";")[0]
+    else:
+        image_bytes, mime_type, _, error = _read_upload()
+        if error:
+            return error
+        b64_str = base64.b64encode(image_bytes).decode("ascii")
+    try:
+        job_id = _submit_gemini(mime_type, b64_str)
+    except QueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify({"status": "success", "job_id": job_id, "job": VISION_JOBS.get(job_id)}), 202
+
+@vision_bp.route("/api/vision/jobs/<job_id>")
+def api_vision_job_status(job_id):
+    """A Gemini job's status and, once done, its verdict; ?wait=N waits up to N seconds
+    (at most MAX_JOB_WAIT) for it to finish."""
+    wait = min(request.args.get("wait", 0, type=float), MAX_JOB_WAIT)
+    job = VISION_JOBS.wait(job_id, wait) if wait > 0 else VISION_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown or expired job"}), 404
+    response = {"status": "success", "job": job}
+    if job["status"] == "done" and job["result"]:
+        response["analysis"] = _gemini_response(job["result"])
+    return jsonify(response)
+
+def _submit_gemini(mime_type, b64_str, cache_key=None):
+    """Queue (or join) the Gemini job for an image; its verdict also lands in the
+    vision cache under ``cache_key``, even if nobody is still waiting for it."""
+    flight = "gemini:" + hashlib.sha1(b64_str.encode()).hexdigest()
+    on_done = (lambda verdict: VISION_CACHE.put(cache_key, _gemini_response(verdict))) if cache_key else None
+    return VISION_JOBS.submit(mime_type or "image/jpeg", b64_str, key=flight, on_done=on_done)
+
+def _analyze(filename, detected_type, mime_type=None, image_bytes=None, b64_str=None):
+    """The analyze response for an image given as raw bytes or base64 (or neither)."""
+    if image_bytes is None and b64_str:
         try:
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Extract base64 part and mime type
-            header, b64_str = image_base64.split(",", 1)
-            mime_type = header.split(":")[1].split(";")[0]
-            img_data = base64.b64decode(b64_str)
-            
-            prompt = """
-            You are an expert aquaculture pathologist. Analyze this image of an aquatic organism (e.g. shrimp, prawn, fish, crab) or pond water.
-            Return ONLY a valid JSON object with the following structure (no markdown tags, no code blocks):
-            {
-                "type": "Name of the organism or water issue",
-                "disease": "Name of the disease or condition detected (or 'Healthy' if none)",
-                "severity": "CRITICAL THREAT, HIGH RISK, WARNING, MONITORING, or SECURE",
-                "desc": "A detailed description of the symptoms or condition and actionable solutions."
-            }
-            """
-            
-            response = model.generate_content([prompt, {"mime_type": mime_type, "data": img_data}])
-            
-            match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if match:
-                ai_data = json.loads(match.group(0))
-                return jsonify({
-                    "status": "success",
-                    "is_aqua": True,
-                    "data": ai_data,
-                    "confidence": round(random.uniform(92, 99.8), 2),
-                    "message": "Powered by Google Gemini Vision AI"
-                })
-        except Exception as e:
-            print(f"Gemini API Error: {e}")
-            # Fall back to existing logic if Gemini fails
+            image_bytes = base64.b64decode(b64_str, validate=True)
+        except ValueError:
             pass
 
-    for keyword, disease_data in AQUAVISION_DB.get("custom_labels", {}).items():
-        if str(keyword) in str(filename) or (detected_type and str(keyword) in detected_type):
-            return jsonify({
-                "status": "success",
-                "is_aqua": True,
-                "data": disease_data,
-                "confidence": round(random.uniform(96, 99.8), 2)
-            })
-
-    AQUA_IDENTIFIERS = {
-        "shrimp": {"type": "Tiger Prawn (P. monodon)", "disease": "White Spot Syndrome (WSSV)", "severity": "CRITICAL THREAT", "desc": "Neural core detected calcified WSSV patterns on carapace. Urgent isolation required."},
-        "vannamei": {"type": "Vannamei Shrimp", "disease": "Early Mortality (EMS/AHPND)", "severity": "CRITICAL THREAT", "desc": "Abnormal hepatopancreas pigments detected via convolutional scan."},
-        "prawn": {"type": "Macrobrachium", "disease": "Black Gill Disease", "severity": "HIGH RISK", "desc": "Melanized nodules detected in branchial chamber neural mapping."},
-        "tilapia": {"type": "Tilapia", "disease": "Epizootic Ulcerative Syndrome (EUS)", "severity": "CRITICAL THREAT", "desc": "Neural mapping: Deep hemorrhagic ulcers and red sores detected. Highly contagious fungal/bacterial complex."},
-        "fish": {"type": "Freshwater Fish", "disease": "Motile Aeromonas Septicemia (MAS)", "severity": "HIGH RISK", "desc": "Neural biomarkers indicate severe tissue necrosis, red lesions, and hemorrhagic septicemia. Requires immediate antibacterial protocol."},
-        "water": {"type": "Pond Ecosystem", "disease": "Cyanobacteria Bloom", "severity": "MONITORING", "desc": "High chlorophyll-a concentration detected in photosynthetic spectrum."},
-        "pond": {"type": "Water Column", "disease": "Ammonia Spike Probability", "severity": "WARNING", "desc": "Water turbidity pattern matches high-nitrate/ammonia baseline DB."},
-        "crab": {"type": "Mud Crab", "disease": "Shell Disease", "severity": "MEDIUM", "desc": "Chitin-clastic bacterial markers detected on dorsal carapace."}
-    }
+    # Diagnoses read from the image itself are cached by perceptual hash, so a
+    # re-upload of the same (or a near-identical) photo answers straight away
+    cache_key = pixels = None
+    if image_bytes:
+        pixels = try_decode(image_bytes)
+        cache_key = image_key(image_bytes, pixels)
+        cached = VISION_CACHE.get(cache_key)
+        if cached is not None:
+            return jsonify(dict(cached, cache="hit"))
 
-    for key, info in AQUA_IDENTIFIERS.items():
-        if str(key) in str(filename):
-            
-            # Advanced Feature: Proactively push treatment plan to farmer's dashboard
-            if session.get("role") == "farmer" and "disease" in info:
-                lead = {
-                    "id": f"ALERT-{random.randint(1000,9999)}",
-                    "from": "ai_vision",
-                    "to": "farmer",
-                    "msg": f"PROACTIVE ALERT: {info['disease']} detected. Recommended action: {info['desc']}",
-                    "status": "pending"
-                }
-                AQUACYCLE_DB["leads"].append(lead)
-                save_aquacycle()
-                info["proactive_alert"] = True
-            
-            return jsonify({
-                "status": "success",
-                "is_aqua": True,
-                "data": info,
-                "confidence": round(random.uniform(92, 98), 2)
-            })
-            
-    if detected_type:
-        for key, info in AQUA_IDENTIFIERS.items():
-            if str(key) in detected_type:
-                return jsonify({
+    # In-process species classifier (batched with concurrent requests). A confident
+    # species with a known profile answers directly; otherwise the species becomes
+    # the detected type for Gemini / the keyword fallbacks below.
+    if image_bytes and VISION.available():
+        result = VISION.classify(pixels if pixels is not None else image_bytes)
+        if result:
+            species = result["species"].lower()
+            info = _identify(species)
+            if info and result["confidence"] >= VISION_MIN_CONFIDENCE:
+                response = {
                     "status": "success",
                     "is_aqua": True,
                     "data": info,
-                    "confidence": round(random.uniform(88, 96), 2),
-                    "message": f"Neural Core: Identified as {detected_type} via image tensors."
-                })
+                    "confidence": result["confidence"],
+                    "message": f"AQUA Vision model: {result['species']} ({result['status']})"
+                }
+                VISION_CACHE.put(cache_key, response)
+                return jsonify(response)
+            detected_type = detected_type or species
+
+    # REAL AI INTEGRATION: Google Gemini Vision
+    # (a rate-limited background job; identical concurrent uploads share one job.
+    # Unless it has already finished, or finishes within GEMINI_DEADLINE, we answer
+    # from the local logic below with the job id, and the client polls
+    # /api/vision/jobs/<id> for Gemini's verdict)
+    gemini_job = None
+    if image_bytes and VISION_JOBS.available():
+        if b64_str is None:
+            b64_str = base64.b64encode(image_bytes).decode("ascii")
+        try:
+            gemini_job = _submit_gemini(mime_type, b64_str, cache_key)
+        except QueueFull:
+            print("⚠️  [VISION JOBS] Gemini queue full; answering from the local identifiers")
+        else:
+            job = VISION_JOBS.wait(gemini_job, GEMINI_DEADLINE) if GEMINI_DEADLINE > 0 else VISION_JOBS.get(gemini_job)
+            if job is not None and job["status"] == "done" and job["result"]:
+                return jsonify(_gemini_response(job["result"]))
+            if job is None or job["status"] in ("done", "failed"):
+                gemini_job = None   # expired, failed or no verdict: nothing to poll
+
+    response = _local_analysis(filename, detected_type)
+    if gemini_job:
+        response["gemini_job"] = gemini_job
+    return jsonify(response)
+
+def _local_analysis(filename, detected_type):
+    """Keyword / identifier answer from the filename and detected type."""
+    from flask import session
+    from core.db import AQUACYCLE_DB, save_aquacycle
+
+    source, tag = _keyword_match(filename, detected_type)
+    if source == "custom":
+        return {
+            "status": "success",
+            "is_aqua": True,
+            "data": _keyword_info(tag),
+            "confidence": round(random.uniform(96, 99.8), 2)
+        }
+
+    if source == "filename":
+        info = _keyword_info(tag)
+
+        # Advanced Feature: Proactively push treatment plan to farmer's dashboard
+        if session.get("role") == "farmer" and "disease" in info:
+            lead = {
+                "id": f"ALERT-{random.randint(1000,9999)}",
+                "from": "ai_vision",
+                "to": "farmer",
+                "msg": f"PROACTIVE ALERT: {info['disease']} detected. Recommended action: {info['desc']}",
+                "status": "pending"
+            }
+            AQUACYCLE_DB["leads"].append(lead)
+            save_aquacycle()
+            info = dict(info, proactive_alert=True)
+
+        return {
+            "status": "success",
+            "is_aqua": True,
+            "data": info,
+            "confidence": round(random.uniform(92, 98), 2)
+        }
+
+    if source == "detected":
+        return {
+            "status": "success",
+            "is_aqua": True,
+            "data": _keyword_info(tag),
+            "confidence": round(random.uniform(88, 96), 2),
+            "message": f"Neural Core: Identified as {detected_type} via image tensors."
+        }
             
     # Fallback to a generic aquatic disease if we really can't determine the species
     # This prevents the demo from failing completely and breaking the user experience.
-    return jsonify({
+    return {
         "status": "success",
         "is_aqua": True,
         "data": {
@@ -131,7 +300,19 @@ def api_vision_analyze():
         },
         "confidence": round(random.uniform(65, 82), 2),
         "message": "Neural Core: Generic match. Manual species training recommended."
-    })
+    }
+
+@vision_bp.route("/api/admin/vision-cache")
+@role_required(['admin'])
+def api_admin_vision_cache():
+    """Hit rate, entries and evictions of the perceptual-hash result cache."""
+    return jsonify({"status": "success", "cache": VISION_CACHE.metrics()})
+
+@vision_bp.route("/api/admin/vision-jobs")
+@role_required(['admin'])
+def api_admin_vision_jobs():
+    """Queue depth, outcomes and rate-limit waits of the Gemini job queue."""
+    return jsonify({"status": "success", "jobs": VISION_JOBS.metrics()})
 
 @vision_bp.route("/api/vision/train", methods=["POST"])
 def api_vision_train():
@@ -151,12 +332,15 @@ def api_vision_train():
         "severity": severity,
         "desc": desc
     }
+    _add_custom_keyword(keyword)
     
     AQUAVISION_DB["trained_weights"]["total_images"] += random.randint(10, 50)
     AQUAVISION_DB["trained_weights"]["last_trained"] = datetime.now().strftime("%Y-%m-%d %H:%M")
     AQUAVISION_DB["trained_weights"]["accuracy"] = min(0.992, AQUAVISION_DB["trained_weights"]["accuracy"] + 0.001)
     
     save_aquavision()
+    # Cached model answers were matched against the old labels
+    VISION_CACHE.clear()
     
     return jsonify({
         "status": "success", 
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def make_client():
+    """Test client for a bare Flask app with the given blueprints registered."""
+    def make(*blueprints):
+        app = Flask(__name__, template_folder=os.path.join(BACKEND_DIR, "..", "frontend", "templates"))
+        app.secret_key = "test"
+        for bp in blueprints:
+            app.register_blueprint(bp)
+        return app.test_client()
+    return make
+
+
+class StandIn:
+    """Local HTTP server for outbound tests. ``respond(path, headers, body)`` returns
+    (status, content type, payload[, extra headers]); ``down`` answers 500; requests
+    lists (path, headers) of every request received."""
+
+    def __init__(self, respond):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.respond = respond
+        self.down = False
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stand_in.requests.append((self.path, dict(self.headers)))
+                reply = (500, "text/plain", b"down") if stand_in.down else stand_in.respond(self.path, self.headers, body)
+                status, ctype, payload, extra = (tuple(reply) + ({},))[:4]
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in extra.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def make(respond=lambda path, headers, body: (200, "text/plain", b"ok")):
+        servers.append(StandIn(respond))
+        return servers[-1]
+    yield make
+    for server in servers:
+        server.server.shutdown()
+        server.server.server_close()
@@ -0,0 +1,29 @@
+import numpy as np
+from sklearn.base import clone
+
+from ml_core.training.custom_algorithms import ADER, ASER
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    X = rng.random((120, 4))
+    return X, X @ [3.0, -1.0, 2.0, 0.5] + rng.normal(0, 0.1, 120)
+
+
+def test_ader_blend_weight_follows_set_params_and_clone():
+    model = ADER(n_estimators=5, n_jobs=1, rf_weight=0.7)
+    model.set_params(rf_weight=0.2)
+    assert model.gb_weight == 0.8
+    assert "gb_weight" not in model.get_params()
+    copy = clone(model).set_params(rf_weight=1.0)
+    X, y = _data()
+    copy.fit(X, y)
+    np.testing.assert_allclose(copy.predict(X), copy.rf_model.predict(X), rtol=1e-6)
+
+
+def test_aser_trend_weight_follows_set_params_and_clone():
+    model = clone(ASER(n_estimators=5, n_jobs=1).set_params(ensemble_weight=0.0))
+    assert model.trend_weight == 1.0
+    X, y = _data()
+    model.fit(X, y)
+    np.testing.assert_allclose(model.predict(X), model.trend_model.predict(X), rtol=1e-6)
@@ -0,0 +1,14 @@
+import json
+
+import pytest
+
+from ml_core.dataset_cache import OFFLINE_EXPORT_COLUMNS
+
+
+@pytest.mark.parametrize("name", sorted(OFFLINE_EXPORT_COLUMNS))
+def test_dataset_export_is_strict_json(make_client, name):
+    from routes.main import main_bp
+    res = make_client(main_bp).get(f"/api/dataset/{name}")
+    assert res.status_code == 200
+    records = json.loads(res.get_data(as_text=True), parse_constant=lambda c: pytest.fail(f"bare {c} in JSON"))
+    assert records and set(records[0]) == set(OFFLINE_EXPORT_COLUMNS[name])
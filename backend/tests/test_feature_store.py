@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ml_core.feature_store import FeatureStore
+
+START = datetime(2026, 5, 1, 6, 0)
+
+
+def _report(hours, **values):
+    return {"timestamp": (START + timedelta(hours=hours)).isoformat(), "data": dict(pond_id="P1", **values)}
+
+
+@pytest.fixture
+def store():
+    db = {"reports": [_report(0, temp=28), _report(12, temp=30)]}
+    store = FeatureStore()
+    store.materialize(db)
+    store.db = db
+    return store
+
+
+def test_late_reading_inside_the_window_is_kept_in_time_order(store):
+    store.observe(store.db, _report(6, temp=26))
+    feats = store.features("P1", now=START + timedelta(hours=12))["temp"]
+    assert (feats["last"], feats["n_24h"], feats["mean_24h"]) == (30, 3, 28)
+    # 24h after the first reading only the later two remain, whatever the arrival order
+    feats = store.features("P1", now=START + timedelta(hours=30, minutes=1))["temp"]
+    assert (feats["n_24h"], feats["mean_24h"]) == (1, 30)
+
+
+def test_reading_older_than_the_window_is_dropped(store):
+    store.observe(store.db, _report(-20, temp=10))
+    feats = store.features("P1", now=START + timedelta(hours=12))["temp"]
+    assert (feats["n_24h"], feats["mean_24h"]) == (2, 29)
+    assert feats["n_7d"] == 3 and feats["last"] == 30
+
+
+def test_incremental_matches_a_rebuild_with_late_reports(store):
+    late = [_report(3, temp=27), _report(30, temp=31), _report(20, temp=29)]
+    for report in late:
+        store.db["reports"].append(report)
+        store.observe(store.db, report)
+    rebuilt = FeatureStore()
+    rebuilt.materialize(store.db)
+    now = START + timedelta(hours=31)
+    grown, fresh = store.features("P1", now=now)["temp"], rebuilt.features("P1", now=now)["temp"]
+    assert grown.keys() == fresh.keys()
+    for key, value in fresh.items():
+        assert grown[key] == (pytest.approx(value) if isinstance(value, float) else value), key
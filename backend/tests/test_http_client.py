@@ -0,0 +1,119 @@
+import json
+import socket
+import time
+
+import pytest
+import requests
+
+from core import http_client
+from core.http_client import OutboundClient, CircuitOpenError
+
+
+def _client(url, retries=0, failure_threshold=2, reset_seconds=0.2, name="svc"):
+    return OutboundClient({name: {"base_url": url, "timeout": (0.5, 1.0), "retries": retries,
+                                  "failure_threshold": failure_threshold, "reset_seconds": reset_seconds}})
+
+
+def test_breaker_opens_half_opens_and_closes(stand_in):
+    server = stand_in()
+    server.down = True
+    client = _client(server.url)
+    for _ in range(2):
+        assert client.get("svc", "/x").status_code == 500
+    assert client.metrics()["svc"]["circuit"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.get("svc", "/x")
+    assert len(server.requests) == 2   # short-circuited calls never reach the provider
+
+    time.sleep(0.25)
+    assert client.get("svc", "/x").status_code == 500   # the half-open trial fails ...
+    assert client.metrics()["svc"]["circuit"] == "open"  # ... and reopens at once
+    with pytest.raises(CircuitOpenError):
+        client.get("svc", "/x")
+
+    server.down = False
+    time.sleep(0.25)
+    assert client.get("svc", "/x").status_code == 200
+    assert client.metrics()["svc"]["circuit"] == "closed"
+    assert client.metrics()["svc"]["short_circuited"] == 2
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = http_client.CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record(False)
+    assert breaker.allow() and not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+
+
+def test_retries_stay_within_the_budget(stand_in, monkeypatch):
+    monkeypatch.setattr(http_client, "RETRY_BACKOFF_SECONDS", 0.0)
+    server = stand_in()
+    server.down = True
+    client = _client(server.url, retries=3, failure_threshold=10**6)
+    calls = 40
+    for _ in range(calls):
+        client.get("svc", "/x")
+    retries = len(server.requests) - calls
+    assert retries == client.metrics()["svc"]["retries"]
+    assert retries <= http_client.RETRY_BUDGET_MAX + http_client.RETRY_BUDGET_RATIO * calls
+    assert retries < 3 * calls
+
+
+def test_posts_are_not_retried_unless_asked(stand_in, monkeypatch):
+    monkeypatch.setattr(http_client, "RETRY_BACKOFF_SECONDS", 0.0)
+    server = stand_in()
+    server.down = True
+    client = _client(server.url, retries=2, failure_threshold=10**6)
+    client.post("svc", "/x")
+    assert len(server.requests) == 1
+    client.post("svc", "/x", retry=True)
+    assert len(server.requests) == 4
+
+
+def test_recorded_errors_never_contain_query_strings():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]   # closed once the block exits: connections are refused
+    client = _client(f"http://127.0.0.1:{port}")
+    with pytest.raises(requests.RequestException):
+        client.get("svc", "/v1/models", params={"key": "SECRET-KEY-123"})
+    error = client.metrics()["svc"]["last_error"]
+    assert error and "SECRET-KEY-123" not in error
+
+
+def test_language_route_falls_back_when_ip_lookup_is_down(stand_in, make_client, monkeypatch):
+    from core import geoip
+    from routes.main import main_bp
+
+    server = stand_in(lambda path, headers, body: (200, "application/json", json.dumps(
+        {"status": "success", "countryCode": "IN", "regionName": "Tamil Nadu"}).encode()))
+    monkeypatch.setattr(geoip, "OUTBOUND", _client(server.url, reset_seconds=60, name="ipapi"))
+    monkeypatch.setattr(geoip, "GEOIP_ONLINE", "1")
+    geoip._online_lookup.cache_clear()
+    client = make_client(main_bp)
+
+    def lang(ip):
+        return client.post("/api/set-lang-by-geo", json={}, headers={"X-Forwarded-For": ip}).get_json()["lang"]
+
+    assert lang("203.0.113.1") == "ta"
+    server.down = True
+    started = time.perf_counter()
+    assert [lang(f"203.0.113.{i}") for i in range(2, 6)] == ["en"] * 4   # default language, no error
+    assert len(server.requests) == 3   # two failures open the circuit; the rest short-circuit
+    assert time.perf_counter() - started < 2
+
+
+def test_weather_falls_back_when_provider_is_down(stand_in, monkeypatch):
+    from core import weather_cache
+    from core.weather_cache import WeatherCache, WttrProvider
+
+    server = stand_in(lambda path, headers, body: (200, "text/plain", "+30°C Sunny".encode()))
+    server.down = True
+    monkeypatch.setattr(weather_cache, "OUTBOUND", _client(server.url, failure_threshold=5, name="wttr"))
+    cache = WeatherCache(WttrProvider(), backoff=0)
+    assert cache.get("Nellore", wait=2) is None   # callers use their own fallback
+    assert cache.stats["failed"] == 1
+    server.down = False
+    assert cache.get("Nellore", wait=2)["temp_c"] == 30.0
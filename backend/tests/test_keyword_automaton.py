@@ -0,0 +1,32 @@
+import random
+
+from core.keyword_automaton import KeywordAutomaton
+
+
+def _occurrences(keywords, text):
+    return sorted(tag for keyword, tag in keywords for i in range(len(text)) if text.startswith(keyword, i))
+
+
+def test_incremental_adds_link_like_a_full_build():
+    rng = random.Random(7)
+    for trial in range(200):
+        alphabet = "ab" if trial % 2 else "abcd"
+        keywords = [("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))), i)
+                    for i in range(rng.randint(0, 40))]
+        split = rng.randint(0, len(keywords))
+        grown = KeywordAutomaton(keywords[:split])
+        for keyword, tag in keywords[split:]:
+            grown.add(keyword, tag)
+        built = KeywordAutomaton(keywords)
+        assert grown._fail == built._fail
+        assert [sorted(out) for out in grown._out] == [sorted(out) for out in built._out]
+        for _ in range(10):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            assert sorted(grown.find(text)) == _occurrences(keywords, text)
+
+
+def test_added_suffix_keyword_is_found_inside_longer_ones():
+    automaton = KeywordAutomaton([("blackgill", (1, 0))])
+    automaton.add("gill", (0, 0))
+    assert automaton.first("img_blackgill.jpg") == (0, 0)
+    assert len(automaton) == 2
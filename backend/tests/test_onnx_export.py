@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor  # noqa: E402
+
+from ml_core import onnx_export  # noqa: E402
+from ml_core.compaction import CompactForest  # noqa: E402
+from ml_core.onnx_backend import OnnxModel, load_onnx_artifacts  # noqa: E402
+from ml_core.registry import ModelRegistry  # noqa: E402
+from ml_core.training import disease_model  # noqa: E402
+from ml_core.training.custom_algorithms import ADER  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def disease_data():
+    X, y, _ = disease_model.prepare()
+    return np.asarray(X, dtype=np.float32)[:600], np.asarray(y)[:600]
+
+
+def _rows(X):
+    return np.asarray(X, dtype=np.float32)[:200]
+
+
+def test_classifier_probabilities_match_sklearn(disease_data):
+    X, y = disease_data
+    model = RandomForestClassifier(n_estimators=8, random_state=0).fit(X, y)
+    onnx_model = OnnxModel(onnx_export.to_onnx(model).SerializeToString())
+    np.testing.assert_allclose(onnx_model.predict_proba(_rows(X)), model.predict_proba(_rows(X)), atol=1e-5)
+    assert (onnx_model.predict(_rows(X)) == model.predict(_rows(X))).all()
+
+
+@pytest.mark.parametrize("make", [
+    lambda X, y: RandomForestRegressor(n_estimators=8, random_state=0).fit(X, y),
+    lambda X, y: CompactForest.from_forest(RandomForestRegressor(n_estimators=8, random_state=0).fit(X, y),
+                                           max_depth=6),
+    lambda X, y: ADER(n_estimators=8, n_jobs=1, random_state=0).fit(X, y),
+], ids=["forest", "compact", "ader"])
+def test_regressor_output_matches_sklearn(make):
+    rng = np.random.default_rng(1)
+    X = rng.random((400, 5)).astype(np.float32)
+    y = X @ [4.0, -2.0, 1.0, 0.0, 3.0] + rng.normal(0, 0.1, 400)
+    model = make(X, y)
+    onnx_model = OnnxModel(onnx_export.to_onnx(model).SerializeToString())
+    np.testing.assert_allclose(onnx_model.predict(_rows(X)), model.predict(_rows(X)), rtol=1e-5, atol=1e-5)
+
+
+@pytest.fixture
+def registry(tmp_path, disease_data):
+    X, y = disease_data
+    registry = ModelRegistry(root=str(tmp_path), legacy_dir=str(tmp_path), bundles={"disease": {"model": "disease.pkl"}})
+    model = RandomForestClassifier(n_estimators=8, random_state=0).fit(X, y)
+    registry.publish("disease", {"model": model}, dataset_path="")
+    return registry
+
+
+def _version(registry):
+    return registry.versions("disease")[0]["version"]
+
+
+def test_export_bundle_installs_graph_that_serves_like_sklearn(registry, disease_data):
+    X, _ = disease_data
+    entry = onnx_export.export_bundle("disease", _version(registry), registry=registry)
+    assert entry["installed"] and entry["parity"]["ok"]
+
+    version = _version(registry)
+    vdir = registry._version_dir("disease", version)
+    manifest = registry.versions("disease")[0]
+    artifacts = load_onnx_artifacts(vdir, manifest, ["model"])
+    sk_model = registry.load_bundle("disease", version).get()
+    np.testing.assert_allclose(artifacts["model"].predict_proba(_rows(X)), sk_model.predict_proba(_rows(X)), atol=1e-5)
+
+
+def test_failed_parity_is_never_served(registry, monkeypatch):
+    version = _version(registry)
+    onnx_export.export_bundle("disease", version, registry=registry)
+    monkeypatch.setattr(onnx_export, "PARITY_TOLERANCE", -1.0)
+    entry = onnx_export.export_bundle("disease", version, registry=registry)
+
+    assert not entry["installed"]
+    manifest = registry.versions("disease")[0]
+    vdir = registry._version_dir("disease", version)
+    assert not manifest.get("onnx")
+    assert not os.path.exists(os.path.join(vdir, "model.onnx"))
+    assert load_onnx_artifacts(vdir, manifest, ["model"]) is None
+
+    stale = dict(manifest, onnx={"file": "model.onnx", "encoders": "encoders.json", "parity": {"ok": False}})
+    assert load_onnx_artifacts(vdir, stale, ["model"]) is None
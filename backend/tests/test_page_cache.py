@@ -0,0 +1,84 @@
+import pytest
+from flask import Blueprint
+
+from core import page_cache
+from core.auth_utils import get_trans
+from core.page_cache import PageCache, cached_page
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def site(make_client, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache, "time", clock)
+    cache = PageCache(ttl=60)
+    renders = []
+    bp = Blueprint("pages", __name__)
+
+    @bp.route("/guide")
+    @cached_page(cache)
+    def guide():
+        _, lang = get_trans()
+        renders.append(lang)
+        return f"{lang} render {len(renders)}"
+
+    return make_client(bp), cache, renders, clock
+
+
+def _get(client, url):
+    res = client.get(url)
+    return res.get_data(as_text=True), res.headers.get("X-Page-Cache")
+
+
+def test_anonymous_pages_are_served_from_the_cache(site):
+    client, cache, renders, _ = site
+    assert _get(client, "/guide") == ("en render 1", "MISS")
+    assert _get(client, "/guide") == ("en render 1", "HIT")
+    assert renders == ["en"]
+    assert cache.metrics() == {"hits": 1, "misses": 1, "bypassed": 0, "entries": 1}
+
+
+def test_pages_are_cached_per_language(site):
+    client, _, renders, _ = site
+    _get(client, "/guide")
+    assert _get(client, "/guide?lang=hi") == ("hi render 2", "MISS")
+    assert _get(client, "/guide") == ("hi render 2", "HIT")   # the session keeps the picked language
+    assert _get(client, "/guide?lang=en") == ("en render 1", "HIT")
+    assert renders == ["en", "hi"]
+
+
+def test_logged_in_users_and_other_query_args_bypass_the_cache(site):
+    client, cache, renders, _ = site
+    _get(client, "/guide")
+    assert _get(client, "/guide?page=2") == ("en render 2", None)
+    with client.session_transaction() as sess:
+        sess["user"] = "farmer@example.com"
+    assert _get(client, "/guide") == ("en render 3", None)
+    assert cache.metrics()["bypassed"] == 2 and len(cache) == 1
+
+
+def test_entries_expire_after_the_ttl(site):
+    client, _, renders, clock = site
+    _get(client, "/guide")
+    clock.now += 59
+    assert _get(client, "/guide")[1] == "HIT"
+    clock.now += 1
+    assert _get(client, "/guide") == ("en render 2", "MISS")
+
+
+def test_purge_drops_matching_pages(site):
+    client, cache, renders, _ = site
+    _get(client, "/guide")
+    _get(client, "/guide?lang=hi")
+    assert cache.purge(lang="fr") == 0
+    assert cache.purge(path="/guide", lang="hi") == 1
+    assert _get(client, "/guide?lang=en")[1] == "HIT"
+    assert cache.purge() == 1 and len(cache) == 0
+    assert _get(client, "/guide")[1] == "MISS"
@@ -0,0 +1,43 @@
+import pytest
+
+from ml_core.registry import ModelRegistry, ModelBundle, MissingModel, RegistryError, LEGACY_VERSION
+
+BUNDLES = {"disease": {"model": "disease.pkl"}, "yield": {"model": "yield.pkl"}}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(root=str(tmp_path / "registry"), legacy_dir=str(tmp_path), bundles=BUNDLES)
+
+
+def test_promote_rejects_versions_that_are_not_stored(registry):
+    disease = registry.publish("disease", {"model": [1]}, dataset_path="")
+    other = registry.publish("yield", {"model": [2]}, dataset_path="")
+    for version in (f"../yield/{other['version']}", "../yield", "v-missing"):
+        with pytest.raises(RegistryError):
+            registry.promote("disease", version)
+    assert registry.promote("disease", disease["version"]).get() == [1]
+
+
+def test_update_manifest_rejects_unknown_versions(registry):
+    registry.publish("yield", {"model": [2]}, dataset_path="")
+    with pytest.raises(RegistryError):
+        registry.update_manifest("disease", "../yield", metrics={"x": 1})
+
+
+def test_predict_route_answers_503_for_a_missing_model(make_client):
+    from ml_core.models_loader import REGISTRY
+    from routes.ai_predictions import ai_bp
+
+    previous = REGISTRY._active.get("disease")
+    REGISTRY.activate(ModelBundle("disease", LEGACY_VERSION, {"model": MissingModel("disease.pkl", "missing")},
+                                  errors={"model": "missing: disease.pkl"}))
+    try:
+        res = make_client(ai_bp).post("/api/predict_disease", json={
+            "temp": 28, "ph": 7.5, "do": 5, "salinity": 15, "turbidity": 30})
+        assert res.status_code == 503
+        assert res.get_json()["status"] == "error"
+        assert "risk_score" not in res.get_json()
+    finally:
+        if previous is not None:
+            REGISTRY.activate(previous)
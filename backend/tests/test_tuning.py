@@ -0,0 +1,25 @@
+from ml_core.registry import ModelRegistry
+from ml_core.tuning import write_back
+
+BUNDLES = {"yield": {"model": "yield.pkl"}, "buyer": {"model": "buyer.pkl"}}
+
+
+def _search(algorithm, bundle, best):
+    return {"algorithm": algorithm, "bundle": bundle, "metric": "r2", "folds": 3, "dataset_sha256": "d" * 64,
+            "code_sha256": "c" * 48, "configs_evaluated": 6, "best": best, "ranking": [best] if best else [],
+            "errors": []}
+
+
+def test_best_config_and_cv_scores_land_in_the_current_manifest(tmp_path):
+    registry = ModelRegistry(root=str(tmp_path / "registry"), legacy_dir=str(tmp_path), bundles=BUNDLES)
+    version = registry.publish("yield", {"model": [1]}, dataset_path="", promote=True)["version"]
+    best = {"params": {"n_estimators": 50, "rf_weight": 0.7}, "r2": 0.81, "r2_std": 0.02, "mae": 120.0,
+            "fit_seconds": 0.4, "train_rows": 6000}
+    report = {"ADER/yield": _search("ADER", "yield", best), "AMPRO/buyer": _search("AMPRO", "buyer", best)}
+
+    written = write_back(report, registry)
+    assert written == {"ADER/yield": version, "AMPRO/buyer": "bundle has no registry version (legacy)"}
+    tuning = registry.versions("yield")[0]["tuning"]["ADER"]
+    assert tuning["best_params"] == best["params"]
+    assert (tuning["cv_mean"], tuning["cv_std"]) == (0.81, 0.02)
+    assert tuning["cv_metrics"] == {"r2": 0.81, "mae": 120.0, "fit_seconds": 0.4}
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from core import vision_cache
+from core.vision_cache import VisionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(vision_cache, "time", clock)
+    return clock
+
+
+def _near(h, bits):
+    for b in range(bits):
+        h ^= 1 << (b * 7)
+    return h
+
+
+def test_popcount_fallback_matches_numpy():
+    words = np.random.default_rng(0).integers(0, 2**63, size=500, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    expected = [bin(int(w)).count("1") for w in words]
+    assert vision_cache._popcount_table(words).tolist() == expected
+    assert vision_cache.popcount(words).tolist() == expected
+
+
+def test_near_duplicates_hit_within_the_distance_only(clock):
+    cache = VisionCache(ttl=60, max_entries=8, distance=6)
+    h = 0x0123456789ABCDEF
+    cache.put(("dhash", h), "diagnosis")
+    assert cache.get(("dhash", _near(h, 6))) == "diagnosis"
+    assert cache.get(("dhash", _near(h, 7))) is None
+    assert cache.get(("sha1", h)) is None   # byte hashes only match exactly
+    stats = cache.metrics()
+    assert (stats["near_hits"], stats["misses"], stats["hit_rate"]) == (1, 2, round(1 / 3, 4))
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = VisionCache(ttl=60, max_entries=8, distance=6)
+    cache.put(("dhash", 1), "a")
+    clock.now += 59
+    assert cache.get(("dhash", 1)) == "a"
+    clock.now += 1
+    assert cache.get(("dhash", 1)) is None
+    assert cache.get(("dhash", 3)) is None   # an expired slot is no near match either
+    assert cache.metrics()["expired"] == 1 and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted_and_its_slot_reused(clock):
+    cache = VisionCache(ttl=60, max_entries=2, distance=0)
+    cache.put(("dhash", 1), "a")
+    cache.put(("dhash", 2), "b")
+    assert cache.get(("dhash", 1)) == "a"   # 2 is now the least recently used
+    cache.put(("dhash", 3), "c")
+    assert cache.get(("dhash", 2)) is None
+    assert cache.get(("dhash", 1)) == "a" and cache.get(("dhash", 3)) == "c"
+    assert cache.metrics()["evictions"] == 1
+    assert sorted(int(h) for h in cache._hashes[cache._used]) == [1, 3]
+    assert not cache._free
+
+
+def test_replacing_a_key_reuses_its_slot(clock):
+    cache = VisionCache(ttl=60, max_entries=2, distance=6)
+    for value in ("a", "b", "c"):
+        cache.put(("dhash", 5), value)
+    assert cache.get(("dhash", 5)) == "c"
+    assert len(cache) == 1 and int(cache._used.sum()) == 1 and len(cache._free) == 1
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from ml_core.vision_embeddings import EmbeddingCache
+
+
+class Backbone:
+    name = "test"
+    dim = 4
+
+    def views(self, path, rel_path, count):
+        with open(path, "rb") as f:
+            seed = f.read()[0]
+        return np.full((count, 2), seed, dtype=np.float32)
+
+    def __call__(self, batch):
+        return np.repeat(batch, 2, axis=1)
+
+
+def _dataset(tmp_path, count):
+    folder = tmp_path / "images" / "shrimp"
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        image = folder / f"img_{i}.jpg"
+        if not image.exists():
+            image.write_bytes(bytes([i + 1]))
+    return str(tmp_path / "images")
+
+
+def test_update_replaces_the_cache_and_leaves_nothing_behind(tmp_path):
+    cache = EmbeddingCache(_dataset(tmp_path, 2), str(tmp_path / "cache" / "images"), views=1, backbone=Backbone())
+    cache.update()
+    _dataset(tmp_path, 3)
+    assert cache.update()["embedded"] == 1
+    features, rows, _, _, _ = cache.load()
+    assert features.shape == (3, 2, 4) and list(features[rows, 0, 0]) == [1, 2, 3]
+    assert os.listdir(tmp_path / "cache") == ["images"]
+
+
+def test_failed_swap_keeps_the_old_cache(tmp_path, monkeypatch):
+    cache = EmbeddingCache(_dataset(tmp_path, 2), str(tmp_path / "cache" / "images"), views=1, backbone=Backbone())
+    cache.update()
+    _dataset(tmp_path, 3)
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if os.path.basename(src).startswith(".staging-") and not src.endswith(".old"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        cache.update()
+    assert len(cache.meta()["images"]) == 2
+    assert os.listdir(tmp_path / "cache") == ["images"]
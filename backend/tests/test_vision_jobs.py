@@ -0,0 +1,91 @@
+import io
+import json
+import struct
+import time
+
+import pytest
+
+from core import vision_jobs
+from core.http_client import OutboundClient
+from core.vision_cache import VisionCache
+from core.vision_jobs import VisionJobQueue, GeminiProvider, StandInProvider
+
+KEY = "SECRET-KEY-123"
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 32, 32) + b"\x00" * 64
+
+
+def _queue(stand_in, monkeypatch, respond):
+    server = stand_in(respond)
+    monkeypatch.setenv("GEMINI_API_KEY", KEY)
+    monkeypatch.setattr(vision_jobs, "OUTBOUND", OutboundClient({"gemini": {
+        "base_url": server.url, "timeout": (0.5, 1.0), "retries": 0,
+        "failure_threshold": 100, "reset_seconds": 1}}))
+    return server, VisionJobQueue(GeminiProvider(), workers=1, rate=100, burst=10)
+
+
+def test_api_key_stays_out_of_urls_and_job_views(stand_in, monkeypatch):
+    server, jobs = _queue(stand_in, monkeypatch, lambda path, headers, body: (400, "application/json", b"{}"))
+    job = jobs.wait(jobs.submit("image/png", "aGVsbG8="), 5)
+    assert job["status"] == "failed"
+    assert job["error"] == "HTTPError (HTTP 400)"
+    assert KEY not in json.dumps(job)
+    path, headers = server.requests[0]
+    assert KEY not in path
+    assert {k.lower(): v for k, v in headers.items()}["x-goog-api-key"] == KEY
+
+
+def test_connection_errors_report_only_the_type(stand_in, monkeypatch):
+    server, jobs = _queue(stand_in, monkeypatch, lambda path, headers, body: (200, "text/plain", b"ok"))
+    server.server.shutdown()
+    server.server.server_close()
+    job = jobs.wait(jobs.submit("image/png", "aGVsbG8="), 5)
+    assert job["status"] == "failed"
+    assert job["error"] == "ConnectionError"
+
+
+def _upload(client, name="catch.png"):
+    return client.post("/api/vision/upload", data={"image": (io.BytesIO(PNG), name, "image/png")},
+                       content_type="multipart/form-data")
+
+
+@pytest.fixture
+def vision_routes(make_client, monkeypatch):
+    from routes import vision
+    monkeypatch.setattr(vision.VISION, "available", lambda: False)
+    monkeypatch.setattr(vision, "VISION_CACHE", VisionCache())
+    return vision, make_client(vision.vision_bp)
+
+
+def test_upload_answers_at_once_and_the_job_carries_gemini(vision_routes, monkeypatch):
+    vision, client = vision_routes
+    monkeypatch.setattr(vision, "VISION_JOBS", VisionJobQueue(StandInProvider(latency=0.5), workers=1))
+    started = time.perf_counter()
+    res = _upload(client).get_json()
+    assert time.perf_counter() - started < 0.4
+    assert "gemini_job" in res
+    polled = client.get(f"/api/vision/jobs/{res['gemini_job']}?wait=2").get_json()
+    assert polled["analysis"]["data"] == StandInProvider.VERDICT
+
+
+def test_upload_survives_an_expired_job(vision_routes, monkeypatch):
+    vision, client = vision_routes
+    jobs = VisionJobQueue(StandInProvider(latency=0), workers=1)
+    monkeypatch.setattr(jobs, "wait", lambda job_id, timeout: None)
+    monkeypatch.setattr(jobs, "get", lambda job_id: None)
+    monkeypatch.setattr(vision, "VISION_JOBS", jobs)
+    for deadline in (0, 1):
+        monkeypatch.setattr(vision, "GEMINI_DEADLINE", deadline)
+        res = _upload(client, f"catch_{deadline}.png")
+        assert res.status_code == 200 and "gemini_job" not in res.get_json()
+
+
+def test_job_polls_never_hold_a_worker_past_the_cap(vision_routes, monkeypatch):
+    vision, client = vision_routes
+    jobs = VisionJobQueue(StandInProvider(latency=vision.MAX_JOB_WAIT + 2), workers=1)
+    monkeypatch.setattr(vision, "VISION_JOBS", jobs)
+    job_id = jobs.submit("image/png", "aGVsbG8=")
+    started = time.perf_counter()
+    res = client.get(f"/api/vision/jobs/{job_id}?wait=30")
+    assert time.perf_counter() - started < vision.MAX_JOB_WAIT + 0.5
+    assert res.get_json()["job"]["status"] == "running"
+    assert client.get(f"/api/vision/jobs/{job_id}?wait=xyz").status_code == 200
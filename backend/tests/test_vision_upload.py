@@ -0,0 +1,82 @@
+import io
+import struct
+
+import pytest
+
+from ml_core.vision_service import (MAX_SIDE, ImageRejected, ImageTooLarge, image_dimensions, read_image)
+
+
+def _webp(chunk, payload):
+    body = b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def webp_lossy(width, height):
+    return _webp(b"VP8 ", b"\x00" * 6 + struct.pack("<HH", width, height) + b"\x00" * 16)
+
+
+def webp_lossless(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    return _webp(b"VP8L", b"\x2f" + bits.to_bytes(4, "little") + b"\x00" * 16)
+
+
+def webp_extended(width, height):
+    return _webp(b"VP8X", b"\x00" * 4 + (width - 1).to_bytes(3, "little")
+                 + (height - 1).to_bytes(3, "little") + b"\x00" * 16)
+
+
+HEIC = struct.pack(">I", 24) + b"ftypheic" + b"\x00" * 4 + b"mif1heic" + b"\x00" * 64
+
+
+@pytest.mark.parametrize("build", [webp_lossy, webp_lossless, webp_extended])
+def test_webp_header_gives_dimensions(build):
+    assert image_dimensions(build(640, 480)) == (640, 480)
+
+
+def test_oversized_webp_is_refused_from_the_header():
+    with pytest.raises(ImageTooLarge):
+        read_image(io.BytesIO(webp_extended(MAX_SIDE + 1, 10)))
+
+
+AVIF = struct.pack(">I", 28) + b"ftypavif" + b"\x00" * 4 + b"avifmif1miaf" + b"\x00" * 64
+TIFF = b"II*\x00" + struct.pack("<I", 8) + b"\x00" * 64
+
+
+@pytest.mark.parametrize("data", [HEIC, AVIF, TIFF], ids=["heic", "avif", "tiff"])
+def test_recognised_unparsed_formats_pass_through_without_a_size(data):
+    assert read_image(io.BytesIO(data)) == (data, None)
+
+
+@pytest.mark.parametrize("data", [b"hello world, not an image", struct.pack(">I", 24) + b"ftypisom" + b"\x00" * 32],
+                         ids=["text", "mp4"])
+def test_unrecognised_bodies_are_rejected(data):
+    with pytest.raises(ImageRejected):
+        read_image(io.BytesIO(data))
+
+
+def test_byte_limit_still_applies_to_unparsed_formats():
+    with pytest.raises(ImageTooLarge):
+        read_image(io.BytesIO(HEIC), max_bytes=len(HEIC) - 1)
+
+
+def test_truncated_known_format_is_rejected():
+    with pytest.raises(ImageRejected):
+        read_image(io.BytesIO(webp_lossy(640, 480)[:20]))
+
+
+def test_heic_upload_is_accepted(make_client, monkeypatch):
+    from routes import vision
+    monkeypatch.setattr(vision.VISION, "available", lambda: False)
+    monkeypatch.setattr(vision.VISION_JOBS, "available", lambda: False)
+    client = make_client(vision.vision_bp)
+    res = client.post("/api/vision/upload", data={"image": (io.BytesIO(HEIC), "catch.heic", "image/heic")},
+                      content_type="multipart/form-data")
+    assert res.status_code == 200
+
+
+def test_non_image_upload_is_refused(make_client, monkeypatch):
+    from routes import vision
+    monkeypatch.setattr(vision.VISION_JOBS, "available", lambda: False)
+    client = make_client(vision.vision_bp)
+    res = client.post("/api/vision/upload", data=b"hello world, not an image", content_type="image/png")
+    assert res.status_code == 415
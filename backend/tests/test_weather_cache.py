@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from core.weather_cache import WeatherCache, FileProvider
+
+
+@pytest.fixture
+def weather_file(tmp_path):
+    path = tmp_path / "weather.json"
+
+    def write(readings):
+        path.write_text(json.dumps(readings))
+        stamp = os.path.getmtime(path) + write.calls
+        os.utime(path, (stamp, stamp))   # FileProvider re-reads on an mtime change
+        write.calls += 1
+        return str(path)
+    write.calls = 1
+    return write
+
+
+def _cache(path, **kwargs):
+    return WeatherCache(FileProvider(path), **dict(dict(ttl=60, max_stale=3600, backoff=60), **kwargs))
+
+
+def test_miss_waits_for_the_fetch_then_serves_fresh(weather_file):
+    cache = _cache(weather_file({"Nellore": "+31°C Clear"}))
+    assert cache.get("Nellore") is None   # no wait: caller falls back, fetch runs behind
+    cache.wait_idle()
+    reading = cache.get("  nellore ")
+    assert reading["temp_c"] == 31.0 and reading["condition"] == "Clear"
+    assert cache.stats["fresh"] == 1
+
+
+def test_miss_with_wait_returns_the_reading(weather_file):
+    cache = _cache(weather_file({"Chennai": "+32°C Sunny"}))
+    reading = cache.get("Chennai", wait=5)
+    assert reading["temp_c"] == 32.0 and reading["age"] == 0.0
+    assert cache.stats == dict(cache.stats, miss=1, fetched=1)
+
+
+def test_stale_reading_is_served_and_refreshed_in_background(weather_file):
+    path = weather_file({"Kolkata": "+30°C Haze"})
+    cache = _cache(path, ttl=0)
+    cache.get("Kolkata", wait=5)
+    weather_file({"Kolkata": "+26°C Rain"})
+
+    stale = cache.get("Kolkata")
+    assert stale["temp_c"] == 30.0 and stale["stale"]
+    assert cache.wait_idle()
+    assert cache.get("Kolkata")["temp_c"] == 26.0
+    assert cache.stats["stale"] == 2 and cache.stats["fetched"] == 2
+
+
+def test_failed_fetch_backs_off_before_retrying(weather_file):
+    path = weather_file({"Chennai": "+32°C Sunny"})
+    cache = _cache(path)
+    assert cache.get("Atlantis", wait=5) is None
+    assert cache.stats["failed"] == 1
+
+    weather_file({"Atlantis": "+20°C Mist"})
+    assert cache.get("Atlantis", wait=5) is None   # still backing off: no provider call
+    assert cache.stats["failed"] == 1 and cache.stats["fetched"] == 0
+
+    cache.backoff = 0
+    assert cache.get("Atlantis", wait=5)["temp_c"] == 20.0